@@ -0,0 +1,217 @@
+"""
+Server-sent event stream of fraud alerts and score changes for open dashboards.
+
+run_analysis publishes to a bus instead of dashboards polling /alerts and
+/fraud-users:
+
+    alert     a FraudAlert was inserted
+    score     a previously scored user's risk flag flipped, or their score moved
+              by at least ALERT_STREAM_SCORE_DELTA points
+    analysis  a run finished (config version, users scored, alerts, score events)
+    reset     an upload replaced the data, or the client's cursor can no longer
+              be resumed; clients refetch their lists
+
+Events are appended to the `stream_events` collection under a global sequence
+number taken from a counter in `meta`, after the writes they describe have
+succeeded, and only the last ALERT_STREAM_BUFFER are kept. Every worker with at
+least one open stream runs a relay that loads that tail once and then polls for
+newer events every ALERT_STREAM_POLL seconds (immediately after publishing
+itself), so a dashboard sees every worker's runs whichever worker it is
+connected to. Subscribers of a worker share one in-memory buffer and one
+asyncio.Event and never query the database themselves; a worker with no open
+streams doesn't poll. alert_bus is built at import time, so its events are
+created lazily in whichever loop first uses it (and again if the loop changes).
+
+Each SSE `id` is the event's sequence number, so a reconnecting EventSource
+resumes from its Last-Event-ID (or `?cursor=`) on any worker without gaps. A
+cursor that is ahead of the log or has fallen out of it gets a single `reset`
+instead. Sequence numbers are reserved before the insert, so a worker can see
+a later event before an earlier one lands; the relay waits up to
+ALERT_STREAM_GAP_GRACE seconds for the missing one before skipping it.
+"""
+import asyncio
+import itertools
+import logging
+import os
+from collections import deque
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+from backend.lean import dumps
+from backend.storage import Database
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = int(os.getenv("ALERT_STREAM_BUFFER", "5000"))
+HEARTBEAT_SECONDS = float(os.getenv("ALERT_STREAM_HEARTBEAT", "15"))
+SCORE_DELTA = float(os.getenv("ALERT_STREAM_SCORE_DELTA", "5"))
+POLL_SECONDS = float(os.getenv("ALERT_STREAM_POLL", "1.0"))
+GAP_GRACE_SECONDS = float(os.getenv("ALERT_STREAM_GAP_GRACE", "5.0"))
+RETRY_MS = 3000
+SEQ_ID = "stream_seq"
+
+
+def _format(event_id: int, event: str, data) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+class AlertBus:
+    def __init__(self, buffer_size: int = BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        # Last sequence number relayed into this process
+        self.seq = 0
+        self._events = deque(maxlen=buffer_size)
+        self._loop = None
+        self._wakeup = self._poke = self._ready = None
+        self._relay = None
+        self.subscribers = 0
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._poke = asyncio.Event()
+            self._ready = asyncio.Event()
+            # A relay task of a previous loop is gone with it
+            self._relay = None
+
+    async def publish(self, db: Database, events):
+        """Appends [(event, data)] to the shared log; call once the data they describe is written."""
+        if not events:
+            return
+        counter = await db.meta.find_one_and_update(
+            {"_id": SEQ_ID}, {"$inc": {"value": len(events)}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        first = counter["value"] - len(events) + 1
+        now = datetime.utcnow()
+        await db.stream_events.insert_many(
+            [{"_id": first + i, "event": event, "data": data, "at": now} for i, (event, data) in enumerate(events)]
+        )
+        await db.stream_events.delete_many({"_id": {"$lte": counter["value"] - self.buffer_size}})
+        # This worker's subscribers shouldn't wait for the next poll
+        self._bind_loop()
+        self._poke.set()
+
+    def _append(self, docs):
+        """Moves contiguous events into the buffer; returns False if it stopped at a fresh gap."""
+        stale = datetime.utcnow() - timedelta(seconds=GAP_GRACE_SECONDS)
+        for doc in docs:
+            if doc["_id"] != self.seq + 1 and doc["at"] > stale:
+                return False
+            self.seq = doc["_id"]
+            self._events.append((doc["_id"], doc["event"], doc["data"]))
+        return True
+
+    def _notify(self):
+        # Wake every waiting subscriber at once, then arm a fresh event for the next batch
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def _prime(self, db: Database):
+        tail = await db.stream_events.find({}).sort("_id", -1).limit(self.buffer_size).to_list(length=self.buffer_size)
+        self._events.clear()
+        self.seq = tail[-1]["_id"] - 1 if tail else 0
+        self._append(tail[::-1])
+        self._ready.set()
+
+    async def _run_relay(self, db: Database):
+        try:
+            await self._prime(db)
+            while self.subscribers:
+                self._poke.clear()
+                cursor = db.stream_events.find({"_id": {"$gt": self.seq}}).sort("_id", 1)
+                before = self.seq
+                complete = self._append(await cursor.to_list(length=None))
+                if self.seq != before:
+                    self._notify()
+                try:
+                    await asyncio.wait_for(self._poke.wait(), POLL_SECONDS if complete else min(POLL_SECONDS, 0.1))
+                except asyncio.TimeoutError:
+                    pass
+        except Exception:
+            logger.exception("Alert stream relay stopped")
+            # Subscribers restart it; don't spin while the database is unreachable
+            await asyncio.sleep(POLL_SECONDS)
+        finally:
+            self._relay = None
+            self._ready = asyncio.Event()
+            # Anyone still waiting re-checks and restarts the relay
+            self._notify()
+
+    def _ensure_relay(self, db: Database):
+        self._bind_loop()
+        if self._relay is None:
+            self._relay = asyncio.create_task(self._run_relay(db))
+
+    def _parse_cursor(self, cursor):
+        """Sequence number to resume after, or None if `cursor` can't be resumed."""
+        if cursor is None or not str(cursor).isdigit() or int(cursor) > self.seq:
+            return None
+        return int(cursor)
+
+    def since(self, seq: int):
+        """Buffered events after `seq`, or None if some of them were already evicted."""
+        if seq >= self.seq:
+            return []
+        oldest = self._events[0][0] if self._events else self.seq + 1
+        if seq < oldest - 1:
+            return None
+        # Ids are contiguous unless the relay skipped a gap, so this is usually a slice
+        start = seq - oldest + 1
+        if start < len(self._events) and self._events[start][0] == seq + 1:
+            return list(itertools.islice(self._events, start, None))
+        return list(itertools.dropwhile(lambda e: e[0] <= seq, self._events))
+
+    async def stream(self, db: Database, cursor, request):
+        """SSE frames from `cursor` on; runs until the client disconnects."""
+        self.subscribers += 1
+        try:
+            self._ensure_relay(db)
+            await self._ready.wait()
+            yield f"retry: {RETRY_MS}\n\n"
+            seq = self._parse_cursor(cursor) if cursor else self.seq
+            if seq is None or self.since(seq) is None:
+                seq = self.seq
+                yield _format(seq, "reset", {"reason": "cursor_expired"})
+            else:
+                yield _format(seq, "ready", {})
+
+            while True:
+                # Grabbed before reading the buffer so a relayed batch in between isn't missed
+                wakeup = self._wakeup
+                events = self.since(seq)
+                if events is None:
+                    seq = self.seq
+                    yield _format(seq, "reset", {"reason": "cursor_expired"})
+                    continue
+                for seq, event, data in events:
+                    yield _format(seq, event, data)
+                if events:
+                    continue
+                timed_out = False
+                try:
+                    await asyncio.wait_for(wakeup.wait(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                # Checked on every wakeup: a busy stream may never reach the heartbeat timeout
+                if await request.is_disconnected():
+                    return
+                if timed_out:
+                    yield ": keep-alive\n\n"
+                self._ensure_relay(db)
+                await self._ready.wait()
+        finally:
+            self.subscribers -= 1
+
+
+alert_bus = AlertBus()
+
+
+def score_changed(previous, score: float, risk_flag: bool) -> bool:
+    """`previous` is the (risk_flag, score) from before the run, or None for a first score."""
+    if previous is None:
+        return False
+    prev_flag, prev_score = previous
+    return prev_flag != risk_flag or abs(score - (prev_score or 0.0)) >= SCORE_DELTA
@@ -0,0 +1,62 @@
+"""
+Aggregation pipelines behind /analytics-summary. Every figure is reduced inside
+MongoDB with $group so only a few small documents cross the wire.
+"""
+import asyncio
+
+from backend.storage import Database
+
+
+async def _first(cursor):
+    docs = await cursor.to_list(length=1)
+    return docs[0] if docs else {}
+
+
+async def gross_volume(db: Database):
+    doc = await _first(db.transactions.aggregate([
+        {"$group": {"_id": None, "volume": {"$sum": "$total_amount"}, "count": {"$sum": 1}}}
+    ]))
+    return doc.get("volume", 0.0), doc.get("count", 0)
+
+
+async def returns_by_risk(db: Database, threshold: float):
+    """
+    Splits refunds into blocked (user scored >= threshold) and allowed (everyone
+    else, including unscored users). Returns are pre-grouped per user so the
+    $lookup into behavior_scores runs once per returning user, not once per return.
+    """
+    docs = await db.returns.aggregate([
+        {"$group": {"_id": "$user_id", "refund": {"$sum": "$refund_amount"}, "count": {"$sum": 1}}},
+        {"$lookup": {
+            "from": "behavior_scores",
+            "localField": "_id",
+            "foreignField": "user_id",
+            "as": "bs"
+        }},
+        {"$project": {
+            "refund": 1,
+            "count": 1,
+            "flagged": {"$gte": [{"$ifNull": [{"$arrayElemAt": ["$bs.overall_risk_score", 0]}, -1]}, threshold]}
+        }},
+        {"$group": {"_id": "$flagged", "refund": {"$sum": "$refund"}, "count": {"$sum": "$count"}}}
+    ]).to_list(length=2)
+    split = {True: (0.0, 0), False: (0.0, 0)}
+    for d in docs:
+        split[bool(d["_id"])] = (d["refund"], d["count"])
+    return split[True], split[False]
+
+
+async def summary_totals(db: Database, threshold: float):
+    """Runs the independent aggregations concurrently."""
+    (volume, total_txns), (blocked, allowed) = await asyncio.gather(
+        gross_volume(db),
+        returns_by_risk(db, threshold),
+    )
+    return {
+        "total_txns": total_txns,
+        "gross_volume": volume,
+        "capital_saved": blocked[0],
+        "blocked_count": blocked[1],
+        "unrecognized_leakage": allowed[0],
+        "manual_reviews": allowed[1],
+    }
@@ -1,28 +1,156 @@
-from sklearn.ensemble import IsolationForest
-import pandas as pd
 import numpy as np
+from backend.rule_config import get_rules
 
-def train_and_predict_anomaly(features_list):
+def _average_path_length(n):
+    # Same as sklearn.ensemble._iforest._average_path_length
+    n = np.asarray(n, dtype=np.float64)
+    out = np.zeros_like(n)
+    out[n == 2] = 1.0
+    big = n > 2
+    out[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return out
+
+class CompiledForest:
+    """
+    A fitted IsolationForest flattened into padded (trees, nodes) numpy arrays.
+    sklearn's decision_function carries several milliseconds of per-call overhead;
+    walking all trees in lock-step scores one sample in tens of microseconds and
+    returns the same value. The arrays round-trip through to_doc()/from_doc(), so
+    other workers can load the model without scikit-learn.
+    """
+
+    ARRAYS = {"left": np.int32, "right": np.int32, "feature": np.int32, "threshold": np.float64, "leaf_depth": np.float64}
+
+    def __init__(self, clf=None):
+        if clf is None:
+            return
+        trees = [est.tree_ for est in clf.estimators_]
+        width = max(t.node_count for t in trees)
+        n = len(trees)
+        self.left = np.full((n, width), -1, dtype=np.intp)
+        self.right = np.full((n, width), -1, dtype=np.intp)
+        self.feature = np.zeros((n, width), dtype=np.intp)
+        self.threshold = np.zeros((n, width), dtype=np.float64)
+        self.leaf_depth = np.zeros((n, width), dtype=np.float64)
+
+        for i, (t, cols) in enumerate(zip(trees, clf.estimators_features_)):
+            k = t.node_count
+            self.left[i, :k] = t.children_left
+            self.right[i, :k] = t.children_right
+            internal = t.children_left >= 0
+            # Trees are fit on a column subset; map back to the full feature vector
+            self.feature[i, :k] = np.where(internal, np.asarray(cols)[np.where(internal, t.feature, 0)], 0)
+            self.threshold[i, :k] = t.threshold
+            depth = np.zeros(k, dtype=np.float64)
+            for node in range(k):
+                if internal[node]:
+                    depth[t.children_left[node]] = depth[node] + 1
+                    depth[t.children_right[node]] = depth[node] + 1
+            self.leaf_depth[i, :k] = depth + _average_path_length(t.n_node_samples)
+
+        self.rows = np.arange(n)
+        self.max_depth = max(t.max_depth for t in trees)
+        self.norm = n * float(_average_path_length([clf.max_samples_])[0])
+        self.offset = float(clf.offset_)
+
+    def decision_function(self, x) -> float:
+        # sklearn compares float32-cast inputs against the split thresholds
+        x = np.asarray(x, dtype=np.float32).astype(np.float64)
+        node = np.zeros(len(self.rows), dtype=np.intp)
+        for _ in range(self.max_depth):
+            go_left = x[self.feature[self.rows, node]] <= self.threshold[self.rows, node]
+            nxt = np.where(go_left, self.left[self.rows, node], self.right[self.rows, node])
+            node = np.where(nxt >= 0, nxt, node)
+        depth = self.leaf_depth[self.rows, node].mean()
+        return -(2.0 ** (-depth * len(self.rows) / self.norm)) - self.offset
+
+    def to_doc(self) -> dict:
+        doc = {name: getattr(self, name).astype(dtype).tobytes() for name, dtype in self.ARRAYS.items()}
+        doc.update(shape=list(self.left.shape), max_depth=int(self.max_depth), norm=self.norm, offset=self.offset)
+        return doc
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "CompiledForest":
+        forest = cls()
+        shape = tuple(doc["shape"])
+        for name, dtype in cls.ARRAYS.items():
+            array = np.frombuffer(bytes(doc[name]), dtype=dtype).reshape(shape)
+            setattr(forest, name, array.astype(np.float64 if dtype is np.float64 else np.intp))
+        forest.rows = np.arange(shape[0])
+        forest.max_depth = doc["max_depth"]
+        forest.norm = doc["norm"]
+        forest.offset = doc["offset"]
+        return forest
+
+class AnomalyModelState:
+    forest = None
+    features = []
+    min_s = 0.0
+    max_s = 0.0
+
+    def reset(self):
+        self.forest = None
+
+    def to_doc(self):
+        """The fitted model as a storable document, or None if there is none."""
+        if self.forest is None:
+            return None
+        return {"forest": self.forest.to_doc(), "features": self.features, "min_s": self.min_s, "max_s": self.max_s}
+
+    def load(self, doc):
+        if doc is None:
+            self.reset()
+            return
+        self.forest = CompiledForest.from_doc(doc["forest"])
+        self.features = list(doc["features"])
+        self.min_s = doc["min_s"]
+        self.max_s = doc["max_s"]
+
+anomaly_state = AnomalyModelState()
+
+def score_single_anomaly(features: dict) -> float:
+    """
+    Scores one feature dict against the model from the last cohort fit, on the
+    same 0.0 - 1.0 scale as train_and_predict_anomaly. Returns 0.0 if no model is loaded.
+    """
+    if anomaly_state.forest is None or anomaly_state.max_s == anomaly_state.min_s:
+        return 0.0
+    x = [float(features.get(f) or 0.0) for f in anomaly_state.features]
+    s = anomaly_state.forest.decision_function(x)
+    scaled = (anomaly_state.max_s - s) / (anomaly_state.max_s - anomaly_state.min_s)
+    return float(min(max(scaled, 0.0), 1.0))
+
+def train_and_predict_anomaly(features_list, settings=None):
     """
     Expects a list of dictionaries containing:
     return_rate_90d, avg_return_time_days, fast_return_count, high_value_return_count
     Returns a dictionary mapping user_id -> anomaly_score (scaled 0.0 - 1.0)
+    `settings` is the AnomalySettings block of the active rule config.
     """
     if not features_list:
         return {}
-        
+    if settings is None:
+        settings = get_rules().config.anomaly
+
+    # Deferred: only fitting needs pandas/scikit-learn, and they dominate import time
+    import pandas as pd
+    from sklearn.ensemble import IsolationForest
+
     df = pd.DataFrame(features_list)
-    if df.empty or len(df) < 5:
-        # Not enough data to reliably run IsolationForest
+    if df.empty or len(df) < settings.min_cohort:
+        # Not enough data to reliably run IsolationForest; real-time scoring
+        # follows the batch and stops using a model fit on an older cohort
+        anomaly_state.reset()
         return {row['user_id']: 0.0 for row in features_list}
         
-    X = df[['return_rate_90d', 'fast_return_count', 'high_value_return_count']].copy()
+    X = df.reindex(columns=settings.features, fill_value=0.0)
     
     # Check if all 0
     if X.sum().sum() == 0:
+        anomaly_state.reset()
         return {row['user_id']: 0.0 for row in features_list}
         
-    clf = IsolationForest(contamination=0.1, random_state=42)
+    clf = IsolationForest(contamination=settings.contamination, random_state=42)
     clf.fit(X)
     
     scores = clf.decision_function(X)
@@ -37,5 +165,11 @@ def train_and_predict_anomaly(features_list):
         scaled_scores = np.zeros(len(scores))
         
     df['anomaly_score'] = scaled_scores
+
+    # Keep the fitted model around so single returns can be scored in real time
+    anomaly_state.forest = CompiledForest(clf)
+    anomaly_state.features = list(settings.features)
+    anomaly_state.min_s = float(min_s)
+    anomaly_state.max_s = float(max_s)
     
     return dict(zip(df['user_id'], df['anomaly_score']))
@@ -0,0 +1,196 @@
+"""
+What-if backtesting: re-scores the stored behavior_scores feature snapshot under
+the active rule config and N candidate configs in one vectorized pass.
+
+Only score-time settings (engine weights/scales/caps, alert_threshold) can be
+replayed from the snapshot. Feature-extraction settings (window, fast-return days,
+high-value amount, categories) and anomaly settings need a fresh extraction and are
+ignored here; each row keeps its stored engine_used and anomaly_score.
+
+Nothing is written to the database.
+
+CLI:
+    python -m backend.backtest candidates.json
+where candidates.json is a list of {"name": ..., "overrides": {...}}.
+"""
+import asyncio
+import copy
+import json
+import sys
+
+import numpy as np
+
+from backend.rule_config import (
+    FEATURE_COLUMNS,
+    ENGINE_FIRST_ORDER,
+    CompiledRules,
+    get_rules,
+    parse_rules,
+)
+from backend.storage import Database
+
+CHUNK_ROWS = 65536
+PERCENTILES = (50, 90, 99)
+
+
+def merge_overrides(base: dict, overrides: dict) -> dict:
+    """Deep-merges `overrides` into a copy of `base`. Lists are replaced, not merged."""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_overrides(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def compile_candidate(baseline: CompiledRules, overrides: dict) -> CompiledRules:
+    raw = merge_overrides(baseline.config.model_dump(), overrides)
+    return parse_rules(json.dumps(raw, sort_keys=True))
+
+
+class StackedRules:
+    """
+    Several compiled configs padded to a common component count so each engine's
+    risk for every config is one (rows, configs, components) broadcast.
+    """
+
+    def __init__(self, rules_list):
+        self.rules = list(rules_list)
+        self.behavioral = self._stack([r.behavioral for r in self.rules])
+        self.first_order = self._stack([r.first_order for r in self.rules])
+        self.thresholds = np.array([r.alert_threshold for r in self.rules], dtype=np.float64)
+
+    @staticmethod
+    def _stack(engines):
+        width = max(len(e[0]) for e in engines)
+        idx = np.zeros((len(engines), width), dtype=np.intp)
+        scale = np.zeros((len(engines), width), dtype=np.float64)
+        cap = np.full((len(engines), width), np.inf, dtype=np.float64)
+        weight = np.zeros((len(engines), width), dtype=np.float64)  # padding contributes 0
+        for c, (e_idx, e_scale, e_cap, e_weight) in enumerate(engines):
+            k = len(e_idx)
+            idx[c, :k], scale[c, :k], cap[c, :k], weight[c, :k] = e_idx, e_scale, e_cap, e_weight
+        return idx, scale, cap, weight
+
+    @staticmethod
+    def _engine_risk(X, engine):
+        idx, scale, cap, weight = engine
+        return (np.minimum(X[:, idx] * scale, cap) * weight).sum(axis=2)
+
+    def risk(self, X: np.ndarray, first_order: np.ndarray) -> np.ndarray:
+        """Returns a (rows, configs) matrix of rounded risk scores."""
+        out = np.empty((len(X), len(self.rules)), dtype=np.float64)
+        for start in range(0, len(X), CHUNK_ROWS):
+            chunk = slice(start, start + CHUNK_ROWS)
+            Xc = X[chunk]
+            out[chunk] = np.where(
+                first_order[chunk, None],
+                self._engine_risk(Xc, self.first_order),
+                self._engine_risk(Xc, self.behavioral),
+            )
+        return np.round(out, 2)
+
+
+async def load_feature_snapshot(db: Database):
+    """Reads the latest behavior_scores once into (user_ids, feature matrix, first-order mask)."""
+    projection = {name: 1 for name in FEATURE_COLUMNS}
+    projection.update({"_id": 0, "user_id": 1, "engine_used": 1})
+    docs = await db.behavior_scores.find({}, projection).to_list(length=None)
+    user_ids = np.array([d["user_id"] for d in docs], dtype=np.int64)
+    X = CompiledRules.feature_matrix(docs)
+    first_order = np.array([d.get("engine_used") == ENGINE_FIRST_ORDER for d in docs], dtype=bool)
+    return user_ids, X, first_order
+
+
+def _distribution(scores: np.ndarray) -> dict:
+    if len(scores) == 0:
+        return {"mean": 0.0, **{f"p{p}": 0.0 for p in PERCENTILES}}
+    stats = {"mean": round(float(scores.mean()), 2)}
+    for p, v in zip(PERCENTILES, np.percentile(scores, PERCENTILES)):
+        stats[f"p{p}"] = round(float(v), 2)
+    return stats
+
+
+def run_backtest(user_ids, X, first_order, baseline: CompiledRules, candidates, max_flips: int = 1000):
+    """
+    `candidates` is a list of (name, CompiledRules). Column 0 of the stacked
+    evaluation is the baseline (the active config) that every candidate is diffed against.
+    """
+    stacked = StackedRules([baseline] + [rules for _, rules in candidates])
+    risk = stacked.risk(X, first_order)
+    alerted = risk > stacked.thresholds
+
+    base_scores, base_alerted = risk[:, 0], alerted[:, 0]
+    base_dist = _distribution(base_scores)
+
+    results = []
+    for c, (name, rules) in enumerate(candidates, start=1):
+        scores, cand_alerted = risk[:, c], alerted[:, c]
+        dist = _distribution(scores)
+        newly = user_ids[cand_alerted & ~base_alerted]
+        cleared = user_ids[~cand_alerted & base_alerted]
+        diff = scores - base_scores
+        results.append({
+            "name": name,
+            "config_version": rules.version,
+            "alert_count": int(cand_alerted.sum()),
+            "alert_delta": int(cand_alerted.sum() - base_alerted.sum()),
+            "distribution": dist,
+            "distribution_delta": {k: round(dist[k] - base_dist[k], 2) for k in dist},
+            "mean_abs_score_change": round(float(np.abs(diff).mean()), 2) if len(diff) else 0.0,
+            "newly_alerted_count": int(len(newly)),
+            "cleared_count": int(len(cleared)),
+            "newly_alerted": newly[:max_flips].tolist(),
+            "cleared": cleared[:max_flips].tolist(),
+        })
+
+    return {
+        "users": int(len(user_ids)),
+        "baseline": {
+            "config_version": baseline.version,
+            "alert_count": int(base_alerted.sum()),
+            "distribution": base_dist,
+        },
+        "candidates": results,
+    }
+
+
+async def backtest_from_db(db: Database, candidate_specs, max_flips: int = 1000):
+    """
+    `candidate_specs` is a list of {"name": str, "overrides": dict}. Raises
+    ValueError if any candidate fails validation.
+    """
+    baseline = get_rules()
+    candidates = []
+    for i, spec in enumerate(candidate_specs):
+        name = spec.get("name") or f"candidate-{i + 1}"
+        try:
+            candidates.append((name, compile_candidate(baseline, spec.get("overrides", {}))))
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from e
+    user_ids, X, first_order = await load_feature_snapshot(db)
+    return run_backtest(user_ids, X, first_order, baseline, candidates, max_flips)
+
+
+async def _main(path):
+    from dotenv import load_dotenv
+    load_dotenv()  # before backend.database reads MONGO_URI
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from backend.database import MONGO_URI
+
+    with open(path, "r", encoding="utf-8") as fh:
+        specs = json.load(fh)
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        report = await backtest_from_db(client.trustigo, specs)
+    finally:
+        client.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m backend.backtest candidates.json")
+        sys.exit(1)
+    asyncio.run(_main(sys.argv[1]))
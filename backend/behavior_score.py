@@ -1,44 +1,83 @@
 from datetime import datetime, timedelta, timezone
+from backend.models import CASH_ON_DELIVERY
+from backend.rule_config import get_rules, ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER
+from backend.storage import Database
 
-async def calculate_user_behavior_metrics(db, user_id: int): # db is the Motor database instance now
-    # Transactions in last 90 days
-    ninety_days_ago = datetime.now(timezone.utc) - timedelta(days=90)
-    
-    # Motor query
-    cursor = db.transactions.find({
-        "user_id": user_id,
-        "date": {"$gte": ninety_days_ago}
-    })
-    txns = await cursor.to_list(length=None)
-    
-    txn_ids = [t['transaction_id'] for t in txns]
+# Users whose history is fetched together; each batch costs four queries
+METRICS_BATCH = 5000
+
+async def calculate_behavior_metrics(db: Database, user_ids, rules=None):
+    """
+    Feature dicts for `user_ids`, in order. Transactions, item units, returns and
+    returned-item categories are read with one $in query each per METRICS_BATCH
+    users, so the number of round trips doesn't grow with the cohort.
+    """
+    settings = (rules or get_rules()).features
+    # Transactions in the scoring window (90 days by default)
+    ninety_days_ago = datetime.now(timezone.utc) - timedelta(days=settings.window_days)
+    out = []
+    for start in range(0, len(user_ids), METRICS_BATCH):
+        batch = list(user_ids[start:start + METRICS_BATCH])
+
+        txns_by_user = {}
+        cursor = db.transactions.find({"user_id": {"$in": batch}, "date": {"$gte": ninety_days_ago}})
+        for t in await cursor.to_list(length=None):
+            txns_by_user.setdefault(t['user_id'], []).append(t)
+        txn_ids = [t['transaction_id'] for txns in txns_by_user.values() for t in txns]
+
+        # Units bought per transaction; a line with quantity 3 counts three times
+        units = {}
+        if txn_ids:
+            cursor = db.items.find({"transaction_id": {"$in": txn_ids}}, {"_id": 0, "transaction_id": 1, "quantity": 1})
+            for i in await cursor.to_list(length=None):
+                units[i['transaction_id']] = units.get(i['transaction_id'], 0) + i.get('quantity', 1)
+
+        # Returns in last 90 days
+        returns_by_user = {}
+        cursor = db.returns.find({"user_id": {"$in": batch}, "return_date": {"$gte": ninety_days_ago}})
+        for r in await cursor.to_list(length=None):
+            returns_by_user.setdefault(r['user_id'], []).append(r)
+
+        categories = {}
+        item_ids = list({r.get('item_id') for returns in returns_by_user.values() for r in returns})
+        if item_ids:
+            cursor = db.items.find({"item_id": {"$in": item_ids}}, {"_id": 0, "item_id": 1, "category": 1})
+            for i in await cursor.to_list(length=None):
+                categories.setdefault(i['item_id'], i.get('category'))
+
+        for user_id in batch:
+            out.append(_user_metrics(
+                user_id, txns_by_user.get(user_id, []), units, returns_by_user.get(user_id, []), categories, settings
+            ))
+    return out
+
+async def calculate_user_behavior_metrics(db: Database, user_id: int, rules=None): # db is the Motor database instance now
+    return (await calculate_behavior_metrics(db, [user_id], rules))[0]
+
+def _user_metrics(user_id, txns, units, returns, categories, settings):
     total_spent = sum(t.get('total_amount', 0.0) for t in txns)
-    
+
     # Total items bought
-    items_bought = await db.items.count_documents({"transaction_id": {"$in": txn_ids}}) if txn_ids else 0
-    
-    # Returns in last 90 days
-    cursor = db.returns.find({
-        "user_id": user_id,
-        "return_date": {"$gte": ninety_days_ago}
-    })
-    returns = await cursor.to_list(length=None)
-    
+    items_bought = sum(units.get(t['transaction_id'], 0) for t in txns)
+
     # Metrics
     return_rate_90d = len(returns) / items_bought if items_bought > 0 else 0.0
-    
+
     total_days = 0
     fast_count = 0
     high_value_count = 0
     total_refund = sum(r.get('refund_amount', 0.0) for r in returns)
-    
+
     refund_value_ratio = total_refund / total_spent if total_spent > 0 else 0.0
-    
+
     risky_categories_count = 0
-    
+    txn_by_id = {}
+    for t in txns:
+        txn_by_id.setdefault(t['transaction_id'], t)
+
     for r in returns:
         # Need to find the original txn date
-        txn = next((t for t in txns if t['transaction_id'] == r.get('transaction_id')), None)
+        txn = txn_by_id.get(r.get('transaction_id'))
         if txn:
             # Need to ensure dates are datetime objects
             ret_date = r.get('return_date')
@@ -46,36 +85,35 @@ async def calculate_user_behavior_metrics(db, user_id: int): # db is the Motor d
             if ret_date and txn_date:
                 diff = (ret_date - txn_date).days
                 total_days += diff
-                if diff <= 2:
+                if diff <= settings.fast_return_days:
                     fast_count += 1
-                
-        if r.get('refund_amount', 0.0) > 800:
+
+        if r.get('refund_amount', 0.0) > settings.high_value_amount:
             high_value_count += 1
-            
-        item = await db.items.find_one({"item_id": r.get('item_id')})
-        if item and item.get('category') in ["Electronics", "Clothing"]:
+
+        if categories.get(r.get('item_id')) in settings.risky_categories:
             risky_categories_count += 1
-            
+
     avg_return_time = (total_days / len(returns)) if len(returns) > 0 else 0.0
     category_risk_score = min(risky_categories_count / max(len(returns), 1), 1.0) * 100
-    
+
     # Check for payment/device risk based on recent txns
     payment_risk_score = 0.0
-    cod_count = sum(1 for t in txns if t.get('payment_method') == "COD")
+    cod_count = sum(1 for t in txns if t.get('payment_method') == CASH_ON_DELIVERY)
     if cod_count > 0:
-        payment_risk_score += 30.0
+        payment_risk_score += settings.cod_payment_risk
     high_risk_shipping = sum(1 for t in txns if t.get('shipping_address_risk') == "High")
     if high_risk_shipping > 0:
-        payment_risk_score += (high_risk_shipping * 20.0)
-    
+        payment_risk_score += (high_risk_shipping * settings.high_risk_shipping_risk)
+
     payment_risk_score = min(payment_risk_score, 100.0)
-    
+
     # Determine Engine
-    engine_used = "Engine 1: Behavioral"
-    if len(txns) <= 1:
+    engine_used = ENGINE_BEHAVIORAL
+    if len(txns) <= settings.first_order_max_txns:
         # First order or very new user -> Use Engine 2
-        engine_used = "Engine 2: First-Order"
-    
+        engine_used = ENGINE_FIRST_ORDER
+
     return {
         "user_id": user_id,
         "return_rate_90d": return_rate_90d,
@@ -86,5 +124,12 @@ async def calculate_user_behavior_metrics(db, user_id: int): # db is the Motor d
         "category_risk_score": category_risk_score,
         "payment_risk_score": payment_risk_score,
         "engine_used": engine_used,
-        "txns_count": len(txns)
+        "txns_count": len(txns),
+        # Raw counters so a single incoming return can be folded in without a re-scan
+        "items_bought": items_bought,
+        "returns_count": len(returns),
+        "total_spent": total_spent,
+        "total_refund": total_refund,
+        "total_return_days": total_days,
+        "risky_returns_count": risky_categories_count
     }
@@ -1,12 +1,14 @@
 import os
+from typing import AsyncIterator
 from motor.motor_asyncio import AsyncIOMotorClient
+from backend.storage import Client, Database
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 
 class DataBase:
-    client = None
+    client: Client = None
 
 db_state = DataBase()
 
-async def get_db():
+async def get_db() -> AsyncIterator[Database]:
     yield db_state.client.trustigo
@@ -0,0 +1,133 @@
+"""
+Database round-trip accounting.
+
+A PyMongo command listener (registered on every Motor client created through
+backend.storage) and the in-process store both report each command here. Counts
+go to every tracker active in the current context: MetricsMiddleware opens one
+per request, and track_db() can be nested around any block, e.g. one job stage.
+Motor runs commands on its executor with a copy of the caller's context, so the
+attribution follows the request that issued them.
+
+With DB_STATS_DEBUG=1 every response carries X-DB-Round-Trips / X-DB-Docs /
+X-DB-Time-Ms headers (totals up to the first response byte) and the full totals
+are logged per request.
+
+measure_round_trips()/assert_round_trips() are the N+1 regression guards; see
+benchmarks/round_trips.py.
+"""
+import contextvars
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+DEBUG = os.getenv("DB_STATS_DEBUG", "0") == "1"
+
+# Commands that only exist to keep a connection alive or authenticated
+_IGNORED = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions", "buildInfo"}
+
+
+class DbStats:
+    __slots__ = ("round_trips", "docs", "duration_ms", "by_command", "_lock")
+
+    def __init__(self):
+        self.round_trips = 0
+        self.docs = 0
+        self.duration_ms = 0.0
+        self.by_command = {}
+        self._lock = threading.Lock()
+
+    def add(self, command: str, docs: int, duration_ms: float):
+        with self._lock:
+            self.round_trips += 1
+            self.docs += docs
+            self.duration_ms += duration_ms
+            self.by_command[command] = self.by_command.get(command, 0) + 1
+
+    def as_dict(self):
+        return {
+            "round_trips": self.round_trips,
+            "docs": self.docs,
+            "duration_ms": round(self.duration_ms, 3),
+            "by_command": dict(self.by_command),
+        }
+
+
+_active = contextvars.ContextVar("db_stats_active", default=())
+
+
+def record(command: str, docs: int = 0, duration_ms: float = 0.0):
+    for stats in _active.get():
+        stats.add(command, docs, duration_ms)
+
+
+@contextmanager
+def track_db():
+    stats = DbStats()
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+def _docs_in_reply(reply) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    if "value" in reply:
+        # findAndModify
+        return 1 if reply["value"] is not None else 0
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class CommandCounter(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        if event.command_name in _IGNORED or not _active.get():
+            return
+        record(event.command_name, _docs_in_reply(event.reply), event.duration_micros / 1000.0)
+
+    def failed(self, event):
+        if event.command_name in _IGNORED or not _active.get():
+            return
+        record(event.command_name, 0, event.duration_micros / 1000.0)
+
+
+command_counter = CommandCounter()
+
+
+def response_headers(stats: DbStats):
+    return [
+        (b"x-db-round-trips", str(stats.round_trips).encode()),
+        (b"x-db-docs", str(stats.docs).encode()),
+        (b"x-db-time-ms", f"{stats.duration_ms:.3f}".encode()),
+    ]
+
+
+async def measure_round_trips(app, method: str, path: str, **request_kwargs) -> DbStats:
+    """Issues one in-process request and returns the database work it caused."""
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://db-stats") as client:
+        with track_db() as stats:
+            response = await client.request(method, path, **request_kwargs)
+    response.raise_for_status()
+    return stats
+
+
+async def assert_round_trips(app, method: str, path: str, max_round_trips: int, **request_kwargs) -> DbStats:
+    stats = await measure_round_trips(app, method, path, **request_kwargs)
+    if stats.round_trips > max_round_trips:
+        raise AssertionError(
+            f"{method} {path} made {stats.round_trips} database round trips "
+            f"(budget {max_round_trips}): {stats.by_command}"
+        )
+    return stats
@@ -0,0 +1,54 @@
+"""
+Streaming serializers for bulk exports. Rows are pulled from the Motor cursor
+batch by batch and flushed in chunks, so memory stays flat however many rows
+the query matches and the first bytes go out as soon as the first batch lands.
+"""
+import csv
+import io
+import json
+import math
+
+EXPORT_BATCH_SIZE = 2000
+FLUSH_ROWS = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _value(doc, column):
+    # Missing values read back from Parquet/pandas as NaN; JSON has no NaN, so write null
+    value = doc.get(column)
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+
+async def stream_ndjson(cursor, columns):
+    lines = []
+    async for doc in cursor:
+        lines.append(json.dumps({c: _value(doc, c) for c in columns}, default=str))
+        if len(lines) >= FLUSH_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines.clear()
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def stream_csv(cursor, columns):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([_value(doc, c) for c in columns])
+        rows += 1
+        if rows >= FLUSH_ROWS:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            rows = 0
+    yield buf.getvalue()
+
+
+def stream_documents(cursor, fmt: str, columns):
+    cursor = cursor.batch_size(EXPORT_BATCH_SIZE)
+    if fmt == "csv":
+        return stream_csv(cursor, columns)
+    return stream_ndjson(cursor, columns)
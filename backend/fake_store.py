@@ -0,0 +1,773 @@
+"""
+In-process fake of the storage interface, for tests and benchmarks only.
+
+Implements the subset of the Motor API described in backend/storage.py over
+plain dicts, so the full upload -> analysis -> analytics flow runs in the test
+suite and the benchmarks without a MongoDB server. It is not a deployment
+option: nothing is written to disk and every process has its own copy, so
+create_client() never returns it; tests install a FakeClient directly.
+
+Semantics follow MongoDB where the app depends on them: documents come back as
+fresh copies, datetimes are stored as naive UTC, comparisons only match values
+of the same BSON type, and missing fields sort first. Indexes declared through
+create_indexes() become hash maps on their leading key, so per-user lookups
+during an analysis run stay O(1) instead of scanning the collection.
+"""
+import copy
+from collections import deque
+from datetime import datetime, timezone
+from numbers import Number
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from backend.db_stats import record
+
+_MISSING = object()
+
+
+# ---------------------------------------------------------------------------
+# Values, comparison and field access
+# ---------------------------------------------------------------------------
+
+def _normalize(value):
+    """Stores values the way BSON round-trips them: aware datetimes become naive UTC."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _type_rank(value):
+    # BSON comparison order, for the types this app stores
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, Number):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if rank == 1:
+        return (1, 0)
+    if rank in (4, 5, 10):
+        return (rank, repr(value))
+    return (rank, value)
+
+
+def _compare(a, b):
+    ka, kb = _sort_key(a), _sort_key(b)
+    return (ka > kb) - (ka < kb)
+
+
+def _get(doc, path):
+    """Dotted-path lookup for queries; returns _MISSING if any segment is absent."""
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Query matching
+# ---------------------------------------------------------------------------
+
+def _eq(value, target):
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return any(_eq(v, target) for v in value)
+    if _type_rank(value) != _type_rank(target):
+        return False
+    return value == target
+
+
+def _ordered(value, target, accept):
+    # $gt/$lt family only match values of the same type bracket
+    if value is _MISSING or _type_rank(value) != _type_rank(target):
+        return False
+    return accept(_compare(value, target))
+
+
+_FIELD_OPS = {
+    "$eq": _eq,
+    "$ne": lambda v, t: not _eq(v, t),
+    "$gt": lambda v, t: _ordered(v, t, lambda c: c > 0),
+    "$gte": lambda v, t: _ordered(v, t, lambda c: c >= 0),
+    "$lt": lambda v, t: _ordered(v, t, lambda c: c < 0),
+    "$lte": lambda v, t: _ordered(v, t, lambda c: c <= 0),
+    "$in": lambda v, t: any(_eq(v, x) for x in t),
+    "$nin": lambda v, t: not any(_eq(v, x) for x in t),
+    "$exists": lambda v, t: (v is not _MISSING) == bool(t),
+}
+
+
+def _is_operator_dict(cond):
+    return isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond)
+
+
+def _match_field(value, cond):
+    if _is_operator_dict(cond):
+        for op, operand in cond.items():
+            fn = _FIELD_OPS.get(op)
+            if fn is None:
+                raise OperationFailure(f"Unsupported query operator {op} in the fake store")
+            if not fn(value, _normalize(operand)):
+                return False
+        return True
+    return _eq(value, _normalize(cond))
+
+
+def matches(doc, query) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, q) for q in cond):
+                return False
+        elif not _match_field(_get(doc, key), cond):
+            return False
+    return True
+
+
+def _copy_value(value):
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
+def _project(doc, projection):
+    if not projection:
+        return {k: _copy_value(v) for k, v in doc.items()}
+    if isinstance(projection, (list, tuple)):
+        projection = {f: 1 for f in projection}
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        out = {k: _copy_value(doc[k]) for k in fields if k in doc}
+        if include_id and "_id" in doc:
+            out = {"_id": doc["_id"], **out}
+        return out
+    out = {k: _copy_value(v) for k, v in doc.items() if k not in fields}
+    if not include_id:
+        out.pop("_id", None)
+    return out
+
+
+def _sort_docs(docs, spec):
+    # Stable sorts applied from the last key to the first give a compound order
+    for key, direction in reversed(spec):
+        docs.sort(key=lambda d: _sort_key(_get(d, key)), reverse=direction < 0)
+    return docs
+
+
+def _sort_spec(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+# ---------------------------------------------------------------------------
+# Updates
+# ---------------------------------------------------------------------------
+
+def _set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _apply_update(doc, update):
+    if not _is_operator_dict(update):
+        # Replacement document
+        keep_id = doc.get("_id")
+        doc.clear()
+        doc.update(_normalize(update))
+        if keep_id is not None:
+            doc["_id"] = keep_id
+        return
+    for op, fields in update.items():
+        for path, value in fields.items():
+            value = _normalize(value)
+            if op == "$set":
+                _set_path(doc, path, value)
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$inc":
+                current = _get(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING else current) + value)
+            elif op == "$unset":
+                parent = _get(doc, path.rpartition(".")[0]) if "." in path else doc
+                if isinstance(parent, dict):
+                    parent.pop(path.rpartition(".")[2], None)
+            elif op == "$max":
+                current = _get(doc, path)
+                if current is _MISSING or _compare(value, current) > 0:
+                    _set_path(doc, path, value)
+            elif op == "$min":
+                current = _get(doc, path)
+                if current is _MISSING or _compare(value, current) < 0:
+                    _set_path(doc, path, value)
+            elif op == "$push":
+                current = _get(doc, path)
+                _set_path(doc, path, ([] if current is _MISSING else current) + [value])
+            else:
+                raise OperationFailure(f"Unsupported update operator {op} in the fake store")
+
+
+def _upsert_seed(query, update):
+    """New document for an upsert: the query's equality fields plus $setOnInsert."""
+    doc = {}
+    for key, cond in (query or {}).items():
+        if key.startswith("$"):
+            continue
+        if _is_operator_dict(cond):
+            if "$eq" in cond:
+                _set_path(doc, key, _normalize(cond["$eq"]))
+        else:
+            _set_path(doc, key, _normalize(cond))
+    if _is_operator_dict(update):
+        for path, value in update.get("$setOnInsert", {}).items():
+            _set_path(doc, path, _normalize(value))
+    return doc
+
+
+# ---------------------------------------------------------------------------
+# Aggregation
+# ---------------------------------------------------------------------------
+
+def _path_values(doc, path):
+    """Field path for aggregation expressions; traverses arrays like "$bs.score"."""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = [v[part] for v in value if isinstance(v, dict) and part in v]
+        elif isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return None
+    return value
+
+
+def _expr(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _path_values(doc, expr[1:])
+    if isinstance(expr, list):
+        return [_expr(e, doc) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if not _is_operator_dict(expr):
+        return {k: _expr(v, doc) for k, v in expr.items()}
+    (op, args), = expr.items()
+    if op == "$literal":
+        return args
+    if op == "$dateToString":
+        date = _expr(args["date"], doc)
+        return date.strftime(args["format"]) if isinstance(date, datetime) else None
+    values = _expr(args, doc) if isinstance(args, list) else [_expr(args, doc)]
+    if op in ("$gt", "$gte", "$lt", "$lte", "$eq", "$ne"):
+        c = _compare(values[0], values[1])
+        return {"$gt": c > 0, "$gte": c >= 0, "$lt": c < 0, "$lte": c <= 0, "$eq": c == 0, "$ne": c != 0}[op]
+    if op == "$ifNull":
+        return next((v for v in values[:-1] if v is not None), values[-1])
+    if op == "$arrayElemAt":
+        arr, idx = values
+        if not isinstance(arr, list) or not -len(arr) <= idx < len(arr):
+            return None
+        return arr[idx]
+    if op == "$cond":
+        if isinstance(args, dict):
+            values = [_expr(args["if"], doc), _expr(args["then"], doc), _expr(args["else"], doc)]
+        return values[1] if values[0] else values[2]
+    if op == "$add":
+        return sum(v for v in values if isinstance(v, Number))
+    if op == "$subtract":
+        return values[0] - values[1]
+    if op == "$multiply":
+        out = 1
+        for v in values:
+            out *= v
+        return out
+    if op == "$divide":
+        return values[0] / values[1]
+    if op == "$size":
+        return len(values[0])
+    if op == "$and":
+        return all(values)
+    if op == "$or":
+        return any(values)
+    if op == "$not":
+        return not values[0]
+    raise OperationFailure(f"Unsupported expression operator {op} in the fake store")
+
+
+class _Accumulator:
+    def __init__(self, op, expr):
+        self.op = op
+        self.expr = expr
+        self.value = {"$sum": 0, "$push": [], "$addToSet": []}.get(op)
+        self.count = 0
+
+    def add(self, doc):
+        v = _expr(self.expr, doc)
+        if self.op == "$sum":
+            if isinstance(v, Number) and not isinstance(v, bool):
+                self.value += v
+        elif self.op == "$avg":
+            if isinstance(v, Number) and not isinstance(v, bool):
+                self.value = (self.value or 0) + v
+                self.count += 1
+        elif self.op == "$min":
+            if v is not None and (self.value is None or _compare(v, self.value) < 0):
+                self.value = v
+        elif self.op == "$max":
+            if v is not None and (self.value is None or _compare(v, self.value) > 0):
+                self.value = v
+        elif self.op == "$first":
+            if self.count == 0:
+                self.value = v
+            self.count += 1
+        elif self.op == "$last":
+            self.value = v
+        elif self.op == "$push":
+            self.value.append(v)
+        elif self.op == "$addToSet":
+            if v not in self.value:
+                self.value.append(v)
+        else:
+            raise OperationFailure(f"Unsupported accumulator {self.op} in the fake store")
+
+    def result(self):
+        if self.op == "$avg":
+            return self.value / self.count if self.count else None
+        return self.value
+
+
+def _group(docs, spec):
+    groups = {}
+    for doc in docs:
+        key = _expr(spec["_id"], doc)
+        hkey = repr(key) if not _hashable(key) else (type(key).__name__, key)
+        if hkey not in groups:
+            groups[hkey] = (key, {
+                name: _Accumulator(*next(iter(acc.items())))
+                for name, acc in spec.items() if name != "_id"
+            })
+        for acc in groups[hkey][1].values():
+            acc.add(doc)
+    return [
+        {"_id": key, **{name: acc.result() for name, acc in accs.items()}}
+        for key, accs in groups.values()
+    ]
+
+
+def _project_stage(docs, spec):
+    out = []
+    exclude = [k for k, v in spec.items() if v == 0 or v is False]
+    for doc in docs:
+        if exclude and len(exclude) == len(spec):
+            out.append({k: v for k, v in doc.items() if k not in exclude})
+            continue
+        row = {"_id": doc.get("_id")} if spec.get("_id", 1) and "_id" in doc else {}
+        for key, value in spec.items():
+            if key == "_id":
+                if value not in (0, 1, True, False):
+                    row["_id"] = _expr(value, doc)
+                continue
+            if value is True or value == 1:
+                got = _get(doc, key)
+                if got is not _MISSING:
+                    row[key] = got
+            else:
+                row[key] = _expr(value, doc)
+        out.append(row)
+    return out
+
+
+def _unwind(docs, spec):
+    path = (spec if isinstance(spec, str) else spec["path"])[1:]
+    keep_empty = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays", False)
+    out = []
+    for doc in docs:
+        value = _get(doc, path)
+        if isinstance(value, list) and value:
+            for v in value:
+                row = dict(doc)
+                _set_path(row, path, v)
+                out.append(row)
+        elif keep_empty:
+            out.append(doc)
+        elif value is not _MISSING and value is not None and not isinstance(value, list):
+            out.append(doc)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Cursors, collections, databases
+# ---------------------------------------------------------------------------
+
+class FakeCursor:
+    """Lazily evaluated like a Motor cursor: filters, sort and limits apply at fetch time."""
+
+    def __init__(self, fetch, projection=None, command="find"):
+        self._fetch = fetch
+        self._command = command
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._buffer = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def _materialize(self):
+        docs = self._fetch()
+        if self._sort:
+            docs = _sort_docs(list(docs), self._sort)
+        if self._skip:
+            docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        # Counted like one server round trip, for backend/db_stats.py
+        record(self._command, len(docs))
+        return [_project(d, self._projection) for d in docs]
+
+    def _ensure_buffer(self):
+        if self._buffer is None:
+            self._buffer = deque(self._materialize())
+        return self._buffer
+
+    async def to_list(self, length=None):
+        buffer = self._ensure_buffer()
+        n = len(buffer) if length is None else min(length, len(buffer))
+        return [buffer.popleft() for _ in range(n)]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        buffer = self._ensure_buffer()
+        if not buffer:
+            raise StopAsyncIteration
+        return buffer.popleft()
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self._docs = {}                 # seq -> document, insertion ordered
+        self._seq = 0
+        self._ids = {}                  # _id -> seq
+        self._indexes = {}              # leading field -> {value: set(seq)}
+        self._index_names = {"_id_": {"_id": 1}}
+
+    # -- internal ---------------------------------------------------------
+
+    def _index_add(self, seq, doc):
+        for field, buckets in self._indexes.items():
+            value = _get(doc, field)
+            key = None if value is _MISSING else value
+            if _hashable(key):
+                buckets.setdefault(key, set()).add(seq)
+
+    def _index_remove(self, seq, doc):
+        for field, buckets in self._indexes.items():
+            value = _get(doc, field)
+            key = None if value is _MISSING else value
+            if _hashable(key) and key in buckets:
+                buckets[key].discard(seq)
+                if not buckets[key]:
+                    del buckets[key]
+
+    def _candidates(self, query):
+        """Narrows the scan with a hash index when the query pins an indexed field."""
+        query = query or {}
+        if "_id" in query and not _is_operator_dict(query["_id"]) and _hashable(query["_id"]):
+            seq = self._ids.get(query["_id"])
+            return [] if seq is None else [seq]
+        for field, buckets in self._indexes.items():
+            cond = query.get(field, _MISSING)
+            if cond is _MISSING:
+                continue
+            if _is_operator_dict(cond):
+                if set(cond) == {"$in"} and all(_hashable(_normalize(v)) for v in cond["$in"]):
+                    values = [_normalize(v) for v in cond["$in"]]
+                elif set(cond) == {"$eq"} and _hashable(_normalize(cond["$eq"])):
+                    values = [_normalize(cond["$eq"])]
+                else:
+                    continue
+            elif _hashable(_normalize(cond)):
+                values = [_normalize(cond)]
+            else:
+                continue
+            seqs = set()
+            for v in values:
+                seqs |= buckets.get(v, set())
+            return sorted(seqs)
+        return None
+
+    def _matching(self, query):
+        seqs = self._candidates(query)
+        if seqs is None:
+            return [(seq, d) for seq, d in self._docs.items() if matches(d, query)]
+        return [(seq, self._docs[seq]) for seq in seqs if matches(self._docs[seq], query)]
+
+    def _insert(self, doc):
+        if "_id" not in doc:
+            doc["_id"] = ObjectId()
+        stored = _normalize(copy.deepcopy(doc))
+        if _hashable(stored["_id"]) and stored["_id"] in self._ids:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        self._seq += 1
+        self._docs[self._seq] = stored
+        self._ids[stored["_id"]] = self._seq
+        self._index_add(self._seq, stored)
+        return stored["_id"]
+
+    def _remove(self, seq):
+        doc = self._docs.pop(seq)
+        self._ids.pop(doc["_id"], None)
+        self._index_remove(seq, doc)
+
+    def _update(self, query, update, upsert, multi):
+        found = self._matching(query)
+        if not multi:
+            found = found[:1]
+        for seq, doc in found:
+            self._index_remove(seq, doc)
+            _apply_update(doc, update)
+            self._index_add(seq, doc)
+        if found:
+            return {"n": len(found), "nModified": len(found), "ok": 1.0}, found[0][1]
+        if not upsert:
+            return {"n": 0, "nModified": 0, "ok": 1.0}, None
+        doc = _upsert_seed(query, update)
+        _apply_update(doc, update)
+        new_id = self._insert(doc)
+        return {"n": 1, "nModified": 0, "upserted": new_id, "ok": 1.0}, self._docs[self._ids[new_id]]
+
+    # -- Motor API ----------------------------------------------------------
+
+    def find(self, filter=None, projection=None, *args, **kwargs):
+        return FakeCursor(lambda: [d for _, d in self._matching(filter)], projection)
+
+    async def find_one(self, filter=None, projection=None, *args, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        docs = await self.find(filter, projection).limit(1).to_list(length=1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter, **kwargs):
+        record("aggregate", 1)
+        return len(self._matching(filter))
+
+    async def estimated_document_count(self, **kwargs):
+        return len(self._docs)
+
+    async def insert_one(self, document, **kwargs):
+        record("insert", 1)
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents, ordered=True, **kwargs):
+        record("insert", len(documents))
+        return InsertManyResult([self._insert(d) for d in documents], True)
+
+    async def update_one(self, filter, update, upsert=False, **kwargs):
+        record("update")
+        raw, _ = self._update(filter, update, upsert, multi=False)
+        return UpdateResult(raw, True)
+
+    async def update_many(self, filter, update, upsert=False, **kwargs):
+        record("update")
+        raw, _ = self._update(filter, update, upsert, multi=True)
+        return UpdateResult(raw, True)
+
+    async def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        record("update")
+        raw, _ = self._update(filter, replacement, upsert, multi=False)
+        return UpdateResult(raw, True)
+
+    async def find_one_and_update(self, filter, update, projection=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE, **kwargs):
+        record("findAndModify", 1)
+        existing = self._matching(filter)[:1]
+        before = copy.deepcopy(existing[0][1]) if existing else None
+        _, after = self._update(filter, update, upsert, multi=False)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return None if doc is None else _project(doc, projection)
+
+    async def delete_one(self, filter, **kwargs):
+        record("delete")
+        found = self._matching(filter)[:1]
+        for seq, _ in found:
+            self._remove(seq)
+        return DeleteResult({"n": len(found), "ok": 1.0}, True)
+
+    async def delete_many(self, filter, **kwargs):
+        record("delete")
+        found = self._matching(filter)
+        for seq, _ in found:
+            self._remove(seq)
+        return DeleteResult({"n": len(found), "ok": 1.0}, True)
+
+    async def bulk_upsert(self, updates, ordered=True):
+        """The fake's side of storage.bulk_upsert(): one round trip of (filter, update) upserts."""
+        record("bulkWrite")
+        for filter, update in updates:
+            self._update(filter, update, True, multi=False)
+
+    def aggregate(self, pipeline, **kwargs):
+        def run():
+            docs = None
+            for stage in pipeline:
+                (name, spec), = stage.items()
+                if name == "$match":
+                    docs = [d for _, d in self._matching(spec)] if docs is None else [d for d in docs if matches(d, spec)]
+                    continue
+                if docs is None:
+                    docs = list(self._docs.values())
+                if name == "$group":
+                    docs = _group(docs, spec)
+                elif name == "$project":
+                    docs = _project_stage(docs, spec)
+                elif name == "$addFields" or name == "$set":
+                    docs = [{**d, **{k: _expr(v, d) for k, v in spec.items()}} for d in docs]
+                elif name == "$lookup":
+                    foreign = self.database[spec["from"]]
+                    docs = [{**d, spec["as"]: [
+                        f for _, f in foreign._matching({spec["foreignField"]: _get(d, spec["localField"])
+                                                         if _get(d, spec["localField"]) is not _MISSING else None})
+                    ]} for d in docs]
+                elif name == "$sort":
+                    docs = _sort_docs(list(docs), _sort_spec(spec))
+                elif name == "$limit":
+                    docs = docs[:spec]
+                elif name == "$skip":
+                    docs = docs[spec:]
+                elif name == "$unwind":
+                    docs = _unwind(docs, spec)
+                elif name == "$count":
+                    docs = [{spec: len(docs)}] if docs else []
+                else:
+                    raise OperationFailure(f"Unsupported aggregation stage {name} in the fake store")
+            return list(self._docs.values()) if docs is None else docs
+        return FakeCursor(run, command="aggregate")
+
+    async def create_indexes(self, indexes, **kwargs):
+        record("createIndexes")
+        names = []
+        for model in indexes:
+            spec = model.document
+            keys = list(spec["key"].keys())
+            name = spec.get("name") or "_".join(f"{k}_{v}" for k, v in spec["key"].items())
+            self._index_names[name] = dict(spec["key"])
+            if keys[0] not in self._indexes and keys[0] != "_id":
+                buckets = self._indexes[keys[0]] = {}
+                for seq, doc in self._docs.items():
+                    value = _get(doc, keys[0])
+                    key = None if value is _MISSING else value
+                    if _hashable(key):
+                        buckets.setdefault(key, set()).add(seq)
+            names.append(name)
+        return names
+
+    async def index_information(self):
+        return {name: {"key": list(key.items())} for name, key in self._index_names.items()}
+
+    async def drop(self):
+        self.database._collections.pop(self.name, None)
+
+
+class FakeDatabase:
+    def __init__(self, name):
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name) -> FakeCollection:
+        coll = self._collections.get(name)
+        if coll is None:
+            coll = self._collections[name] = FakeCollection(self, name)
+        return coll
+
+    def __getattr__(self, name) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self):
+        return list(self._collections)
+
+    async def command(self, command, *args, **kwargs):
+        if command == "ping" or command == {"ping": 1}:
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command {command!r} in the fake store")
+
+
+class FakeClient:
+    """Stands in for AsyncIOMotorClient: `client.trustigo` is a database."""
+
+    def __init__(self):
+        self._databases = {}
+
+    def __getitem__(self, name) -> FakeDatabase:
+        db = self._databases.get(name)
+        if db is None:
+            db = self._databases[name] = FakeDatabase(name)
+        return db
+
+    def __getattr__(self, name) -> FakeDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def close(self):
+        pass
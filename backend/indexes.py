@@ -0,0 +1,178 @@
+"""
+Index declarations for every collection, created idempotently at startup.
+
+HOT_QUERIES mirrors the filters and sorts the routes and scoring code actually
+issue. uncovered_queries() checks them against INDEXES without a server
+(equality fields must form an index prefix, followed by the sort keys);
+check_query_plans() explains each one on a live MongoDB and reports any that
+fall back to a collection scan, so a new query without a supporting index is
+caught early:
+
+    python -m backend.indexes --check
+"""
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from backend.storage import Database
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "transactions": [
+        # Behavior window range and a user's /transactions page in keyset order
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("transaction_id", DESCENDING)],
+                   name="user_id_date_transaction_id"),
+        # /transactions keyset order
+        IndexModel([("date", DESCENDING), ("transaction_id", DESCENDING)], name="date_transaction_id"),
+    ],
+    "returns": [
+        IndexModel([("user_id", ASCENDING), ("return_date", ASCENDING)], name="user_id_return_date"),
+    ],
+    "items": [
+        IndexModel([("item_id", ASCENDING)], name="item_id"),
+        IndexModel([("transaction_id", ASCENDING)], name="transaction_id"),
+    ],
+    "behavior_scores": [
+        # /fraud-users keyset order; also serves the risk_band range filter
+        IndexModel([("overall_risk_score", DESCENDING), ("user_id", ASCENDING)], name="overall_risk_score_user_id"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "return_violations": [
+        IndexModel([("user_id", ASCENDING), ("kind", ASCENDING)], name="user_id_kind"),
+    ],
+    "fraud_alerts": [
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_id_status"),
+        IndexModel([("date", DESCENDING)], name="date"),
+    ],
+}
+
+_SINCE = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# (label, collection, filter, sort) for the queries issued on request paths
+HOT_QUERIES = [
+    ("user detail", "users", {"user_id": 1}, None),
+    ("users page", "users", {"user_id": {"$gt": 1}}, [("user_id", ASCENDING)]),
+    ("behavior window txns", "transactions", {"user_id": 1, "date": {"$gte": _SINCE}}, None),
+    ("transactions page", "transactions", {}, [("date", DESCENDING), ("transaction_id", DESCENDING)]),
+    ("user transactions", "transactions", {"user_id": 1}, [("date", DESCENDING), ("transaction_id", DESCENDING)]),
+    ("behavior window returns", "returns", {"user_id": 1, "return_date": {"$gte": _SINCE}}, None),
+    ("rollup reclassify", "returns", {"user_id": {"$in": [1, 2]}}, None),
+    ("item category", "items", {"item_id": "ITM-1"}, None),
+    ("items per txn", "items", {"transaction_id": {"$in": ["TXN-1"]}}, None),
+    ("fraud-users page", "behavior_scores", {}, [("overall_risk_score", DESCENDING), ("user_id", ASCENDING)]),
+    ("fraud-users band", "behavior_scores", {"overall_risk_score": {"$gte": 60.0}},
+     [("overall_risk_score", DESCENDING), ("user_id", ASCENDING)]),
+    ("check-return features", "behavior_scores", {"user_id": 1}, None),
+    ("user alerts", "fraud_alerts", {"user_id": 1}, None),
+    ("user return violations", "return_violations", {"user_id": 1}, None),
+    ("active alert", "fraud_alerts", {"user_id": 1, "status": "Active"}, None),
+    ("alerts feed", "fraud_alerts", {}, [("date", DESCENDING)]),
+]
+
+
+def _is_equality(value) -> bool:
+    return not (isinstance(value, dict) and any(str(k).startswith("$") for k in value))
+
+
+def _covers(keys, query, sort) -> bool:
+    equality = {f for f, v in query.items() if _is_equality(v)}
+    ranges = [f for f, v in query.items() if not _is_equality(v)]
+    fields = [f for f, _ in keys]
+    if set(fields[:len(equality)]) != equality:
+        return False
+    rest = keys[len(equality):]
+    rest_fields = fields[len(equality):]
+    if sort:
+        if [f for f, _ in rest[:len(sort)]] != [f for f, _ in sort]:
+            return False
+        # A compound index can be walked backwards, so directions must all match or all flip
+        same = [d == sd for (_, d), (_, sd) in zip(rest, sort)]
+        if any(same) and not all(same):
+            return False
+    elif ranges and rest_fields[:1] != ranges[:1]:
+        return False
+    return all(f in rest_fields for f in ranges)
+
+
+def index_covers(collection: str, query: dict, sort=None) -> bool:
+    """Whether a declared index serves `query` (and `sort`) without a scan or in-memory sort."""
+    return any(_covers(list(model.document["key"].items()), query, sort)
+               for model in INDEXES.get(collection, []))
+
+
+def uncovered_queries():
+    """Labels of HOT_QUERIES that no declared index fully serves."""
+    return [label for label, collection, query, sort in HOT_QUERIES if not index_covers(collection, query, sort)]
+
+
+async def ensure_indexes(db: Database):
+    """create_indexes is a no-op for indexes that already exist with the same spec."""
+    for collection, models in INDEXES.items():
+        await db[collection].create_indexes(models)
+
+
+async def create_indexes_at_startup(db: Database):
+    try:
+        await ensure_indexes(db)
+    except PyMongoError:
+        logger.exception("Index creation failed; queries may fall back to collection scans")
+        return
+    logger.info("Indexes ensured on %d collections", len(INDEXES))
+
+
+def _plan_stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+async def check_query_plans(db: Database):
+    """Returns the labels of HOT_QUERIES whose winning plan contains a COLLSCAN."""
+    offenders = []
+    for label, collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explained = await cursor.limit(100).explain()
+        winning = explained.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _plan_stages(winning):
+            offenders.append(label)
+    return offenders
+
+
+async def _main(check: bool) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from backend.database import MONGO_URI
+
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        db = client.trustigo
+        await ensure_indexes(db)
+        print(f"Indexes ensured on {len(INDEXES)} collections")
+        if not check:
+            return 0
+        offenders = await check_query_plans(db)
+    finally:
+        client.close()
+    if offenders:
+        print(f"COLLSCAN in: {', '.join(offenders)}")
+        return 1
+    print(f"All {len(HOT_QUERIES)} hot queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main("--check" in sys.argv[1:])))
@@ -0,0 +1,90 @@
+"""
+Top-K risk leaderboard for the dashboard overview.
+
+run_analysis pushes every score it writes into a bounded min-heap. The heap
+holds the LEADERBOARD_SIZE highest (score, user_id) pairs, so each push is
+O(log K) and memory stays O(K) whatever the cohort size. Alongside it sit the
+constant-size counters the overview cards need: users scored, average score,
+risk bands and the 20-point histogram.
+
+The finished board is saved as a single `meta` document, so every worker serves
+/fraud-users/top with one small read and never sorts behavior_scores. Uploads
+delete it together with the scores it summarizes.
+"""
+import heapq
+import os
+from datetime import datetime
+
+from backend.storage import Database
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+LEADERBOARD_ID = "risk_leaderboard"
+
+# Fields of a behavior_scores document carried on each leaderboard entry
+ENTRY_FIELDS = ("user_id", "overall_risk_score", "engine_used", "risk_flag", "ring_size")
+HISTOGRAM_BINS = 5
+HISTOGRAM_WIDTH = 20.0
+
+
+class Leaderboard:
+    def __init__(self, size: int = LEADERBOARD_SIZE, medium_floor: float = 30.0, high_floor: float = 60.0):
+        self.size = size
+        self.medium_floor = medium_floor
+        self.high_floor = high_floor
+        # Min-heap of (score, -user_id, entry); the root is the entry to evict next,
+        # and lower user ids win ties, matching the /fraud-users order
+        self._heap = []
+        self.total_users = 0
+        self.score_sum = 0.0
+        self.bands = {"low": 0, "medium": 0, "high": 0}
+        self.histogram = [0] * HISTOGRAM_BINS
+
+    def push(self, score_doc: dict):
+        score = score_doc["overall_risk_score"]
+        self.total_users += 1
+        self.score_sum += score
+        if score >= self.high_floor:
+            self.bands["high"] += 1
+        elif score >= self.medium_floor:
+            self.bands["medium"] += 1
+        else:
+            self.bands["low"] += 1
+        self.histogram[min(max(int(score // HISTOGRAM_WIDTH), 0), HISTOGRAM_BINS - 1)] += 1
+
+        key = (score, -score_doc["user_id"])
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, (*key, {f: score_doc.get(f) for f in ENTRY_FIELDS}))
+        elif key > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, (*key, {f: score_doc.get(f) for f in ENTRY_FIELDS}))
+
+    def top(self):
+        """Entries by score descending, user_id ascending."""
+        return [entry for *_, entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+    def to_doc(self, config_version: str) -> dict:
+        return {
+            "config_version": config_version,
+            "generated_at": datetime.utcnow(),
+            "size": self.size,
+            "total_users": self.total_users,
+            "avg_risk_score": self.score_sum / self.total_users if self.total_users else 0.0,
+            "bands": self.bands,
+            "histogram": self.histogram,
+            "top": self.top(),
+        }
+
+
+async def save_leaderboard(db: Database, board: Leaderboard, config_version: str):
+    await db.meta.update_one({"_id": LEADERBOARD_ID}, {"$set": board.to_doc(config_version)}, upsert=True)
+
+
+async def read_leaderboard(db: Database, limit: int):
+    """The saved board with `top` cut to `limit`, or None before the first analysis."""
+    doc = await db.meta.find_one({"_id": LEADERBOARD_ID}, {"_id": 0})
+    if doc is not None:
+        doc["top"] = doc["top"][:limit]
+    return doc
+
+
+async def clear_leaderboard(db: Database):
+    await db.meta.delete_many({"_id": LEADERBOARD_ID})
@@ -0,0 +1,55 @@
+"""
+Opt-in lean serialization for large list responses (`?lean=true`).
+
+FastAPI normally validates every returned document against the route's
+response_model and then JSON-encodes the result. For trusted documents straight
+from our own collections that is pure overhead: lean mode projects the query
+down to the schema's fields in MongoDB and encodes the raw dicts in one call.
+Fields a document lacks are filled with the model's defaults, as validation
+would have done.
+Uses orjson when installed and falls back to the standard library.
+"""
+import json
+from datetime import datetime
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def schema_projection(schema) -> dict:
+    projection = {f: 1 for f in schema.model_fields}
+    projection["_id"] = 0
+    return projection
+
+
+def fill_defaults(rows: list, schema) -> list:
+    defaults = {
+        name: field.get_default(call_default_factory=True)
+        for name, field in schema.model_fields.items() if not field.is_required()
+    }
+    if not defaults:
+        return rows
+    return [{**defaults, **row} for row in rows]
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class LeanJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
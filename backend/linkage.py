@@ -0,0 +1,179 @@
+"""
+Account linkage: groups users into rings that share a device fingerprint or an
+IP address.
+
+Every transaction is folded in as it is ingested. The inverted indexes map each
+device/IP to the users seen on it. A new user on a known key is unioned with
+that key's first user, so linking is O(α(n)) per transaction and never compares
+accounts pairwise. Ring-level counters (members, orders, returns, refunds) live
+on the union-find root and are summed when two rings merge, so ring features are
+O(1) lookups at scoring time.
+
+Keys seen on more than MAX_USERS_PER_KEY accounts (shared NAT/proxy IPs, default
+fingerprints) stop linking new users, so one busy key can't collapse the whole
+cohort into a single ring.
+
+The state is per process, like the real-time feature cache, and is tagged with
+the data generation (backend/response_cache.py) it was built for. Uploads rebuild
+it from the parsed CSV. A process whose generation is stale, because another
+worker uploaded since, rebuilds it with one pass over transactions and one over
+returns before it is used.
+"""
+import os
+
+from backend.response_cache import current_generation
+from backend.storage import Database
+
+MAX_USERS_PER_KEY = int(os.getenv("LINKAGE_MAX_USERS_PER_KEY", "50"))
+
+# Model defaults and common placeholders carry no identity
+PLACEHOLDERS = {"", "unknown", "0.0.0.0", "none", "nan", "null"}
+KEY_FIELDS = ("device_fingerprint", "ip_address")
+
+
+class UnionFind:
+    """Disjoint sets over user ids with union by size and path halving."""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def add(self, x):
+        if x not in self.parent:
+            self.parent[x] = x
+            self.size[x] = 1
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        """Returns (root, absorbed root) or None if already joined."""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return None
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        return ra, rb
+
+    def __len__(self):
+        return len(self.parent)
+
+
+class RingStats:
+    __slots__ = ("ring_id", "orders", "returns", "refund", "spent")
+
+    def __init__(self, user_id):
+        self.ring_id = user_id
+        self.orders = 0
+        self.returns = 0
+        self.refund = 0.0
+        self.spent = 0.0
+
+    def absorb(self, other: "RingStats"):
+        self.ring_id = min(self.ring_id, other.ring_id)
+        self.orders += other.orders
+        self.returns += other.returns
+        self.refund += other.refund
+        self.spent += other.spent
+
+
+class LinkageIndex:
+    def __init__(self, max_users_per_key: int = MAX_USERS_PER_KEY):
+        self.max_users_per_key = max_users_per_key
+        self.sets = UnionFind()
+        # (field, value) -> user ids seen with it, in first-seen order
+        self.users_by_key = {}
+        self._stats = {}
+        # Data generation the index reflects; None until built
+        self.generation = None
+
+    def reset(self):
+        self.__init__(self.max_users_per_key)
+
+    def _add_user(self, user_id):
+        # Stats are kept per root only; membership lives in the union-find
+        if user_id not in self.sets.parent:
+            self.sets.add(user_id)
+            self._stats[user_id] = RingStats(user_id)
+
+    def _link(self, user_id, key):
+        users = self.users_by_key.get(key)
+        if users is None:
+            self.users_by_key[key] = {user_id: None}
+            return
+        if user_id in users or len(users) >= self.max_users_per_key:
+            return
+        users[user_id] = None
+        merged = self.sets.union(next(iter(users)), user_id)
+        if merged:
+            root, absorbed = merged
+            self._stats[root].absorb(self._stats.pop(absorbed))
+
+    def add_transaction(self, txn: dict):
+        user_id = txn["user_id"]
+        self._add_user(user_id)
+        for field in KEY_FIELDS:
+            value = txn.get(field)
+            if value is not None and str(value).strip().lower() not in PLACEHOLDERS:
+                self._link(user_id, (field, value))
+        stats = self._stats[self.sets.find(user_id)]
+        stats.orders += 1
+        stats.spent += float(txn.get("total_amount") or 0.0)
+
+    def add_return(self, ret: dict):
+        user_id = ret["user_id"]
+        self._add_user(user_id)
+        stats = self._stats[self.sets.find(user_id)]
+        stats.returns += 1
+        stats.refund += float(ret.get("refund_amount") or 0.0)
+
+    def ingest(self, txns, returns):
+        for txn in txns:
+            self.add_transaction(txn)
+        for ret in returns:
+            self.add_return(ret)
+
+    def ring_features(self, user_id) -> dict:
+        """Features of the ring `user_id` belongs to; a user with no links is a ring of one."""
+        if user_id not in self.sets.parent:
+            return {"ring_id": user_id, "ring_size": 1, "ring_return_rate": 0.0, "ring_refund_ratio": 0.0}
+        root = self.sets.find(user_id)
+        stats = self._stats[root]
+        return {
+            "ring_id": stats.ring_id,
+            "ring_size": self.sets.size[root],
+            "ring_return_rate": stats.returns / stats.orders if stats.orders else 0.0,
+            "ring_refund_ratio": stats.refund / stats.spent if stats.spent > 0 else 0.0,
+        }
+
+    def rings(self, min_size: int = 2):
+        """[(ring features, member ids)] for rings of at least `min_size`, largest first."""
+        members = {}
+        for user_id in self.sets.parent:
+            members.setdefault(self.sets.find(user_id), []).append(user_id)
+        out = [(self.ring_features(root), sorted(ids)) for root, ids in members.items() if len(ids) >= min_size]
+        return sorted(out, key=lambda r: r[0]["ring_size"], reverse=True)
+
+
+linkage = LinkageIndex()
+
+
+async def ensure_linkage(db: Database):
+    """Rebuilds the index from storage if it was built for an older data generation."""
+    generation = await current_generation(db)
+    if linkage.generation == generation:
+        return linkage
+    linkage.reset()
+    txns = db.transactions.find({}, {"_id": 0, "user_id": 1, "total_amount": 1, **{f: 1 for f in KEY_FIELDS}})
+    async for txn in txns.batch_size(10000):
+        linkage.add_transaction(txn)
+    async for ret in db.returns.find({}, {"_id": 0, "user_id": 1, "refund_amount": 1}).batch_size(10000):
+        linkage.add_return(ret)
+    linkage.generation = generation
+    return linkage
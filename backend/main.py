@@ -1,21 +1,32 @@
-import os
+import asyncio
 from dotenv import load_dotenv
 load_dotenv()  # This must happen before we initialize other config variables
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
 from contextlib import asynccontextmanager
-from motor.motor_asyncio import AsyncIOMotorClient
 from backend.database import db_state
-from backend.routes import users, transactions, fraud
-
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+from backend.indexes import create_indexes_at_startup
+from backend.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
+from backend.preload import PRELOAD, preload_heavy_modules
+from backend.realtime import warm_up
+from backend.response_cache import response_cache_middleware
+from backend.routes import users, transactions, fraud, rules, archive
+from backend.storage import create_client
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Connect to Real MongoDB (Local or Atlas)
-    db_state.client = AsyncIOMotorClient(MONGO_URI)
+    db_state.client = create_client()
+    await create_indexes_at_startup(db_state.client.trustigo)
+    # Preload per-user features and the anomaly model for /check-return in the background
+    warm_task = asyncio.create_task(warm_up(db_state.client.trustigo))
+    preload_task = asyncio.create_task(preload_heavy_modules()) if PRELOAD else None
     yield
+    warm_task.cancel()
+    if preload_task:
+        preload_task.cancel()
     # Shutdown: Close connection
     db_state.client.close()
 
@@ -26,18 +37,31 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Registered before CORS so cached and 304 responses still get CORS headers
+app.add_middleware(BaseHTTPMiddleware, dispatch=response_cache_middleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], 
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# Outermost, so cache hits and CORS preflights are timed too
+app.add_middleware(MetricsMiddleware)
+
 # Mount Routes
 app.include_router(users.router, tags=["Users"])
 app.include_router(transactions.router, tags=["Transactions"])
 app.include_router(fraud.router, tags=["Fraud & Machine Learning"])
+app.include_router(rules.router, tags=["Rules Configuration"])
+app.include_router(archive.router, tags=["Archive"])
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,228 @@
+"""
+In-process metrics in the Prometheus text exposition format, served on /metrics.
+
+Kept dependency-free and cheap enough to leave on: recording a sample is a
+bisect plus a few additions under a lock. Label sets are bounded: HTTP metrics
+are labelled with the route template (e.g. /user/{user_id}), never the raw path.
+
+    with span("analysis.anomaly"):       # stage latency histogram
+        ...
+    timer = StageTimer("upload")         # consecutive stages of one pipeline
+    timer.lap("decode"); ...; timer.lap("read_csv")
+    with track_job("analysis"):          # in-flight gauge, duration and outcome
+        ...
+
+Each request is also wrapped in db_stats.track_db() to count database round trips.
+"""
+import threading
+import time
+from bisect import bisect_left
+import logging
+from contextlib import contextmanager
+
+from backend import db_stats
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond cache hits up to multi-minute analysis runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000, 10000, 100000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in sorted(items):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, (list(v[0]), v[1])) for k, v in self._values.items()]
+        for key, (counts, total) in sorted(items):
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, (le,))} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+
+registry = []
+
+HTTP_REQUESTS = Counter("trustigo_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+HTTP_SECONDS = Histogram("trustigo_http_request_duration_seconds", "HTTP request latency, including streamed bodies.", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("trustigo_http_requests_in_flight", "HTTP requests currently being served.")
+STAGE_SECONDS = Histogram("trustigo_stage_duration_seconds", "Duration of instrumented pipeline stages.", ("stage",))
+JOBS_IN_PROGRESS = Gauge("trustigo_jobs_in_progress", "Upload/analysis jobs currently running.", ("job",))
+JOB_RUNS = Counter("trustigo_job_runs_total", "Completed jobs by outcome.", ("job", "outcome"))
+JOB_SECONDS = Histogram("trustigo_job_duration_seconds", "End-to-end job duration.", ("job",))
+ROWS_INGESTED = Counter("trustigo_rows_ingested_total", "Records written by CSV ingestion, by collection.", ("collection",))
+USERS_SCORED = Counter("trustigo_users_scored_total", "Users scored by analysis runs.")
+DB_ROUND_TRIPS = Histogram("trustigo_db_round_trips_per_request", "Database commands issued while serving one request.", ("method", "route"), COUNT_BUCKETS)
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+class StageTimer:
+    """Times consecutive stages: each lap() closes the stage that began at the previous lap."""
+
+    def __init__(self, job: str):
+        self.job = job
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        STAGE_SECONDS.observe(now - self._last, stage=f"{self.job}.{stage}")
+        self._last = now
+
+
+@contextmanager
+def track_job(job: str):
+    JOBS_IN_PROGRESS.inc(job=job)
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        JOBS_IN_PROGRESS.dec(job=job)
+        JOB_SECONDS.observe(time.perf_counter() - start, job=job)
+        JOB_RUNS.inc(job=job, outcome=outcome)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed until their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _route(scope):
+        # Set by the router, or restored by the response cache on a hit
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        with db_stats.track_db() as stats:
+            async def send_wrapper(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if db_stats.DEBUG:
+                        message["headers"] = list(message.get("headers", [])) + db_stats.response_headers(stats)
+                await send(message)
+
+            HTTP_IN_FLIGHT.inc()
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - start
+                HTTP_IN_FLIGHT.dec()
+                route = self._route(scope)
+                HTTP_SECONDS.observe(elapsed, method=scope["method"], route=route)
+                HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status)
+                DB_ROUND_TRIPS.observe(stats.round_trips, method=scope["method"], route=route)
+                if db_stats.DEBUG:
+                    logger.info("%s %s: %d db round trips, %d docs, %.1f ms in db %s",
+                                scope["method"], scope["path"], stats.round_trips, stats.docs,
+                                stats.duration_ms, stats.by_command)
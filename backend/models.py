@@ -1,7 +1,17 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 from typing import Optional, List
 
+CASH_ON_DELIVERY = "COD"
+# Spellings of cash on delivery seen in marketplace exports, lowercased
+COD_ALIASES = {"cod", "cash on delivery", "cash-on-delivery", "cash_on_delivery", "pay on delivery"}
+
+def normalize_payment_method(value):
+    """Maps every cash-on-delivery spelling to CASH_ON_DELIVERY, which the scorers check for."""
+    if isinstance(value, str) and value.strip().lower() in COD_ALIASES:
+        return CASH_ON_DELIVERY
+    return value
+
 class User(BaseModel):
     user_id: int
     name: str = Field(default="Unknown Shopper")
@@ -18,12 +28,15 @@ class Transaction(BaseModel):
     device_fingerprint: str = "unknown"
     shipping_address_risk: str = "Low"
 
+    _normalize_payment = field_validator("payment_method")(normalize_payment_method)
+
 class Item(BaseModel):
     item_id: str
     transaction_id: str
     name: str = ""
     price: float = 0.0
     category: str = "Unknown"
+    quantity: int = 1
 
 class Return(BaseModel):
     return_id: str
@@ -48,6 +61,24 @@ class BehaviorScore(BaseModel):
     anomaly_score: float = 0.0
     overall_risk_score: float = 0.0
     engine_used: str = "Engine 1: Behavioral"
+    config_version: Optional[str] = None
+    ring_id: Optional[int] = None
+    ring_size: int = 1
+    ring_return_rate: float = 0.0
+    ring_refund_ratio: float = 0.0
+    duplicate_return_count: int = 0
+    refund_overage_count: int = 0
+    backdated_return_count: int = 0
+
+class ReturnViolation(BaseModel):
+    kind: str
+    user_id: int
+    transaction_id: str
+    item_id: str
+    refund_amount: float = 0.0
+    price: Optional[float] = None
+    return_date: datetime
+    detected_at: datetime = Field(default_factory=datetime.utcnow)
 
 class FraudAlert(BaseModel):
     user_id: int
@@ -55,3 +86,4 @@ class FraudAlert(BaseModel):
     risk_score: float = 0.0
     primary_reason: str = ""
     status: str = "Active"
+    config_version: Optional[str] = None
@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination helpers. A cursor is the sort key of the last row
+of the previous page, base64-encoded so clients treat it as opaque. The next
+page is a range query on an index instead of a growing .skip().
+"""
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Accepted types for each cursor position; values go straight into query filters,
+# so anything else (a dict would smuggle in operators) is rejected
+NUMBER = (int, float)
+INT = (int,)
+STR = (str,)
+
+
+def encode_cursor(*values) -> str:
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> list:
+    """Cursor values, one per entry of `types` (e.g. NUMBER, INT); 400 if any doesn't match."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+    for value, allowed in zip(values, types):
+        # bool is an int subclass but never a valid sort key here
+        if isinstance(value, bool) or not isinstance(value, allowed):
+            raise HTTPException(status_code=400, detail="Malformed cursor")
+    return values
+
+
+def parse_datetime(value) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+
+
+def build_projection(fields, allowed, required):
+    """
+    Turns a comma-separated `fields` query param into a Mongo projection. Fields
+    needed for the cursor are always included. Returns None when no fields are requested.
+    """
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(wanted) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    projection = {f: 1 for f in list(required) + wanted}
+    projection["_id"] = 0
+    return projection
+
+
+def descending_after(key: str, tie: str, key_value, tie_value, tie_descending: bool) -> dict:
+    """Filter for rows strictly after (key_value, tie_value) in a key-descending sort."""
+    tie_op = "$lt" if tie_descending else "$gt"
+    return {"$or": [
+        {key: {"$lt": key_value}},
+        {key: key_value, tie: {tie_op: tie_value}},
+    ]}
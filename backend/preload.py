@@ -0,0 +1,39 @@
+"""
+Deferred heavy dependencies.
+
+pandas, scikit-learn and pyarrow make up most of the import cost of the app, so
+they are imported inside the functions that need them: CSV ingestion, anomaly
+model fitting and cold storage. Importing backend.main and serving the dashboard
+reads never loads them, which keeps cold starts short.
+
+Long-lived workers can set PRELOAD_HEAVY_MODULES=1 to import them in a
+background thread at startup, so the first upload or analysis doesn't pay for
+it. benchmarks/import_time.py fails if any of them leaks back into the app's
+import graph.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+PRELOAD = os.getenv("PRELOAD_HEAVY_MODULES", "0") == "1"
+
+HEAVY_MODULES = ("pandas", "sklearn.ensemble", "pyarrow.parquet", "pyarrow.dataset")
+
+
+def import_heavy_modules():
+    start = time.perf_counter()
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    logger.info("Preloaded %s in %.2fs", ", ".join(HEAVY_MODULES), time.perf_counter() - start)
+
+
+async def preload_heavy_modules():
+    """Startup hook; runs the imports on a worker thread so the event loop keeps serving."""
+    try:
+        await asyncio.to_thread(import_heavy_modules)
+    except ImportError:
+        logger.exception("Preloading heavy modules failed; they will load on first use")
@@ -0,0 +1,243 @@
+"""
+Real-time pre-refund scoring: folds one incoming return into the user's last
+computed feature counters and applies the active rule config and anomaly model,
+without touching the raw transactions/returns collections.
+
+The feature cache and the compiled anomaly model are per process. An analysis
+run stores its model in the `meta` collection, and every worker compares the
+shared data generation (backend/response_cache.py) before serving a check. When
+another worker has uploaded or re-scored since, the worker drops its cached
+features and loads the stored model, which needs no scikit-learn.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from backend.anomaly_model import anomaly_state, score_single_anomaly, train_and_predict_anomaly
+from backend.models import CASH_ON_DELIVERY
+from backend.response_cache import current_generation
+from backend.rule_config import ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER, get_rules
+from backend.storage import Database
+
+logger = logging.getLogger(__name__)
+
+FEATURE_CACHE_SIZE = int(os.getenv("REALTIME_FEATURE_CACHE_SIZE", "200000"))
+# Refit the anomaly model at startup when none is stored (databases scored before it was)
+FIT_ON_START = os.getenv("REALTIME_FIT_ON_START", "0") == "1"
+MODEL_ID = "anomaly_model"
+
+# Fields of a behavior_scores document the real-time path needs
+SNAPSHOT_FIELDS = (
+    "user_id", "payment_risk_score", "anomaly_score", "txns_count",
+    "fast_return_count", "high_value_return_count",
+    "items_bought", "returns_count", "total_spent", "total_refund",
+    "total_return_days", "risky_returns_count",
+    "ring_size", "ring_return_rate", "ring_refund_ratio",
+    "duplicate_return_count", "refund_overage_count", "backdated_return_count",
+)
+
+
+class FeatureCache:
+    """Bounded LRU of user_id -> precomputed feature counters."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = OrderedDict()
+
+    def get(self, user_id):
+        doc = self._data.get(user_id)
+        if doc is not None:
+            self._data.move_to_end(user_id)
+        return doc
+
+    def put(self, user_id, doc):
+        self._data[user_id] = doc
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+feature_cache = FeatureCache(FEATURE_CACHE_SIZE)
+
+
+class RealtimeState:
+    # Data generation the cache and model in this process belong to
+    generation = None
+
+
+realtime_state = RealtimeState()
+
+
+def mark_current(generation: int):
+    """Called by the worker that just changed the data and refreshed the cache/model itself."""
+    realtime_state.generation = generation
+
+
+async def save_anomaly_model(db: Database):
+    doc = anomaly_state.to_doc()
+    if doc is None:
+        await db.meta.delete_many({"_id": MODEL_ID})
+    else:
+        await db.meta.update_one({"_id": MODEL_ID}, {"$set": doc}, upsert=True)
+
+
+async def sync_with_generation(db: Database):
+    """Drops cached features and reloads the stored model if the data changed in another worker."""
+    generation = await current_generation(db)
+    if generation == realtime_state.generation:
+        return
+    feature_cache.clear()
+    anomaly_state.load(await db.meta.find_one({"_id": MODEL_ID}))
+    realtime_state.generation = generation
+
+
+def _slim(doc):
+    return {k: doc.get(k) for k in SNAPSHOT_FIELDS}
+
+
+def prime_feature_cache(scored_rows):
+    """Called after a batch analysis so the next checks hit memory, not Mongo."""
+    feature_cache.clear()
+    for row in scored_rows:
+        feature_cache.put(row["user_id"], _slim(row))
+
+
+async def get_user_features(db: Database, user_id: int):
+    """Returns (counters dict or None, source) where source is cache/database/cold-start."""
+    await sync_with_generation(db)
+    doc = feature_cache.get(user_id)
+    if doc is not None:
+        return doc, "cache"
+    projection = {k: 1 for k in SNAPSHOT_FIELDS}
+    projection["_id"] = 0
+    doc = await db.behavior_scores.find_one({"user_id": user_id}, projection)
+    if doc is None:
+        return None, "cold-start"
+    doc = _slim(doc)
+    feature_cache.put(user_id, doc)
+    return doc, "database"
+
+
+def _naive_utc(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def project_features(base, ret, rules):
+    """
+    Mirrors calculate_user_behavior_metrics for the user's history plus the
+    incoming return `ret` (a ReturnCheckIn dump).
+    """
+    settings = rules.features
+    base = base or {}
+    refund = float(ret.get("refund_amount") or 0.0)
+
+    txns_count = int(base.get("txns_count") or 0)
+    returns_count = int(base.get("returns_count") or 0) + 1
+    # The returned item was bought, even if its purchase isn't in the window yet
+    items_bought = max(int(base.get("items_bought") or 0), returns_count)
+    total_spent = float(base.get("total_spent") or 0.0)
+    if total_spent <= 0:
+        total_spent = refund
+    total_refund = float(base.get("total_refund") or 0.0) + refund
+
+    total_days = float(base.get("total_return_days") or 0.0)
+    fast = 0
+    purchase_date = _naive_utc(ret.get("purchase_date"))
+    return_date = _naive_utc(ret.get("return_date")) or datetime.utcnow()
+    if purchase_date is not None:
+        diff = (return_date - purchase_date).days
+        total_days += diff
+        fast = 1 if diff <= settings.fast_return_days else 0
+
+    risky = int(base.get("risky_returns_count") or 0)
+    if ret.get("category") in settings.risky_categories:
+        risky += 1
+
+    # The stored score already covers ingested orders; take the max with this
+    # order's own risk rather than adding, so an ingested order isn't counted twice
+    order_risk = 0.0
+    if ret.get("payment_method") == CASH_ON_DELIVERY:
+        order_risk += settings.cod_payment_risk
+    if ret.get("shipping_address_risk") == "High":
+        order_risk += settings.high_risk_shipping_risk
+    payment_risk = max(float(base.get("payment_risk_score") or 0.0), order_risk)
+
+    features = {
+        "user_id": ret["user_id"],
+        "return_rate_90d": returns_count / items_bought,
+        "avg_return_time_days": total_days / returns_count,
+        # Stored fast/high-value counts are plain counters; add this return
+        "fast_return_count": int(base.get("fast_return_count") or 0) + fast,
+        "high_value_return_count": int(base.get("high_value_return_count") or 0)
+        + (1 if refund > settings.high_value_amount else 0),
+        "refund_value_ratio": total_refund / total_spent if total_spent > 0 else 0.0,
+        "category_risk_score": min(risky / returns_count, 1.0) * 100,
+        "payment_risk_score": min(payment_risk, 100.0),
+        "txns_count": txns_count,
+        "engine_used": ENGINE_FIRST_ORDER if txns_count <= settings.first_order_max_txns else ENGINE_BEHAVIORAL,
+        # Ring membership comes from the last analysis run
+        "ring_size": int(base.get("ring_size") or 1),
+        "ring_return_rate": float(base.get("ring_return_rate") or 0.0),
+        "ring_refund_ratio": float(base.get("ring_refund_ratio") or 0.0),
+        "duplicate_return_count": int(base.get("duplicate_return_count") or 0),
+        "refund_overage_count": int(base.get("refund_overage_count") or 0),
+        "backdated_return_count": int(base.get("backdated_return_count") or 0),
+    }
+    features["anomaly_score"] = score_single_anomaly(features)
+    return features
+
+
+def score_return(base, ret, rules=None):
+    rules = rules or get_rules()
+    features = project_features(base, ret, rules)
+    X = rules.feature_matrix([features])
+    first_order = np.array([features["engine_used"] == ENGINE_FIRST_ORDER])
+    risk = round(float(rules.risk(X, first_order)[0]), 2)
+    mask = rules.reason_mask(X, first_order)[0]
+    reasons = [label for label, hit in zip(rules.reason_labels, mask) if hit]
+    return {
+        "user_id": ret["user_id"],
+        "risk_score": risk,
+        "decision": "Block" if risk > rules.alert_threshold else "Allow",
+        "reasons": reasons,
+        "reasoning": ", ".join(reasons) if reasons else "Normal Pattern",
+        "engine_used": features["engine_used"],
+        "anomaly_score": round(features["anomaly_score"], 4),
+        "config_version": rules.version,
+    }
+
+
+async def warm_up(db: Database):
+    """
+    Startup hook: loads the stored anomaly model and feature snapshot. Nothing is
+    fitted here unless REALTIME_FIT_ON_START=1 and no model is stored.
+    """
+    projection = {k: 1 for k in SNAPSHOT_FIELDS}
+    projection["_id"] = 0
+    try:
+        await sync_with_generation(db)
+        docs = await db.behavior_scores.find({}, projection).to_list(length=FEATURE_CACHE_SIZE)
+    except Exception:
+        logger.exception("Real-time warm-up skipped: could not read the stored scores")
+        return
+    for doc in docs:
+        feature_cache.put(doc["user_id"], _slim(doc))
+    if FIT_ON_START and anomaly_state.forest is None and docs:
+        # Off the event loop: the fit (and its first scikit-learn import) takes seconds
+        await asyncio.to_thread(train_and_predict_anomaly, docs, get_rules().config.anomaly)
+        await save_anomaly_model(db)
+    logger.info("Real-time scorer warmed with %d users", len(docs))
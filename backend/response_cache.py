@@ -0,0 +1,191 @@
+"""
+Response cache for the dashboard read endpoints.
+
+Entries are keyed on a data-generation counter that upload_csv and run_analysis
+bump, and on the active rules version, so nothing is ever invalidated
+explicitly: a bump or a rules edit simply makes every old key unreachable. The
+counter lives in the `meta` collection so all workers agree on it; each worker
+re-reads it at most every RESPONSE_CACHE_GENERATION_TTL seconds. Responses
+carry an ETag and honour If-None-Match with a 304.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+from pymongo import ReturnDocument
+from starlette.requests import Request
+from starlette.responses import Response
+
+from backend.database import db_state
+from backend.rule_config import get_rules
+from backend.storage import Database
+
+CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+CACHE_WARM = os.getenv("RESPONSE_CACHE_WARM", "0") == "1"
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+GENERATION_TTL = float(os.getenv("RESPONSE_CACHE_GENERATION_TTL", "1.0"))
+
+# GET paths (prefix match) whose responses only change after an upload or analysis
+CACHED_PREFIXES = ("/fraud-users", "/analytics-summary", "/analytics-sketches", "/user/")
+# Hit right after an analysis when RESPONSE_CACHE_WARM=1
+WARM_PATHS = ("/fraud-users", "/analytics-summary")
+
+
+# Response headers that are part of the payload and must survive a cache hit
+KEPT_HEADERS = ("x-next-cursor",)
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "media_type", "headers", "route")
+
+    def __init__(self, body: bytes, etag: str, media_type: str, headers: dict, route=None):
+        self.body = body
+        self.etag = etag
+        self.media_type = media_type
+        self.headers = headers
+        # Matched route, restored on hits so outer middleware can still label the request
+        self.route = route
+
+
+class ResponseCache:
+    """LRU bounded by both entry count and total body bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def put(self, key, entry: CachedResponse):
+        # One huge list shouldn't flush everything else
+        if len(entry.body) > self.max_bytes // 4:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.size -= len(old.body)
+        self._data[key] = entry
+        self.size += len(entry.body)
+        while self._data and (len(self._data) > self.max_entries or self.size > self.max_bytes):
+            _, evicted = self._data.popitem(last=False)
+            self.size -= len(evicted.body)
+
+    def clear(self):
+        self._data.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+class GenerationState:
+    value = 0
+    checked_at = 0.0
+
+
+response_cache = ResponseCache(MAX_ENTRIES, MAX_BYTES)
+generation_state = GenerationState()
+
+
+async def current_generation(db: Database) -> int:
+    now = time.monotonic()
+    if now - generation_state.checked_at >= GENERATION_TTL:
+        doc = await db.meta.find_one({"_id": "data_generation"})
+        generation_state.value = doc["value"] if doc else 0
+        generation_state.checked_at = now
+    return generation_state.value
+
+
+async def bump_generation(db: Database) -> int:
+    """Called after anything that changes what the cached endpoints would return."""
+    doc = await db.meta.find_one_and_update(
+        {"_id": "data_generation"},
+        {"$inc": {"value": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    generation_state.value = doc["value"]
+    generation_state.checked_at = time.monotonic()
+    response_cache.clear()
+    return generation_state.value
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+async def response_cache_middleware(request: Request, call_next):
+    path = request.url.path
+    if not CACHE_ENABLED or request.method != "GET" or not path.startswith(CACHED_PREFIXES):
+        return await call_next(request)
+
+    generation = await current_generation(db_state.client.trustigo)
+    # Reads apply the live thresholds and bands, so a rules edit changes responses too
+    rules_version = get_rules().version
+    key = (generation, rules_version, path, tuple(sorted(request.query_params.multi_items())))
+    entry = response_cache.get(key)
+    status = "HIT"
+
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        entry = CachedResponse(
+            body,
+            f'"{generation}-{rules_version}-{digest}"',
+            response.headers.get("content-type", "application/json"),
+            {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers},
+            request.scope.get("route"),
+        )
+        response_cache.put(key, entry)
+        status = "MISS"
+    elif entry.route is not None:
+        request.scope["route"] = entry.route
+
+    headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": status}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, headers=headers, media_type=entry.media_type)
+
+
+async def _asgi_get(app, path: str):
+    """Issues an in-process GET through the full middleware stack, discarding the body."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"cache-warmer")],
+        "client": ("127.0.0.1", 0), "server": ("cache-warmer", 80),
+    }
+    sent = False
+    never = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await never.wait()
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def warm_cache(app):
+    for path in WARM_PATHS:
+        await _asgi_get(app, path)
@@ -0,0 +1,126 @@
+"""
+Return integrity checks run while a CSV is ingested.
+
+Each incoming return is checked against hash indexes built from the same upload,
+in O(1):
+
+    purchases  (transaction_id, item_id) -> (price paid, purchase date)
+    units      (transaction_id, item_id) -> units bought on that order line
+    returned   (transaction_id, item_id) -> units refunded so far
+
+and flagged as
+
+    duplicate_return         more units of an order line returned than were bought
+    refund_over_price        refund above the price paid (beyond REFUND_TOLERANCE, for rounding/fees)
+    return_before_purchase   a return dated before the purchase it refunds
+
+A line's units are its largest stated quantity when the export has a quantity
+column. Without one, each row of a line without a return is one more unit, and a
+repeated row that carries a return adds none: it restates a line already bought
+to record its return, so a second returned row of a one-unit line is flagged as
+a duplicate.
+
+Duplicates are kept out of the returns collection as before, but they are no
+longer dropped silently. Every violation is stored in return_violations. Analysis
+adds per-user counts to the feature vector (duplicate_return_count,
+refund_overage_count, backdated_return_count), where reason rules turn them into
+reasoning labels.
+"""
+import os
+from datetime import datetime, timezone
+
+from backend.storage import Database
+
+DUPLICATE_RETURN = "duplicate_return"
+REFUND_OVER_PRICE = "refund_over_price"
+RETURN_BEFORE_PURCHASE = "return_before_purchase"
+
+# Feature name per violation kind
+FEATURES = {
+    DUPLICATE_RETURN: "duplicate_return_count",
+    REFUND_OVER_PRICE: "refund_overage_count",
+    RETURN_BEFORE_PURCHASE: "backdated_return_count",
+}
+
+REFUND_TOLERANCE = float(os.getenv("REFUND_TOLERANCE", "0.01"))
+
+
+def _utc(dt):
+    # Exports mix naive and offset timestamps; naive ones are taken as UTC
+    return dt.astimezone(timezone.utc) if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+class ReturnLedger:
+    def __init__(self, tolerance: float = REFUND_TOLERANCE):
+        self.tolerance = tolerance
+        self.purchases = {}
+        self.units = {}
+        self.returned = {}
+
+    def add_purchase(self, transaction_id: str, item_id: str, price: float, purchased_at, quantity: int = None,
+                     returned: bool = False):
+        """
+        `quantity` is the row's stated quantity, or None if the export has no quantity
+        column; `returned` says whether the row carries a return.
+        """
+        key = (transaction_id, item_id)
+        self.purchases.setdefault(key, (price, purchased_at))
+        units = self.units.get(key, 0)
+        if quantity is not None:
+            self.units[key] = max(units, quantity)
+        elif not (returned and units):
+            self.units[key] = units + 1
+
+    def bought_units(self, transaction_id: str, item_id: str) -> int:
+        return self.units.get((transaction_id, item_id), 0)
+
+    def returned_units(self, transaction_id: str, item_id: str) -> int:
+        return self.returned.get((transaction_id, item_id), 0)
+
+    def price(self, transaction_id: str, item_id: str):
+        purchase = self.purchases.get((transaction_id, item_id))
+        return purchase[0] if purchase else None
+
+    def check(self, transaction_id: str, item_id: str, refund: float, returned_at):
+        """Returns the violation kinds for this return and records it as returned."""
+        key = (transaction_id, item_id)
+        kinds = []
+        if self.returned.get(key, 0) >= self.units.get(key, 1):
+            kinds.append(DUPLICATE_RETURN)
+        purchase = self.purchases.get(key)
+        if purchase is not None:
+            price, purchased_at = purchase
+            if refund > price * (1 + self.tolerance):
+                kinds.append(REFUND_OVER_PRICE)
+            if returned_at is not None and purchased_at is not None and _utc(returned_at) < _utc(purchased_at):
+                kinds.append(RETURN_BEFORE_PURCHASE)
+        self.returned[key] = self.returned.get(key, 0) + 1
+        return kinds
+
+
+def violation_doc(kind: str, ret: dict, price) -> dict:
+    return {
+        "kind": kind,
+        "user_id": ret["user_id"],
+        "transaction_id": ret["transaction_id"],
+        "item_id": ret["item_id"],
+        "refund_amount": ret["refund_amount"],
+        "price": price,
+        "return_date": ret["return_date"],
+        "detected_at": datetime.utcnow(),
+    }
+
+
+async def violation_counts(db: Database) -> dict:
+    """{user_id: {feature: count}} over all recorded violations, in one aggregation."""
+    pipeline = [{"$group": {"_id": {"user_id": "$user_id", "kind": "$kind"}, "n": {"$sum": 1}}}]
+    counts = {}
+    async for row in db.return_violations.aggregate(pipeline):
+        feature = FEATURES.get(row["_id"]["kind"])
+        if feature:
+            counts.setdefault(row["_id"]["user_id"], empty_counts())[feature] = row["n"]
+    return counts
+
+
+def empty_counts() -> dict:
+    return {feature: 0 for feature in FEATURES.values()}
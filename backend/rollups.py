@@ -0,0 +1,134 @@
+"""
+Materialized monthly rollups for the analytics time series.
+
+One small document per calendar month in `analytics_rollups`:
+    {_id: "2026-09", volume, txn_count, refund_total, return_count,
+     prevented, leakage, blocked_count, manual_count}
+
+Ingestion $inc's volume/returns from the batch it already holds in memory (new
+returns start out as leakage/manual review). run_analysis only moves the refunds
+of users whose risk flag flipped between prevented/blocked and leakage/manual.
+The dashboard reads a handful of these documents and never scans raw collections.
+Archived months (backend/tiering.py) keep their totals here.
+"""
+import asyncio
+from datetime import timezone
+
+from backend.storage import Database, bulk_upsert
+from backend.tiering import archived_refunds_by_month, current_dataset
+
+ROLLUP_FIELDS = (
+    "volume", "txn_count", "refund_total", "return_count",
+    "prevented", "leakage", "blocked_count", "manual_count",
+)
+RECLASSIFY_CHUNK = 5000
+
+
+def month_key(dt) -> str:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return f"{dt.year:04d}-{dt.month:02d}"
+
+
+def _bump(deltas, key, **fields):
+    bucket = deltas.setdefault(key, {})
+    for name, value in fields.items():
+        bucket[name] = bucket.get(name, 0) + value
+
+
+def ingest_deltas(txns, returns):
+    """Per-month increments for freshly ingested (not yet scored) transactions and returns."""
+    deltas = {}
+    for t in txns:
+        _bump(deltas, month_key(t['date']), volume=t.get('total_amount', 0.0), txn_count=1)
+    for r in returns:
+        refund = r.get('refund_amount', 0.0)
+        _bump(deltas, month_key(r['return_date']),
+              refund_total=refund, return_count=1, leakage=refund, manual_count=1)
+    return deltas
+
+
+async def apply_deltas(db: Database, deltas):
+    if not deltas:
+        return
+    await bulk_upsert(db.analytics_rollups, [({"_id": key}, {"$inc": inc}) for key, inc in deltas.items()], ordered=False)
+
+
+async def _refunds_by_month(db: Database, user_ids):
+    out = {}
+    for start in range(0, len(user_ids), RECLASSIFY_CHUNK):
+        chunk = user_ids[start:start + RECLASSIFY_CHUNK]
+        docs = await db.returns.aggregate([
+            {"$match": {"user_id": {"$in": chunk}}},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m", "date": "$return_date"}},
+                "refund": {"$sum": "$refund_amount"},
+                "count": {"$sum": 1}
+            }}
+        ]).to_list(length=None)
+        for d in docs:
+            refund, count = out.get(d["_id"], (0.0, 0))
+            out[d["_id"]] = (refund + d["refund"], count + d["count"])
+    # Returns this dataset moved to cold storage still count towards their month
+    dataset = await current_dataset(db)
+    for month, (refund, count) in (await asyncio.to_thread(archived_refunds_by_month, user_ids, dataset)).items():
+        prev_refund, prev_count = out.get(month, (0.0, 0))
+        out[month] = (prev_refund + refund, prev_count + count)
+    return out
+
+
+async def reclassify(db: Database, newly_flagged, newly_cleared):
+    """Moves refunds of users whose risk flag flipped between the prevented and leakage columns."""
+    deltas = {}
+    for uids, sign in ((newly_flagged, 1), (newly_cleared, -1)):
+        if not uids:
+            continue
+        for key, (refund, count) in (await _refunds_by_month(db, list(uids))).items():
+            _bump(deltas, key,
+                  prevented=sign * refund, leakage=-sign * refund,
+                  blocked_count=sign * count, manual_count=-sign * count)
+    await apply_deltas(db, deltas)
+
+
+def _previous_months(key, n):
+    year, month = map(int, key.split("-"))
+    keys = []
+    for _ in range(n):
+        keys.append(f"{year:04d}-{month:02d}")
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return keys[::-1]
+
+
+async def read_timeseries(db: Database, months: int = 7):
+    """
+    Returns (labels, buckets) for the `months` calendar months ending at the most
+    recent month with data; months without activity are zero-filled.
+    """
+    latest = await db.analytics_rollups.find({}, {"_id": 1}).sort("_id", -1).limit(1).to_list(length=1)
+    if not latest:
+        return [], []
+    keys = _previous_months(latest[0]["_id"], months)
+    docs = await db.analytics_rollups.find({"_id": {"$in": keys}}).to_list(length=months)
+    by_key = {d["_id"]: d for d in docs}
+    buckets = [{f: by_key.get(k, {}).get(f, 0) for f in ROLLUP_FIELDS} for k in keys]
+    return keys, buckets
+
+
+async def rollup_totals(db: Database):
+    """All-time totals summed over the month documents, or None if no rollups exist yet."""
+    group = {f: {"$sum": f"${f}"} for f in ROLLUP_FIELDS}
+    group["_id"] = None
+    docs = await db.analytics_rollups.aggregate([{"$group": group}]).to_list(length=1)
+    if not docs:
+        return None
+    d = docs[0]
+    return {
+        "total_txns": d["txn_count"],
+        "gross_volume": d["volume"],
+        "capital_saved": d["prevented"],
+        "blocked_count": d["blocked_count"],
+        "unrecognized_leakage": d["leakage"],
+        "manual_reviews": d["manual_count"],
+    }
@@ -0,0 +1,63 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+from backend.database import get_db
+from backend.storage import Database
+from backend.export import MEDIA_TYPES, stream_csv, stream_ndjson
+from backend.response_cache import bump_generation
+from backend.tiering import DATASET_PATTERN, archive_cold_data, archive_columns, clear_archive, current_dataset, iter_archive
+
+router = APIRouter()
+
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+
+@router.post("/archive/run")
+async def run_archive(retention_days: Optional[int] = Query(None, ge=1), db: Database = Depends(get_db)):
+    """Moves transactions, items and returns older than the retention window to Parquet."""
+    try:
+        result = await archive_cold_data(db, retention_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await bump_generation(db)
+    return result
+
+@router.delete("/archive")
+async def purge_archive(dataset: Optional[str] = Query(None, pattern=DATASET_PATTERN), db: Database = Depends(get_db)):
+    """Deletes one dataset's archived files, or the whole archive when no dataset is given."""
+    purged = await asyncio.to_thread(clear_archive, dataset)
+    await bump_generation(db)
+    return {"purged": purged}
+
+async def _records(batches):
+    # Each Parquet batch is read on a worker thread; only one is in memory at a time
+    while (rows := await asyncio.to_thread(next, batches, None)) is not None:
+        for row in rows:
+            yield row
+
+@router.get("/archive/{collection}")
+async def export_archive(
+    collection: Literal["transactions", "items", "returns"],
+    start: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    end: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    user_id: Optional[int] = None,
+    dataset: Optional[str] = Query(None, pattern=DATASET_PATTERN),
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: Database = Depends(get_db)
+):
+    """
+    Streams archived rows for months start..end (YYYY-MM, inclusive) as NDJSON or CSV,
+    from the current dataset unless an earlier `dataset` id is given.
+    """
+    if user_id is not None and collection == "items":
+        raise HTTPException(status_code=400, detail="Archived items have no user_id; filter by transaction instead.")
+    if dataset is None:
+        dataset = await current_dataset(db)
+    columns = await asyncio.to_thread(archive_columns, collection, start, end, dataset)
+    batches = iter_archive(collection, start, end, None, None if user_id is None else [user_id], dataset)
+    stream = stream_csv if format == "csv" else stream_ndjson
+    return StreamingResponse(
+        stream(_records(batches), columns),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="trustigo_archived_{collection}.{format}"'}
+    )
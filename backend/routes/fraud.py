@@ -1,17 +1,52 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
 from backend.database import get_db
+from backend.storage import Database, bulk_upsert
 from backend.models import User, BehaviorScore, FraudAlert, Transaction, Return, Item
-from backend.schemas import BehaviorScoreOut, FraudAlertOut
-from backend.behavior_score import calculate_user_behavior_metrics
+from backend.schemas import BehaviorScoreOut, FraudAlertOut, FraudRingOut, LeaderboardOut, ReturnCheckIn, ReturnCheckOut
+from backend.behavior_score import calculate_behavior_metrics
 from backend.fraud_engine import calculate_final_scores
-import pandas as pd
+from backend.anomaly_model import anomaly_state
+from backend.rule_config import get_rules, ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER
+from backend.export import MEDIA_TYPES, stream_documents
+from backend.lean import LeanJSONResponse, fill_defaults, schema_projection
+from backend.pagination import INT, NEXT_CURSOR_HEADER, NUMBER, build_projection, decode_cursor, descending_after, encode_cursor
+from backend.analytics import summary_totals
+from backend.rollups import apply_deltas, ingest_deltas, reclassify, read_timeseries, rollup_totals
+from backend.sketches import DEFAULT_QUANTILES, HLL_RELATIVE_ERROR, KLL_RANK_ERROR, ingest_sketches, merge_sketches, read_range, record_risk_scores
+from backend.response_cache import CACHE_WARM, bump_generation, warm_cache
+from backend.realtime import feature_cache, get_user_features, mark_current, prime_feature_cache, save_anomaly_model, score_return
+from backend.tiering import start_dataset
+from backend.linkage import ensure_linkage, linkage
+from backend.alert_stream import alert_bus, score_changed
+from backend.leaderboard import LEADERBOARD_SIZE, Leaderboard, clear_leaderboard, read_leaderboard, save_leaderboard
+from backend.return_integrity import DUPLICATE_RETURN, ReturnLedger, empty_counts, violation_counts, violation_doc
+from backend.metrics import ROWS_INGESTED, USERS_SCORED, StageTimer, track_job
+from datetime import datetime
 import io
 import pymongo
 
 router = APIRouter()
 
 @router.post("/upload-csv")
-async def upload_csv(file: UploadFile = File(...), db = Depends(get_db)):
+async def upload_csv(file: UploadFile = File(...), db: Database = Depends(get_db)):
+    with track_job("upload"):
+        return await _ingest_csv(file, db)
+
+def _parse_amount(value) -> float:
+    # Robust price parsing: currency symbols and thousands separators
+    cleaned = str(value).replace('$', '').replace('€', '').replace('£', '').replace(',', '').strip()
+    try:
+        return float(cleaned)
+    except ValueError:
+        return 0.0
+
+async def _ingest_csv(file: UploadFile, db):
+    # Imported on first upload, not with the app; see backend/preload.py
+    import pandas as pd
+
+    timer = StageTimer("upload")
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Invalid file format. Please upload a CSV.")
     
@@ -23,18 +58,31 @@ async def upload_csv(file: UploadFile = File(...), db = Depends(get_db)):
         await db.behavior_scores.delete_many({})
         await db.fraud_alerts.delete_many({})
         await db.users.delete_many({})
+        await db.analytics_rollups.delete_many({})
+        await db.analytics_sketches.delete_many({})
+        await db.return_violations.delete_many({})
+        await clear_leaderboard(db)
+        # Earlier archives stay on disk under their own dataset id
+        await start_dataset(db)
+        feature_cache.clear()
+        anomaly_state.reset()
+        await save_anomaly_model(db)
+        linkage.reset()
+        timer.lap("wipe")
         
         contents = await file.read()
         try:
             decoded = contents.decode('utf-8')
         except UnicodeDecodeError:
             decoded = contents.decode('latin-1')
+        timer.lap("decode")
             
         try:
             df = pd.read_csv(io.StringIO(decoded), sep=None, engine='python')
         except Exception:
             # Fallback to standard comma if engine=python fails
             df = pd.read_csv(io.StringIO(decoded), sep=',')
+        timer.lap("read_csv")
         
         # Dynamic Mapping for Amazon/Flipkart
         column_mapping = {
@@ -42,6 +90,7 @@ async def upload_csv(file: UploadFile = File(...), db = Depends(get_db)):
             'Order ID': 'transaction_id',
             'buyer-email': 'user_id',
             'buyer-name': 'user_id',
+            'Customer ID': 'user_id',
             'sku': 'item_id',
             'asin': 'item_id',
             'Item ID': 'item_id',
@@ -49,7 +98,18 @@ async def upload_csv(file: UploadFile = File(...), db = Depends(get_db)):
             'Price': 'price',
             'purchase-date': 'date',
             'Order Date': 'date',
-            'return-date': 'return_date'
+            'return-date': 'return_date',
+            'refund-amount': 'refund_amount',
+            'Refund Amount': 'refund_amount',
+            'Return Date': 'return_date',
+            'payment-method': 'payment_method',
+            'Payment Mode': 'payment_method',
+            'device-fingerprint': 'device_fingerprint',
+            'Device ID': 'device_fingerprint',
+            'ip-address': 'ip_address',
+            'IP Address': 'ip_address',
+            'quantity-purchased': 'quantity',
+            'Quantity': 'quantity'
         }
         
         # Standardize column names
@@ -99,10 +159,17 @@ async def upload_csv(file: UploadFile = File(...), db = Depends(get_db)):
             # If still missing even after dynamic fallback mappings, auto assign
             df['user_id'] = df.index + 10000
             
+        # Optional order context, kept on the transaction when the export has it
+        context_cols = [c for c in ('payment_method', 'device_fingerprint', 'ip_address') if c in df.columns]
+        has_quantity = 'quantity' in df.columns
+
         new_users_dict = {}
         new_txns_dict = {}
         new_items_dict = {}
         new_returns_dict = {}
+        # Duplicate / over-refund / backdated return checks against this upload's purchases
+        ledger = ReturnLedger()
+        violations = []
         
         for _, row in df.iterrows():
             uid = int(row['user_id'])
@@ -111,12 +178,7 @@ async def upload_csv(file: UploadFile = File(...), db = Depends(get_db)):
             tid = str(row['transaction_id']) if pd.notna(row['transaction_id']) else "TXN-AUTO"
             iid = str(row['item_id']) if pd.notna(row['item_id']) else "UNKNOWN"
             
-            # Robust Price Parsing
-            price_val = str(row['price']).replace('$', '').replace('€', '').replace('£', '').replace(',', '').strip()
-            try:
-                price = float(price_val)
-            except ValueError:
-                price = 0.0
+            price = _parse_amount(row['price'])
                 
             # Robust Date Parsing
             txn_date = pd.to_datetime(row['date'], errors='coerce')
@@ -130,41 +192,84 @@ async def upload_csv(file: UploadFile = File(...), db = Depends(get_db)):
                 
             # 2. Batch Transactions
             if tid not in new_txns_dict:
-                new_txns_dict[tid] = Transaction(transaction_id=tid, user_id=uid, date=txn_date, total_amount=price).model_dump()
+                context = {c: str(row[c]) for c in context_cols if pd.notna(row[c])}
+                new_txns_dict[tid] = Transaction(transaction_id=tid, user_id=uid, date=txn_date, total_amount=price, **context).model_dump()
             else:
                 new_txns_dict[tid]['total_amount'] += price
                 
-            # 3. Batch Items
-            if iid not in new_items_dict:
-                new_items_dict[iid] = Item(item_id=iid, transaction_id=tid, name="Imported Item", price=price, category="Unknown").model_dump()
-                
-            # 4. Batch Returns
+            ret_date = None
             if 'return_date' in df.columns and pd.notna(row['return_date']):
                 ret_date = pd.to_datetime(row['return_date'], errors='coerce')
-                if pd.notna(ret_date):
-                    if iid not in new_returns_dict:
-                        new_returns_dict[iid] = Return(
-                            return_id=f"RET-{iid}",
-                            transaction_id=tid,
-                            user_id=uid,
-                            item_id=iid,
-                            return_date=ret_date,
-                            reason="CSV Import",
-                            refund_amount=price,
-                            item_condition="Unknown"
-                        ).model_dump()
-                        
-        if new_users_dict: await db.users.insert_many(list(new_users_dict.values()))
-        if new_txns_dict: await db.transactions.insert_many(list(new_txns_dict.values()))
-        if new_items_dict: await db.items.insert_many(list(new_items_dict.values()))
-        if new_returns_dict: await db.returns.insert_many(list(new_returns_dict.values()))
+                if pd.isna(ret_date):
+                    ret_date = None
+
+            # 3. Batch Items, one per order line. With a quantity column a repeated row
+            # restates its line; without one it is one more unit of it, unless it
+            # carries a return (see backend/return_integrity.py)
+            quantity = None
+            if has_quantity:
+                quantity = max(int(_parse_amount(row['quantity'])), 1) if pd.notna(row['quantity']) else 1
+            ledger.add_purchase(tid, iid, price, txn_date, quantity, returned=ret_date is not None)
+            item = new_items_dict.get((tid, iid))
+            if item is None:
+                new_items_dict[(tid, iid)] = Item(item_id=iid, transaction_id=tid, name="Imported Item", price=price, category="Unknown", quantity=quantity or 1).model_dump()
+            else:
+                item['quantity'] = ledger.bought_units(tid, iid)
+                
+            # 4. Batch Returns
+            if ret_date is not None:
+                refund = price
+                if 'refund_amount' in df.columns and pd.notna(row['refund_amount']):
+                    refund = _parse_amount(row['refund_amount'])
+                unit = ledger.returned_units(tid, iid)
+                ret = Return(
+                    return_id=f"RET-{tid}-{iid}" + (f"-{unit}" if unit else ""),
+                    transaction_id=tid,
+                    user_id=uid,
+                    item_id=iid,
+                    return_date=ret_date,
+                    reason="CSV Import",
+                    refund_amount=refund,
+                    item_condition="Unknown"
+                ).model_dump()
+                kinds = ledger.check(tid, iid, refund, ret_date)
+                for kind in kinds:
+                    violations.append(violation_doc(kind, ret, ledger.price(tid, iid)))
+                # Each unit of a line is returned at most once; extra returns are only recorded as violations
+                if DUPLICATE_RETURN not in kinds:
+                    new_returns_dict[(tid, iid, unit)] = ret
+                    
+        timer.lap("normalize")
+        for collection, docs in (("users", new_users_dict), ("transactions", new_txns_dict),
+                                 ("items", new_items_dict), ("returns", new_returns_dict)):
+            if docs:
+                await db[collection].insert_many(list(docs.values()))
+                ROWS_INGESTED.inc(len(docs), collection=collection)
+                timer.lap(f"insert_{collection}")
+        if violations:
+            await db.return_violations.insert_many(violations)
+            ROWS_INGESTED.inc(len(violations), collection="return_violations")
+
+        # Link accounts that share a device or IP into rings
+        linkage.ingest(new_txns_dict.values(), new_returns_dict.values())
+        timer.lap("linkage")
+        
+        # Fold the batch into the monthly analytics rollups
+        await apply_deltas(db, ingest_deltas(new_txns_dict.values(), new_returns_dict.values()))
+        await merge_sketches(db, ingest_sketches(new_txns_dict.values(), new_returns_dict.values()))
+        generation = await bump_generation(db)
+        mark_current(generation)
+        linkage.generation = generation
+        timer.lap("rollups")
+        await alert_bus.publish(db, [("reset", {"reason": "upload"})])
         
         return {
             "message": "CSV Processed Successfully",
             "stats": {
                 "new_users": len(new_users_dict),
                 "new_transactions": len(new_txns_dict),
-                "new_returns": len(new_returns_dict)
+                "new_returns": len(new_returns_dict),
+                "return_violations": len(violations)
             }
         }
         
@@ -173,28 +278,150 @@ async def upload_csv(file: UploadFile = File(...), db = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process CSV: {str(e)}")
 
+ENGINE_FILTERS = {"behavioral": ENGINE_BEHAVIORAL, "first_order": ENGINE_FIRST_ORDER}
+
+def _fraud_users_query(risk_band, engine):
+    query = {}
+    rules = get_rules()
+    if risk_band == "high":
+        query["overall_risk_score"] = {"$gte": rules.alert_threshold}
+    elif risk_band == "medium":
+        query["overall_risk_score"] = {"$gte": rules.medium_risk_floor, "$lt": rules.alert_threshold}
+    elif risk_band == "low":
+        query["overall_risk_score"] = {"$lt": rules.medium_risk_floor}
+    if engine:
+        query["engine_used"] = ENGINE_FILTERS[engine]
+    return query
+
 @router.get("/fraud-users", response_model=list[BehaviorScoreOut])
-async def get_fraud_users(limit: int = 15000, db = Depends(get_db)):
-    # Returns users with high risk score, sorted descending
-    cursor = db.behavior_scores.find().sort("overall_risk_score", pymongo.DESCENDING).limit(limit)
-    return await cursor.to_list(length=limit)
+async def get_fraud_users(
+    response: Response,
+    limit: int = Query(15000, ge=1),
+    cursor: Optional[str] = None,
+    risk_band: Optional[Literal["high", "medium", "low"]] = None,
+    engine: Optional[Literal["behavioral", "first_order"]] = None,
+    fields: Optional[str] = None,
+    lean: bool = False,
+    db: Database = Depends(get_db)
+):
+    """
+    Users sorted by overall_risk_score descending (user_id breaks ties).
+    Pass the X-Next-Cursor response header back as `cursor` for the next page;
+    `fields` is a comma-separated projection for list views. `lean=true` skips
+    per-row response_model validation (see backend/lean.py).
+    """
+    query = _fraud_users_query(risk_band, engine)
+    if cursor:
+        score, uid = decode_cursor(cursor, NUMBER, INT)
+        query = {"$and": [query, descending_after("overall_risk_score", "user_id", score, uid, tie_descending=False)]}
+
+    projection = build_projection(fields, BehaviorScoreOut.model_fields, ("user_id", "overall_risk_score"))
+    if lean and projection is None:
+        projection = schema_projection(BehaviorScoreOut)
+    rows = await db.behavior_scores.find(query, projection).sort([
+        ("overall_risk_score", pymongo.DESCENDING),
+        ("user_id", pymongo.ASCENDING)
+    ]).limit(limit).to_list(length=limit)
+
+    headers = {}
+    if len(rows) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1]['overall_risk_score'], rows[-1]['user_id'])
+    if lean and not fields:
+        return LeanJSONResponse(fill_defaults(rows, BehaviorScoreOut), headers=headers)
+    if projection is not None:
+        # Projected documents go out as-is; partial ones wouldn't satisfy BehaviorScoreOut anyway
+        return LeanJSONResponse(rows, headers=headers)
+    response.headers.update(headers)
+    return rows
+
+@router.get("/fraud-users/top", response_model=LeaderboardOut)
+async def get_top_fraud_users(limit: int = Query(10, ge=1, le=LEADERBOARD_SIZE), db: Database = Depends(get_db)):
+    """
+    Highest-risk users plus overview counters, maintained by run_analysis
+    (see backend/leaderboard.py). One constant-size read whatever the cohort size.
+    """
+    board = await read_leaderboard(db, limit)
+    if board is None:
+        return {"total_users": 0, "top": []}
+    return board
+
+@router.get("/export/fraud-users")
+async def export_fraud_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    risk_band: Optional[Literal["high", "medium", "low"]] = None,
+    engine: Optional[Literal["behavioral", "first_order"]] = None,
+    fields: Optional[str] = None,
+    db: Database = Depends(get_db)
+):
+    """
+    Streams every scored user (same filters as /fraud-users) as NDJSON or CSV.
+    Lives outside /fraud-users so the response cache never buffers it.
+    """
+    projection = build_projection(fields, BehaviorScoreOut.model_fields, ("user_id", "overall_risk_score"))
+    if projection is None:
+        projection = {f: 1 for f in BehaviorScoreOut.model_fields}
+        projection["_id"] = 0
+    columns = [f for f in projection if f != "_id"]
+    cursor = db.behavior_scores.find(_fraud_users_query(risk_band, engine), projection).sort([
+        ("overall_risk_score", pymongo.DESCENDING),
+        ("user_id", pymongo.ASCENDING)
+    ])
+    return StreamingResponse(
+        stream_documents(cursor, format, columns),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="trustigo_scored_users.{format}"'}
+    )
 
 @router.get("/alerts", response_model=list[FraudAlertOut])
-async def get_alerts(limit: int = 20, db = Depends(get_db)):
+async def get_alerts(limit: int = 20, db: Database = Depends(get_db)):
     cursor = db.fraud_alerts.find().sort("date", pymongo.DESCENDING).limit(limit)
     return await cursor.to_list(length=limit)
 
+@router.get("/alerts/stream")
+async def stream_alerts(request: Request, cursor: Optional[str] = None, db: Database = Depends(get_db)):
+    """
+    Server-sent events for new alerts, score changes and finished analysis runs
+    (see backend/alert_stream.py). Resumes from the Last-Event-ID header, or from
+    `cursor` for clients that can't set it.
+    """
+    return StreamingResponse(
+        alert_bus.stream(db, request.headers.get("last-event-id") or cursor, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/run-fraud-analysis")
-async def run_analysis(db = Depends(get_db)):
+async def run_analysis(request: Request, background_tasks: BackgroundTasks, db: Database = Depends(get_db)):
+    with track_job("analysis"):
+        return await _analyze(request, background_tasks, db)
+
+async def _analyze(request: Request, background_tasks: BackgroundTasks, db):
+    timer = StageTimer("analysis")
+    # Pin one compiled config for the whole run so a hot reload mid-run can't mix versions
+    rules = get_rules()
     users = await db.users.find().to_list(length=None)
-    all_metrics = []
-    
-    for u in users:
-        mets = await calculate_user_behavior_metrics(db, u['user_id'])
-        all_metrics.append(mets)
+    timer.lap("fetch_users")
+    all_metrics = await calculate_behavior_metrics(db, [u['user_id'] for u in users], rules)
+    timer.lap("features")
+
+    rings = await ensure_linkage(db)
+    violations = await violation_counts(db)
+    for mets in all_metrics:
+        mets.update(rings.ring_features(mets['user_id']))
+        mets.update(violations.get(mets['user_id'], empty_counts()))
+    timer.lap("linkage")
         
-    final_scores = calculate_final_scores(list(all_metrics))
+    final_scores = calculate_final_scores(list(all_metrics), rules)
+    await save_anomaly_model(db)
+    timer.lap("score")
 
+    # Previous risk flags and scores, so the rollups only move refunds of users whose
+    # flag flipped and the alert stream only pushes real score changes
+    prev_cursor = db.behavior_scores.find({}, {"_id": 0, "user_id": 1, "risk_flag": 1, "overall_risk_score": 1})
+    prev_scores = {d['user_id']: (d.get('risk_flag', False), d.get('overall_risk_score')) for d in await prev_cursor.to_list(length=None)}
+    newly_flagged, newly_cleared = [], []
+    score_writes, score_events, alert_candidates = [], [], []
+    board = Leaderboard(medium_floor=rules.medium_risk_floor, high_floor=rules.alert_threshold)
     
     # Save to db
     for fs in final_scores:
@@ -211,75 +438,142 @@ async def run_analysis(db = Depends(get_db)):
             "payment_risk_score": fs.get('payment_risk_score', 0.0),
             "engine_used": fs.get('engine_used', 'Engine 1: Behavioral'),
             "anomaly_score": fs['anomaly_score'],
-            "overall_risk_score": fs['overall_risk_score']
+            "overall_risk_score": fs['overall_risk_score'],
+            "config_version": fs['config_version'],
+            "risk_flag": fs['overall_risk_score'] >= rules.alert_threshold,
+            # Raw counters used by the real-time /check-return path
+            "txns_count": fs['txns_count'],
+            "items_bought": fs['items_bought'],
+            "returns_count": fs['returns_count'],
+            "total_spent": fs['total_spent'],
+            "total_refund": fs['total_refund'],
+            "total_return_days": fs['total_return_days'],
+            "risky_returns_count": fs['risky_returns_count'],
+            "ring_id": fs['ring_id'],
+            "ring_size": fs['ring_size'],
+            "ring_return_rate": fs['ring_return_rate'],
+            "ring_refund_ratio": fs['ring_refund_ratio'],
+            "duplicate_return_count": fs['duplicate_return_count'],
+            "refund_overage_count": fs['refund_overage_count'],
+            "backdated_return_count": fs['backdated_return_count']
         }
         
-        # update or create BehaviorScore using Motor update_one with upsert
-        await db.behavior_scores.update_one(
-            {"user_id": uid},
-            {"$set": bs_dict},
-            upsert=True
-        )
+        prev_flag = prev_scores.get(uid, (False, None))[0]
+        if bs_dict['risk_flag'] and not prev_flag:
+            newly_flagged.append(uid)
+        elif not bs_dict['risk_flag'] and prev_flag:
+            newly_cleared.append(uid)
         
-        # Handle Alerts
-        if fs['overall_risk_score'] > 60:
-            existing_alert = await db.fraud_alerts.find_one({
-                "user_id": uid, 
-                "status": "Active"
+        # update or create BehaviorScore, all users in one bulk upsert
+        score_writes.append(({"user_id": uid}, {"$set": bs_dict}))
+        board.push(bs_dict)
+        if score_changed(prev_scores.get(uid), bs_dict['overall_risk_score'], bs_dict['risk_flag']):
+            score_events.append({
+                "user_id": uid,
+                "overall_risk_score": bs_dict['overall_risk_score'],
+                "previous_score": prev_scores[uid][1],
+                "risk_flag": bs_dict['risk_flag'],
             })
-            
-            if not existing_alert:
-                alert = FraudAlert(
-                    user_id=uid,
-                    risk_score=fs['overall_risk_score'],
-                    primary_reason=fs['reasoning'],
-                    status="Active"
-                ).model_dump()
-                await db.fraud_alerts.insert_one(alert)
+        if fs['overall_risk_score'] > rules.alert_threshold:
+            alert_candidates.append(fs)
+    await bulk_upsert(db.behavior_scores, score_writes, ordered=False)
+
+    # Handle Alerts: one read of the users that already have an active alert, one insert
+    new_alerts = []
+    if alert_candidates:
+        active = db.fraud_alerts.find(
+            {"user_id": {"$in": [fs['user_id'] for fs in alert_candidates]}, "status": "Active"},
+            {"_id": 0, "user_id": 1},
+        )
+        already_alerted = {a['user_id'] for a in await active.to_list(length=None)}
+        new_alerts = [FraudAlert(
+            user_id=fs['user_id'],
+            risk_score=fs['overall_risk_score'],
+            primary_reason=fs['reasoning'],
+            status="Active",
+            config_version=fs['config_version']
+        ).model_dump() for fs in alert_candidates if fs['user_id'] not in already_alerted]
+    if new_alerts:
+        await db.fraud_alerts.insert_many([dict(alert) for alert in new_alerts])
+                
+    await save_leaderboard(db, board, rules.version)
+    await record_risk_scores(db, [fs['overall_risk_score'] for fs in final_scores], datetime.utcnow())
+    timer.lap("persist")
+    USERS_SCORED.inc(len(final_scores))
                 
-    return {"message": f"Successfully ran analysis on {len(users)} users"}
+    prime_feature_cache(final_scores)
+    await reclassify(db, newly_flagged, newly_cleared)
+    generation = await bump_generation(db)
+    mark_current(generation)
+    linkage.generation = generation
+    timer.lap("rollups")
+    # Published last, so dashboards only hear about written data and refetch past the cache
+    await alert_bus.publish(db, [
+        *(("score", event) for event in score_events),
+        *(("alert", alert) for alert in new_alerts),
+        ("analysis", {
+            "config_version": rules.version,
+            "users_scored": len(final_scores),
+            "alerts": len(new_alerts),
+            "score_changes": len(score_events),
+        }),
+    ])
+    if CACHE_WARM:
+        background_tasks.add_task(warm_cache, request.app)
+                
+    return {"message": f"Successfully ran analysis on {len(users)} users", "config_version": rules.version}
+
+@router.get("/fraud-rings", response_model=list[FraudRingOut])
+async def get_fraud_rings(
+    min_size: int = Query(3, ge=2),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Database = Depends(get_db)
+):
+    """Groups of accounts linked by a shared device fingerprint or IP address, largest first."""
+    rings = await ensure_linkage(db)
+    return [{**features, "user_ids": members} for features, members in rings.rings(min_size)[:limit]]
+
+@router.post("/check-return", response_model=ReturnCheckOut)
+async def check_return(ret: ReturnCheckIn, db: Database = Depends(get_db)):
+    """
+    Scores a single incoming return before the refund is issued, using the user's
+    cached feature counters and the anomaly model from the last analysis run.
+    """
+    base, source = await get_user_features(db, ret.user_id)
+    result = score_return(base, ret.model_dump())
+    result['feature_source'] = source
+    return result
 
 @router.get("/analytics-summary")
-async def get_analytics_summary(db = Depends(get_db)):
-    # 1. Total Monitored API (total unique transactions)
-    total_txns = await db.transactions.count_documents({})
+async def get_analytics_summary(db: Database = Depends(get_db)):
+    # 1. Totals from the monthly rollups; databases loaded before rollups existed
+    # fall back to $group pipelines over the raw collections
+    totals = await rollup_totals(db)
+    if totals is None:
+        totals = await summary_totals(db, get_rules().alert_threshold)
+    total_txns = totals['total_txns']
+    gross_volume = totals['gross_volume']
     
     # 2. Capital Saved ($ value of all returned items flagged by high-risk users)
-    high_risk_cursor = db.behavior_scores.find({"overall_risk_score": {"$gte": 60}})
-    high_risk_users = await high_risk_cursor.to_list(length=None)
-    high_risk_uids = [h['user_id'] for h in high_risk_users]
-    
-    blocked_returns = await db.returns.find({"user_id": {"$in": high_risk_uids}}).to_list(length=None)
-    capital_saved = sum(r.get('refund_amount', 0.0) for r in blocked_returns)
-    blocked_count = len(blocked_returns)
-    
-    allowed_returns = await db.returns.find({"user_id": {"$nin": high_risk_uids}}).to_list(length=None)
-    unrecognized_leakage = sum(r.get('refund_amount', 0.0) for r in allowed_returns)
-    manual_reviews = len(allowed_returns)
-
-    # 3. Time Series Data (Mocked out over months based on dynamic scalar ratio of actual db size for hackathon demo purposes)
-    def distribute_over_7(total):
-        import random
-        fractions = [random.uniform(0.5, 1.5) for _ in range(7)]
-        base = sum(fractions)
-        return [int((f / base) * total) for f in fractions]
-
-    # Gross Volume Calculation
-    all_txns_cursor = db.transactions.find()
-    all_txns = await all_txns_cursor.to_list(length=None)
-    gross_volume = sum(t.get('total_amount', 0.0) for t in all_txns)
+    capital_saved = totals['capital_saved']
+    blocked_count = totals['blocked_count']
+    unrecognized_leakage = totals['unrecognized_leakage']
+    manual_reviews = totals['manual_reviews']
 
     expected_earnings = gross_volume - unrecognized_leakage
 
+    # 3. Time Series Data, read from the materialized monthly rollups
+    labels, buckets = await read_timeseries(db)
+
     revenueLossData = {
-        "prevented": distribute_over_7(capital_saved if capital_saved > 0 else 120000),
-        "expected_earnings": distribute_over_7(expected_earnings if expected_earnings > 0 else 450000),
-        "leakage": distribute_over_7(unrecognized_leakage if unrecognized_leakage > 0 else 18000)
+        "prevented": [round(b['prevented'], 2) for b in buckets],
+        "expected_earnings": [round(b['volume'] - b['leakage'], 2) for b in buckets],
+        "leakage": [round(b['leakage'], 2) for b in buckets]
     }
     
     blockRateData = {
-        "blocked": [int(x) for x in distribute_over_7(blocked_count if blocked_count > 0 else 150)],
-        "manual": [int(x) for x in distribute_over_7(manual_reviews if manual_reviews > 0 else 40)]
+        "blocked": [int(b['blocked_count']) for b in buckets],
+        "manual": [int(b['manual_count']) for b in buckets]
     }
     
     catch_rate = 0.0
@@ -292,6 +586,46 @@ async def get_analytics_summary(db = Depends(get_db)):
         "expected_earnings": expected_earnings,
         "catch_rate": round(catch_rate, 1),
         "total_txns": total_txns,
+        "timeseries_labels": labels,
         "revenue_timeseries": revenueLossData,
         "block_timeseries": blockRateData
     }
+
+@router.get("/analytics-sketches")
+async def get_analytics_sketches(
+    start: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    end: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    q: str = ",".join(str(x) for x in DEFAULT_QUANTILES),
+    db: Database = Depends(get_db)
+):
+    """
+    Approximate distinct buyers, refund-amount quantiles and risk-score quantiles
+    for the months in [start, end] (YYYY-MM, inclusive), merged from the per-month
+    sketches in backend/sketches.py. Error bounds are returned with each figure.
+    """
+    try:
+        qs = [float(x) for x in q.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="q must be comma-separated numbers in [0, 1]")
+    if not qs or any(not 0 <= x <= 1 for x in qs):
+        raise HTTPException(status_code=400, detail="q must be comma-separated numbers in [0, 1]")
+
+    months, merged, buyers_by_month = await read_range(db, start, end)
+    return {
+        "months": months,
+        "distinct_buyers": {
+            "total": round(merged["buyers"].count()),
+            "by_month": buyers_by_month,
+            "relative_std_error": round(HLL_RELATIVE_ERROR, 4),
+        },
+        "refund_amount": {
+            "count": merged["refunds"].n,
+            "quantiles": {str(k): v for k, v in merged["refunds"].quantiles(qs).items()},
+            "rank_error": KLL_RANK_ERROR,
+        },
+        "risk_score": {
+            "count": merged["risk_scores"].n,
+            "quantiles": {str(k): v for k, v in merged["risk_scores"].quantiles(qs).items()},
+            "rank_error": KLL_RANK_ERROR,
+        },
+    }
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException
+from backend.database import get_db
+from backend.storage import Database
+from backend.rule_config import reload_rules, get_rules, RULES_PATH
+from backend.schemas import BacktestRequest
+from backend.backtest import backtest_from_db
+
+router = APIRouter()
+
+@router.get("/rules")
+async def get_active_rules():
+    rules = get_rules()
+    return {
+        "config_version": rules.version,
+        "path": RULES_PATH,
+        "config": rules.config.model_dump()
+    }
+
+@router.post("/rules/reload")
+async def force_reload_rules():
+    # Normally picked up automatically on the next scoring call; this forces it
+    try:
+        rules = reload_rules(force=True)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Rules reloaded", "config_version": rules.version}
+
+@router.post("/backtest")
+async def backtest_rules(req: BacktestRequest, db: Database = Depends(get_db)):
+    """
+    Re-scores the stored feature snapshot under the active config and each candidate
+    (deep-merged overrides of the active config). Read-only.
+    """
+    if not req.candidates:
+        raise HTTPException(status_code=400, detail="Provide at least one candidate configuration.")
+    try:
+        return await backtest_from_db(db, [c.model_dump() for c in req.candidates], req.max_flips)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
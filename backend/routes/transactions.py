@@ -1,14 +1,56 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from typing import Optional
 from backend.database import get_db
+from backend.storage import Database
 from backend.models import Transaction
 from backend.schemas import TransactionOut
+from backend.lean import LeanJSONResponse, fill_defaults, schema_projection
+from backend.pagination import NEXT_CURSOR_HEADER, STR, build_projection, decode_cursor, descending_after, encode_cursor, parse_datetime
 import pymongo
 
 router = APIRouter()
 
 @router.get("/transactions", response_model=list[TransactionOut])
-async def get_recent_transactions(skip: int = 0, limit: int = 100, db = Depends(get_db)):
+async def get_recent_transactions(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    lean: bool = False,
+    db: Database = Depends(get_db)
+):
+    """
+    Newest first, ordered on (date, transaction_id). Prefer `cursor` (from the
+    X-Next-Cursor header) over `skip`, which gets slower the deeper it goes.
+    `lean=true` skips per-row response_model validation.
+    """
+    query = {}
+    if user_id is not None:
+        query["user_id"] = user_id
+    if cursor:
+        date, tid = decode_cursor(cursor, STR, STR)
+        query = {"$and": [query, descending_after("date", "transaction_id", parse_datetime(date), tid, tie_descending=True)]}
+
+    projection = build_projection(fields, TransactionOut.model_fields, ("transaction_id", "date"))
+    if lean and projection is None:
+        projection = schema_projection(TransactionOut)
     # Sort descending by date using PyMongo sorting convention (-1)
-    txns_cursor = db.transactions.find().sort("date", pymongo.DESCENDING).skip(skip).limit(limit)
-    txns = await txns_cursor.to_list(length=limit)
+    txns_cursor = db.transactions.find(query, projection).sort([
+        ("date", pymongo.DESCENDING),
+        ("transaction_id", pymongo.DESCENDING)
+    ])
+    if skip and not cursor:
+        txns_cursor = txns_cursor.skip(skip)
+    txns = await txns_cursor.limit(limit).to_list(length=limit)
+
+    headers = {}
+    if len(txns) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(txns[-1]['date'], txns[-1]['transaction_id'])
+    if lean and not fields:
+        return LeanJSONResponse(fill_defaults(txns, TransactionOut), headers=headers)
+    if projection is not None:
+        return LeanJSONResponse(txns, headers=headers)
+    response.headers.update(headers)
     return txns
@@ -1,27 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Optional
 from backend.database import get_db
+from backend.storage import Database
 from backend.models import User
-from backend.schemas import UserOut, UserDetailOut
+from backend.schemas import UserOut, UserDetailOut, UserBatchIn, UserBatchOut
+from backend.lean import LeanJSONResponse, fill_defaults, schema_projection
+from backend.pagination import INT, NEXT_CURSOR_HEADER, build_projection, decode_cursor, encode_cursor
+import pymongo
 
 router = APIRouter()
 
 @router.get("/users", response_model=list[UserOut])
-async def get_all_users(skip: int = 0, limit: int = 100, db = Depends(get_db)):
-    users_cursor = db.users.find().skip(skip).limit(limit)
-    users = await users_cursor.to_list(length=limit)
+async def get_all_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    lean: bool = False,
+    db: Database = Depends(get_db)
+):
+    """
+    Ordered by user_id. Prefer `cursor` (from the X-Next-Cursor header) over `skip`.
+    `lean=true` skips per-row response_model validation.
+    """
+    query = {}
+    if cursor:
+        (last_uid,) = decode_cursor(cursor, INT)
+        query["user_id"] = {"$gt": last_uid}
+
+    projection = build_projection(fields, UserOut.model_fields, ("user_id",))
+    if lean and projection is None:
+        projection = schema_projection(UserOut)
+    users_cursor = db.users.find(query, projection).sort("user_id", pymongo.ASCENDING)
+    if skip and not cursor:
+        users_cursor = users_cursor.skip(skip)
+    users = await users_cursor.limit(limit).to_list(length=limit)
+
+    headers = {}
+    if len(users) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(users[-1]['user_id'])
+    if lean and not fields:
+        return LeanJSONResponse(fill_defaults(users, UserOut), headers=headers)
+    if projection is not None:
+        return LeanJSONResponse(users, headers=headers)
+    response.headers.update(headers)
     return users
 
 @router.get("/user/{user_id}", response_model=UserDetailOut)
-async def get_user_detail(user_id: int, db = Depends(get_db)):
-    user = await db.users.find_one({"user_id": user_id})
+async def get_user_detail(user_id: int, db: Database = Depends(get_db)):
+    # The lookups are independent; run them concurrently
+    user, bs, alerts, violations = await asyncio.gather(
+        db.users.find_one({"user_id": user_id}),
+        db.behavior_scores.find_one({"user_id": user_id}),
+        db.fraud_alerts.find({"user_id": user_id}).to_list(length=None),
+        db.return_violations.find({"user_id": user_id}).to_list(length=None)
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
     # Manually fetch relations since we aren't using an ORM anymore
-    bs = await db.behavior_scores.find_one({"user_id": user_id})
     user['behavior_score'] = bs if bs else None
-    
-    alerts = await db.fraud_alerts.find({"user_id": user_id}).to_list(length=None)
     user['fraud_alerts'] = alerts
+    user['return_violations'] = violations
     
     return user
+
+@router.post("/users/batch", response_model=UserBatchOut)
+async def get_user_details_batch(req: UserBatchIn, db: Database = Depends(get_db)):
+    """
+    Detail view for many users at once: one $in query per collection, run
+    concurrently and joined in memory, so the round trips don't grow with N.
+    Results follow the request order; unknown ids are listed in `missing`.
+    """
+    user_ids = list(dict.fromkeys(req.user_ids))
+    users, scores, alerts, violations = await asyncio.gather(
+        db.users.find({"user_id": {"$in": user_ids}}).to_list(length=None),
+        db.behavior_scores.find({"user_id": {"$in": user_ids}}).to_list(length=None),
+        db.fraud_alerts.find({"user_id": {"$in": user_ids}}).to_list(length=None),
+        db.return_violations.find({"user_id": {"$in": user_ids}}).to_list(length=None)
+    )
+    users_by_id = {u['user_id']: u for u in users}
+    scores_by_id = {b['user_id']: b for b in scores}
+    alerts_by_id = {}
+    for a in alerts:
+        alerts_by_id.setdefault(a['user_id'], []).append(a)
+    violations_by_id = {}
+    for v in violations:
+        violations_by_id.setdefault(v['user_id'], []).append(v)
+
+    found, missing = [], []
+    for uid in user_ids:
+        user = users_by_id.get(uid)
+        if user is None:
+            missing.append(uid)
+            continue
+        user['behavior_score'] = scores_by_id.get(uid)
+        user['fraud_alerts'] = alerts_by_id.get(uid, [])
+        user['return_violations'] = violations_by_id.get(uid, [])
+        found.append(user)
+    return {"users": found, "missing": missing}
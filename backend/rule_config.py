@@ -0,0 +1,286 @@
+import hashlib
+import json
+import logging
+import operator
+import os
+import threading
+import time
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+logger = logging.getLogger(__name__)
+
+RULES_PATH = os.getenv(
+    "FRAUD_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fraud_rules.json"),
+)
+# Seconds between checks of the rules file for edits; POST /rules/reload applies one at once
+CHECK_INTERVAL = float(os.getenv("FRAUD_RULES_CHECK_INTERVAL", "2.0"))
+
+ENGINE_BEHAVIORAL = "Engine 1: Behavioral"
+ENGINE_FIRST_ORDER = "Engine 2: First-Order"
+
+# Column order of the feature matrix every compiled config evaluates against
+FEATURE_COLUMNS = (
+    "return_rate_90d",
+    "avg_return_time_days",
+    "fast_return_count",
+    "high_value_return_count",
+    "refund_value_ratio",
+    "category_risk_score",
+    "payment_risk_score",
+    "anomaly_score",
+    "txns_count",
+    "ring_size",
+    "ring_return_rate",
+    "ring_refund_ratio",
+    "duplicate_return_count",
+    "refund_overage_count",
+    "backdated_return_count",
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+}
+
+
+def _check_feature(name: str) -> str:
+    if name not in FEATURE_INDEX:
+        raise ValueError(f"Unknown feature '{name}'. Expected one of {list(FEATURE_COLUMNS)}")
+    return name
+
+
+class FeatureSettings(BaseModel):
+    window_days: int = Field(default=90, gt=0)
+    fast_return_days: int = Field(default=2, ge=0)
+    high_value_amount: float = Field(default=800.0, ge=0)
+    risky_categories: List[str] = ["Electronics", "Clothing"]
+    cod_payment_risk: float = Field(default=30.0, ge=0)
+    high_risk_shipping_risk: float = Field(default=20.0, ge=0)
+    first_order_max_txns: int = Field(default=1, ge=0)
+
+
+class AnomalySettings(BaseModel):
+    features: List[str] = ["return_rate_90d", "fast_return_count", "high_value_return_count"]
+    contamination: float = Field(default=0.1, gt=0, le=0.5)
+    min_cohort: int = Field(default=5, ge=2)
+
+    @field_validator("features")
+    @classmethod
+    def known_features(cls, v):
+        return [_check_feature(f) for f in v]
+
+
+class ScoreComponent(BaseModel):
+    feature: str
+    weight: float = Field(ge=0)
+    scale: float = 1.0
+    cap: Optional[float] = None
+
+    @field_validator("feature")
+    @classmethod
+    def known_feature(cls, v):
+        return _check_feature(v)
+
+
+class EngineConfig(BaseModel):
+    components: List[ScoreComponent] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def bounded_weights(self):
+        total = sum(c.weight for c in self.components)
+        if total > 1.0 + 1e-9:
+            raise ValueError(f"Component weights sum to {total:.3f}; they must not exceed 1.0")
+        return self
+
+
+class Condition(BaseModel):
+    feature: str
+    op: Literal[">", ">=", "<", "<=", "=="]
+    value: float
+
+    @field_validator("feature")
+    @classmethod
+    def known_feature(cls, v):
+        return _check_feature(v)
+
+
+class ReasonRule(BaseModel):
+    label: str
+    engine: Literal["behavioral", "first_order", "any"] = "any"
+    when: List[Condition] = Field(min_length=1)
+
+
+class RuleConfig(BaseModel):
+    version: str
+    alert_threshold: float = Field(default=60.0, ge=0, le=100)
+    # Scores in [medium_risk_floor, alert_threshold) make up the "medium" risk band
+    medium_risk_floor: float = Field(default=30.0, ge=0, le=100)
+    features: FeatureSettings = FeatureSettings()
+    anomaly: AnomalySettings = AnomalySettings()
+    engines: Dict[Literal["behavioral", "first_order"], EngineConfig]
+    reasons: List[ReasonRule] = []
+
+    @model_validator(mode="after")
+    def both_engines(self):
+        missing = {"behavioral", "first_order"} - set(self.engines)
+        if missing:
+            raise ValueError(f"Missing engine definitions: {sorted(missing)}")
+        if self.medium_risk_floor > self.alert_threshold:
+            raise ValueError("medium_risk_floor must not exceed alert_threshold")
+        return self
+
+
+class CompiledRules:
+    """
+    A validated RuleConfig lowered into numpy arrays so a whole cohort is
+    scored with a handful of vectorized operations instead of per-row dict lookups.
+    """
+
+    def __init__(self, config: RuleConfig, version: str):
+        self.config = config
+        self.version = version
+        self.features = config.features
+        self.alert_threshold = config.alert_threshold
+        self.medium_risk_floor = config.medium_risk_floor
+        self.behavioral = self._compile_engine(config.engines["behavioral"])
+        self.first_order = self._compile_engine(config.engines["first_order"])
+
+        self.reason_labels = [r.label for r in config.reasons]
+        self._reasons = [
+            (r.engine, [(FEATURE_INDEX[c.feature], OPERATORS[c.op], c.value) for c in r.when])
+            for r in config.reasons
+        ]
+
+    @staticmethod
+    def _compile_engine(engine: EngineConfig):
+        idx = np.array([FEATURE_INDEX[c.feature] for c in engine.components], dtype=np.intp)
+        scale = np.array([c.scale for c in engine.components], dtype=np.float64)
+        cap = np.array([np.inf if c.cap is None else c.cap for c in engine.components], dtype=np.float64)
+        weight = np.array([c.weight for c in engine.components], dtype=np.float64)
+        return idx, scale, cap, weight
+
+    @staticmethod
+    def feature_matrix(features_list) -> np.ndarray:
+        X = np.zeros((len(features_list), len(FEATURE_COLUMNS)), dtype=np.float64)
+        for i, f in enumerate(features_list):
+            for j, name in enumerate(FEATURE_COLUMNS):
+                v = f.get(name)
+                if v is not None:
+                    X[i, j] = v
+        return X
+
+    @staticmethod
+    def _engine_risk(X: np.ndarray, engine) -> np.ndarray:
+        idx, scale, cap, weight = engine
+        return (np.minimum(X[:, idx] * scale, cap) * weight).sum(axis=1)
+
+    def risk(self, X: np.ndarray, first_order: np.ndarray) -> np.ndarray:
+        return np.where(
+            first_order,
+            self._engine_risk(X, self.first_order),
+            self._engine_risk(X, self.behavioral),
+        )
+
+    def reason_mask(self, X: np.ndarray, first_order: np.ndarray) -> np.ndarray:
+        mask = np.zeros((len(X), len(self._reasons)), dtype=bool)
+        for k, (engine, conditions) in enumerate(self._reasons):
+            if engine == "first_order":
+                hit = first_order.copy()
+            elif engine == "behavioral":
+                hit = ~first_order
+            else:
+                hit = np.ones(len(X), dtype=bool)
+            for col, op, value in conditions:
+                hit &= op(X[:, col], value)
+            mask[:, k] = hit
+        return mask
+
+    def reasoning(self, mask_row) -> str:
+        reasons = [label for label, hit in zip(self.reason_labels, mask_row) if hit]
+        return ", ".join(reasons) if reasons else "Normal Pattern"
+
+    def evaluate(self, features_list):
+        """
+        Scores a list of feature dicts (anomaly_score already filled in).
+        Returns (rounded risk array, list of reasoning strings).
+        """
+        X = self.feature_matrix(features_list)
+        first_order = np.array(
+            [f.get("engine_used") == ENGINE_FIRST_ORDER for f in features_list], dtype=bool
+        )
+        risk = np.round(self.risk(X, first_order), 2)
+        mask = self.reason_mask(X, first_order)
+        return risk, [self.reasoning(row) for row in mask]
+
+
+def parse_rules(raw: str) -> CompiledRules:
+    """Validates and compiles a JSON rule document. Raises ValueError on bad input."""
+    try:
+        config = RuleConfig.model_validate(json.loads(raw))
+    except (json.JSONDecodeError, ValidationError) as e:
+        raise ValueError(f"Invalid fraud rule configuration: {e}") from e
+    # Content hash makes silent edits (without a version bump) distinguishable
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:8]
+    return CompiledRules(config, f"{config.version}+{digest}")
+
+
+class RuleState:
+    compiled: Optional[CompiledRules] = None
+    mtime: Optional[float] = None
+    checked_at = 0.0
+    lock = threading.Lock()
+
+
+rule_state = RuleState()
+
+
+def reload_rules(force: bool = False) -> CompiledRules:
+    """
+    Re-reads RULES_PATH when it changed on disk (or when forced). A broken edit,
+    or a file that is briefly missing (an editor's write-then-rename save), picked
+    up implicitly keeps the previously compiled rules live; it only raises when
+    forced or when nothing is loaded yet.
+    """
+    with rule_state.lock:
+        rule_state.checked_at = time.monotonic()
+        try:
+            mtime = os.stat(RULES_PATH).st_mtime
+            if not force and rule_state.compiled is not None and mtime == rule_state.mtime:
+                return rule_state.compiled
+            with open(RULES_PATH, "r", encoding="utf-8") as fh:
+                raw = fh.read()
+            compiled = parse_rules(raw)
+        except OSError:
+            if force or rule_state.compiled is None:
+                raise
+            # mtime stays as it was, so the file is re-read once it is back
+            logger.warning("Keeping rules %s; %s is unreadable", rule_state.compiled.version, RULES_PATH, exc_info=True)
+            return rule_state.compiled
+        except ValueError:
+            if force or rule_state.compiled is None:
+                raise
+            logger.exception("Keeping rules %s; reload of %s failed", rule_state.compiled.version, RULES_PATH)
+            rule_state.mtime = mtime
+            return rule_state.compiled
+        if rule_state.compiled is None or compiled.version != rule_state.compiled.version:
+            logger.info("Loaded fraud rules %s from %s", compiled.version, RULES_PATH)
+        rule_state.compiled = compiled
+        rule_state.mtime = mtime
+        return compiled
+
+
+def get_rules() -> CompiledRules:
+    # Hot reload without a watcher thread: the file is stat()ed at most once per
+    # CHECK_INTERVAL, so request handlers and scoring loops read the cached rules
+    compiled = rule_state.compiled
+    if compiled is not None and time.monotonic() - rule_state.checked_at < CHECK_INTERVAL:
+        return compiled
+    return reload_rules()
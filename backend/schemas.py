@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from backend.models import normalize_payment_method
 
 class UserBase(BaseModel):
     name: str
@@ -24,25 +25,74 @@ class BehaviorScoreOut(BaseModel):
     anomaly_score: float
     overall_risk_score: float
     engine_used: str
+    config_version: Optional[str] = None
+    ring_id: Optional[int] = None
+    ring_size: int = 1
+    ring_return_rate: float = 0.0
+    ring_refund_ratio: float = 0.0
+    duplicate_return_count: int = 0
+    refund_overage_count: int = 0
+    backdated_return_count: int = 0
     class Config:
         from_attributes = True
 
+class LeaderboardEntryOut(BaseModel):
+    user_id: int
+    overall_risk_score: float
+    engine_used: Optional[str] = None
+    risk_flag: bool = False
+    ring_size: Optional[int] = None
+
+class LeaderboardOut(BaseModel):
+    config_version: Optional[str] = None
+    generated_at: Optional[datetime] = None
+    total_users: int
+    avg_risk_score: float = 0.0
+    bands: Dict[str, int] = Field(default_factory=lambda: {"low": 0, "medium": 0, "high": 0})
+    histogram: List[int] = Field(default_factory=lambda: [0] * 5)
+    top: List[LeaderboardEntryOut]
+
+class ReturnViolationOut(BaseModel):
+    kind: str
+    transaction_id: str
+    item_id: str
+    refund_amount: float
+    price: Optional[float] = None
+    return_date: datetime
+    detected_at: datetime
+
+class FraudRingOut(BaseModel):
+    ring_id: int
+    ring_size: int
+    ring_return_rate: float
+    ring_refund_ratio: float
+    user_ids: List[int]
+
 class FraudAlertOut(BaseModel):
-    alert_id: int
+    alert_id: Optional[int] = None
     user_id: int
     date: datetime
     risk_score: float
     primary_reason: str
     status: str
+    config_version: Optional[str] = None
     class Config:
         from_attributes = True
 
 class UserDetailOut(UserOut):
     behavior_score: Optional[BehaviorScoreOut]
     fraud_alerts: List[FraudAlertOut] = []
+    return_violations: List[ReturnViolationOut] = []
     class Config:
         from_attributes = True
 
+class UserBatchIn(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=1000)
+
+class UserBatchOut(BaseModel):
+    users: List[UserDetailOut]
+    missing: List[int] = []
+
 class TransactionOut(BaseModel):
     transaction_id: str
     user_id: int
@@ -54,3 +104,35 @@ class TransactionOut(BaseModel):
     shipping_address_risk: str
     class Config:
         from_attributes = True
+
+class BacktestCandidate(BaseModel):
+    name: Optional[str] = None
+    overrides: Dict[str, Any] = {}
+
+class BacktestRequest(BaseModel):
+    candidates: List[BacktestCandidate]
+    max_flips: int = 1000
+
+class ReturnCheckIn(BaseModel):
+    user_id: int
+    transaction_id: Optional[str] = None
+    item_id: Optional[str] = None
+    refund_amount: float = 0.0
+    purchase_date: Optional[datetime] = None
+    return_date: Optional[datetime] = None
+    category: Optional[str] = None
+    payment_method: Optional[str] = None
+    shipping_address_risk: Optional[str] = None
+
+    _normalize_payment = field_validator("payment_method")(normalize_payment_method)
+
+class ReturnCheckOut(BaseModel):
+    user_id: int
+    risk_score: float
+    decision: str
+    reasons: List[str] = []
+    reasoning: str
+    engine_used: str
+    anomaly_score: float
+    config_version: str
+    feature_source: str
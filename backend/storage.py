@@ -0,0 +1,81 @@
+"""
+Storage interface shared by every route and job.
+
+The app talks to its collections (users, transactions, items, returns,
+behavior_scores, fraud_alerts, return_violations, plus analytics_rollups,
+analytics_sketches, stream_events and meta) through the Motor collection API.
+The Protocols below are the subset it relies on, and every function that takes
+a `db` is annotated with Database. Bulk upserts go through bulk_upsert() rather
+than bulk_write(), so callers never build driver operation objects.
+
+The app always runs on MongoDB (create_client()). backend/fake_store.py
+implements the same Protocols in process for the test suite and benchmarks;
+tests/test_storage.py runs the same queries against both.
+"""
+from typing import Any, Optional, Protocol, runtime_checkable
+
+DATABASE_NAME = "trustigo"
+
+COLLECTIONS = (
+    "users", "transactions", "items", "returns",
+    "behavior_scores", "fraud_alerts", "return_violations", "analytics_rollups",
+    "analytics_sketches", "stream_events", "meta",
+)
+
+
+@runtime_checkable
+class Cursor(Protocol):
+    def sort(self, key_or_list, direction=None) -> "Cursor": ...
+    def skip(self, n: int) -> "Cursor": ...
+    def limit(self, n: int) -> "Cursor": ...
+    def batch_size(self, n: int) -> "Cursor": ...
+    async def to_list(self, length: Optional[int] = None) -> list: ...
+    def __aiter__(self): ...
+
+
+@runtime_checkable
+class Collection(Protocol):
+    def find(self, filter: Optional[dict] = None, projection: Any = None) -> Cursor: ...
+    async def find_one(self, filter: Optional[dict] = None, projection: Any = None) -> Optional[dict]: ...
+    async def count_documents(self, filter: dict) -> int: ...
+    async def insert_one(self, document: dict): ...
+    async def insert_many(self, documents: list, ordered: bool = True): ...
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False): ...
+    async def find_one_and_update(self, filter: dict, update: dict, upsert: bool = False, return_document: bool = False): ...
+    async def delete_many(self, filter: dict): ...
+    def aggregate(self, pipeline: list) -> Cursor: ...
+    async def create_indexes(self, indexes: list): ...
+
+
+@runtime_checkable
+class Database(Protocol):
+    def __getattr__(self, name: str) -> Collection: ...
+    def __getitem__(self, name: str) -> Collection: ...
+
+
+@runtime_checkable
+class Client(Protocol):
+    def __getattr__(self, name: str) -> Database: ...
+    def __getitem__(self, name: str) -> Database: ...
+    def close(self) -> None: ...
+
+
+def create_client(uri: Optional[str] = None) -> Client:
+    """Returns a Motor client on `uri` (MONGO_URI by default); `.trustigo` is the Database."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from backend.database import MONGO_URI
+    from backend.db_stats import command_counter
+    return AsyncIOMotorClient(uri or MONGO_URI, event_listeners=[command_counter])
+
+
+async def bulk_upsert(collection: Collection, updates: list, ordered: bool = True):
+    """Applies each (filter, update) pair with upsert=True in a single round trip."""
+    if not updates:
+        return
+    # The fake store applies the pairs itself; it never sees driver operation objects
+    native = getattr(type(collection), "bulk_upsert", None)
+    if native is not None:
+        await native(collection, updates, ordered)
+        return
+    from pymongo import UpdateOne
+    await collection.bulk_write([UpdateOne(f, u, upsert=True) for f, u in updates], ordered=ordered)
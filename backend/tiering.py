@@ -0,0 +1,347 @@
+"""
+Hot/cold tiering. Scoring only reads the last `window_days` of activity, so
+transactions, their items and returns older than the retention window are moved
+out of the hot collections into month-partitioned Parquet files:
+
+    <TIERING_ARCHIVE_DIR>/dataset=<id>/<collection>/month=YYYY-MM/part-<batch>.parquet
+
+Every upload starts a new dataset id (kept in `meta`), so replacing the data
+leaves earlier archives in place without mixing them into the new dataset's
+rollups. Archives written before dataset ids existed sit directly under
+TIERING_ARCHIVE_DIR and are read when no dataset has been started. Nothing is
+deleted except by an explicit purge (DELETE /archive or --purge).
+
+Items have no date of their own and are partitioned by their transaction's month.
+Files are written before the hot copies are deleted, so an interrupted run can at
+worst leave a record in both tiers; readers drop duplicates on the record id.
+
+The monthly rollups already hold the archived months' totals, so the dashboard is
+unaffected. iter_archive() streams the rows in Parquet record batches, and
+read_archive() loads them into a DataFrame for callers that need one.
+
+    python -m backend.tiering --retention-days 180
+    python -m backend.tiering --purge [--dataset <id>]
+"""
+import asyncio
+import hashlib
+import os
+import secrets
+import shutil
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from backend.rule_config import get_rules
+from backend.storage import Database
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ARCHIVE_DIR = Path(os.getenv("TIERING_ARCHIVE_DIR", "archive"))
+RETENTION_DAYS = int(os.getenv("TIERING_RETENTION_DAYS", "180"))
+ARCHIVE_BATCH = 20000
+DATASET_ID = "archive_dataset"
+DATASET_PATTERN = r"^\d{8}T\d{6}-[0-9a-f]{6}$"
+
+# collection -> (fields identifying a record, date field used for the cutoff and partitioning)
+ARCHIVED = {
+    "transactions": (("transaction_id",), "date"),
+    "items": (("transaction_id", "item_id"), None),
+    "returns": (("return_id",), "return_date"),
+}
+
+
+def _month(dt) -> str:
+    # Stored datetimes come back as naive UTC from either backend
+    return f"{dt:%Y-%m}"
+
+
+def _dataset_dir(dataset=None) -> Path:
+    return ARCHIVE_DIR / f"dataset={dataset}" if dataset else ARCHIVE_DIR
+
+
+def _partition_dir(collection: str, month: str, dataset=None) -> Path:
+    return _dataset_dir(dataset) / collection / f"month={month}"
+
+
+async def current_dataset(db: Database):
+    """Id of the dataset the hot collections hold, or None before the first upload."""
+    doc = await db.meta.find_one({"_id": DATASET_ID})
+    return doc["dataset"] if doc else None
+
+
+async def start_dataset(db: Database) -> str:
+    """Called when an upload replaces the hot data; later archive runs write under the new id."""
+    dataset = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{secrets.token_hex(3)}"
+    await db.meta.update_one({"_id": DATASET_ID}, {"$set": {"dataset": dataset}}, upsert=True)
+    return dataset
+
+
+def list_datasets():
+    """Ids of the datasets with archived files."""
+    if not ARCHIVE_DIR.is_dir():
+        return []
+    return sorted(p.name.split("=", 1)[1] for p in ARCHIVE_DIR.glob("dataset=*") if p.is_dir())
+
+
+def _write_partitions(collection: str, docs, months, dataset=None):
+    """Writes docs (already stripped of _id) grouped by their month key."""
+    by_month = {}
+    for doc, month in zip(docs, months):
+        by_month.setdefault(month, []).append(doc)
+    id_fields = ARCHIVED[collection][0]
+    import pandas as pd
+    for month, rows in by_month.items():
+        # Named after the batch contents so a retried batch overwrites its own file
+        keys = sorted("/".join(str(r[f]) for f in id_fields) for r in rows)
+        digest = hashlib.blake2b("".join(keys).encode(), digest_size=8).hexdigest()
+        path = _partition_dir(collection, month, dataset)
+        path.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(rows).to_parquet(path / f"part-{digest}.parquet", index=False)
+
+
+async def _archive_transactions(db: Database, cutoff, stats, dataset):
+    cursor = db.transactions.find({"date": {"$lt": cutoff}}).batch_size(ARCHIVE_BATCH)
+    batch = []
+
+    async def flush():
+        ids = [t.pop("_id") for t in batch]
+        txn_month = {t["transaction_id"]: _month(t["date"]) for t in batch}
+        items = await db.items.find({"transaction_id": {"$in": list(txn_month)}}).to_list(length=None)
+        item_ids = [i.pop("_id") for i in items]
+        await asyncio.to_thread(_write_partitions, "transactions", batch, [txn_month[t["transaction_id"]] for t in batch], dataset)
+        if items:
+            await asyncio.to_thread(_write_partitions, "items", items, [txn_month[i["transaction_id"]] for i in items], dataset)
+            await db.items.delete_many({"_id": {"$in": item_ids}})
+        await db.transactions.delete_many({"_id": {"$in": ids}})
+        stats["transactions"] += len(batch)
+        stats["items"] += len(items)
+        batch.clear()
+
+    async for txn in cursor:
+        batch.append(txn)
+        if len(batch) >= ARCHIVE_BATCH:
+            await flush()
+    if batch:
+        await flush()
+
+
+async def _archive_returns(db: Database, cutoff, stats, dataset):
+    cursor = db.returns.find({"return_date": {"$lt": cutoff}}).batch_size(ARCHIVE_BATCH)
+    batch = []
+
+    async def flush():
+        ids = [r.pop("_id") for r in batch]
+        await asyncio.to_thread(_write_partitions, "returns", batch, [_month(r["return_date"]) for r in batch], dataset)
+        await db.returns.delete_many({"_id": {"$in": ids}})
+        stats["returns"] += len(batch)
+        batch.clear()
+
+    async for ret in cursor:
+        batch.append(ret)
+        if len(batch) >= ARCHIVE_BATCH:
+            await flush()
+    if batch:
+        await flush()
+
+
+async def archive_cold_data(db: Database, retention_days=None, now=None):
+    """
+    Moves records older than `retention_days` to Parquet. The retention window
+    may not be shorter than the scoring window, or scores would change.
+    """
+    retention_days = RETENTION_DAYS if retention_days is None else retention_days
+    window = get_rules().features.window_days
+    if retention_days < window:
+        raise ValueError(f"retention_days ({retention_days}) is shorter than the {window}-day scoring window")
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    stats = {"transactions": 0, "items": 0, "returns": 0}
+    dataset = await current_dataset(db)
+    await _archive_transactions(db, cutoff, stats, dataset)
+    await _archive_returns(db, cutoff, stats, dataset)
+    return {"cutoff": cutoff.isoformat(), "dataset": dataset, "archived": stats}
+
+
+def _partitions(collection: str, start=None, end=None, dataset=None):
+    root = _dataset_dir(dataset) / collection
+    if not root.is_dir():
+        return []
+    out = []
+    for path in sorted(root.glob("month=*")):
+        month = path.name.split("=", 1)[1]
+        if (start and month < start) or (end and month > end):
+            continue
+        out.extend(sorted(path.glob("*.parquet")))
+    return out
+
+
+def _check_collection(collection: str):
+    if collection not in ARCHIVED:
+        raise ValueError(f"{collection} is not archived; expected one of {', '.join(ARCHIVED)}")
+
+
+def _month_datasets(collection: str, start=None, end=None, dataset=None):
+    """One pyarrow dataset per archived month, over a schema unified across its files."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    by_month = {}
+    for f in _partitions(collection, start, end, dataset):
+        by_month.setdefault(f.parent, []).append(f)
+    for files in by_month.values():
+        schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+        yield ds.dataset([str(f) for f in files], schema=schema, format="parquet")
+
+
+def archive_columns(collection: str, start=None, end=None, dataset=None):
+    """Column names across the archived files of `collection`, read from the Parquet footers only."""
+    _check_collection(collection)
+    columns = {}
+    for month in _month_datasets(collection, start, end, dataset):
+        columns.update(dict.fromkeys(month.schema.names))
+    return list(columns)
+
+
+def iter_archive(collection: str, start=None, end=None, columns=None, user_ids=None, dataset=None):
+    """
+    Yields archived rows of `collection` as lists of dicts, one Parquet record batch
+    at a time, with the same filters as read_archive(). Memory holds one batch and
+    the ids seen in the current month, never the whole archive: a record is always
+    partitioned into the same month, so duplicates can only meet within one.
+    """
+    _check_collection(collection)
+    import pyarrow.compute as pc
+    id_fields = list(ARCHIVED[collection][0])
+    row_filter = pc.field("user_id").isin(list(user_ids)) if user_ids is not None else None
+    for month in _month_datasets(collection, start, end, dataset):
+        names = month.schema.names
+        read_cols = None if columns is None else [c for c in dict.fromkeys([*id_fields, *columns]) if c in names]
+        seen = set()
+        for batch in month.scanner(columns=read_cols, filter=row_filter, batch_size=ARCHIVE_BATCH).to_batches():
+            rows = []
+            for row in batch.to_pylist():
+                key = tuple(row[f] for f in id_fields)
+                # Copies left by an interrupted run are identical, so the first one wins
+                if key in seen:
+                    continue
+                seen.add(key)
+                rows.append(row if columns is None else {c: row.get(c) for c in columns})
+            if rows:
+                yield rows
+
+
+def read_archive(collection: str, start=None, end=None, columns=None, user_ids=None, dataset=None) -> "pd.DataFrame":
+    """
+    Archived rows of `collection` for months start..end ("YYYY-MM", inclusive),
+    optionally restricted to `columns` and (where the collection has it) user_ids.
+    """
+    _check_collection(collection)
+    import pandas as pd
+    id_fields = list(ARCHIVED[collection][0])
+    files = _partitions(collection, start, end, dataset)
+    if not files:
+        return pd.DataFrame(columns=list(columns) if columns else None)
+    read_cols = None if columns is None else list(dict.fromkeys([*id_fields, *columns, *(["user_id"] if user_ids is not None else [])]))
+    filters = [("user_id", "in", list(user_ids))] if user_ids is not None else None
+    df = pd.concat([pd.read_parquet(f, columns=read_cols, filters=filters) for f in files], ignore_index=True)
+    df = df.drop_duplicates(subset=id_fields, keep="last")
+    return df if columns is None else df[list(columns)]
+
+
+class ArchivedRefunds:
+    """
+    Per-user, per-month refund totals of one dataset's archived returns. Built in
+    one pass over its returns partitions and rebuilt only when the dataset or its
+    files change (an archive run, upload or purge), so rollup reclassification
+    doesn't re-read the archive on every analysis.
+    """
+
+    def __init__(self):
+        self.signature = None
+        self.by_user = {}
+
+    def _signature(self, dataset):
+        return dataset, tuple((str(f), f.stat().st_mtime_ns) for f in _partitions("returns", dataset=dataset))
+
+    def refresh(self, dataset=None):
+        signature = self._signature(dataset)
+        if signature == self.signature:
+            return
+        by_user = {}
+        for rows in iter_archive("returns", columns=["user_id", "return_date", "refund_amount"], dataset=dataset):
+            for r in rows:
+                months = by_user.setdefault(r["user_id"], {})
+                refund, count = months.get(_month(r["return_date"]), (0.0, 0))
+                months[_month(r["return_date"])] = (refund + (r["refund_amount"] or 0.0), count + 1)
+        self.signature, self.by_user = signature, by_user
+
+    def by_month(self, user_ids, dataset=None):
+        self.refresh(dataset)
+        out = {}
+        for user_id in user_ids:
+            for month, (refund, count) in self.by_user.get(user_id, {}).items():
+                total, n = out.get(month, (0.0, 0))
+                out[month] = (total + refund, n + count)
+        return out
+
+
+archived_refunds = ArchivedRefunds()
+
+
+def archived_refunds_by_month(user_ids, dataset=None):
+    """{month: (refund, count)} over archived returns of user_ids; used by rollup reclassification."""
+    return archived_refunds.by_month(user_ids, dataset)
+
+
+def clear_archive(dataset=None):
+    """Deletes one dataset's archive, or with no dataset the whole archive. Only called on an explicit purge."""
+    if dataset is not None:
+        shutil.rmtree(_dataset_dir(dataset), ignore_errors=True)
+        return [dataset]
+    purged = list_datasets()
+    for collection in ARCHIVED:
+        shutil.rmtree(ARCHIVE_DIR / collection, ignore_errors=True)
+    for name in purged:
+        shutil.rmtree(_dataset_dir(name), ignore_errors=True)
+    return purged
+
+
+async def _purge(dataset):
+    from dotenv import load_dotenv
+    load_dotenv()
+    from backend.response_cache import bump_generation
+    from backend.storage import create_client
+
+    purged = clear_archive(dataset)
+    client = create_client()
+    try:
+        await bump_generation(client.trustigo)
+    finally:
+        client.close()
+    print({"purged": purged})
+
+
+async def _main(retention_days):
+    from dotenv import load_dotenv
+    load_dotenv()
+    from backend.response_cache import bump_generation
+    from backend.storage import create_client
+
+    client = create_client()
+    try:
+        db = client.trustigo
+        result = await archive_cold_data(db, retention_days)
+        await bump_generation(db)
+    finally:
+        client.close()
+    print(result)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Archive records older than the retention window to Parquet.")
+    parser.add_argument("--retention-days", type=int, default=None)
+    parser.add_argument("--purge", action="store_true", help="delete archived files instead of archiving")
+    parser.add_argument("--dataset", help="with --purge, only this dataset's archive (default: all of it)")
+    args = parser.parse_args()
+    asyncio.run(_purge(args.dataset) if args.purge else _main(args.retention_days))
@@ -0,0 +1,132 @@
+"""
+Latency benchmark for POST /check-return under concurrent load.
+
+Runs entirely in-process: a synthetic cohort is scored to fit the anomaly model
+and prime the feature cache, then requests go through the ASGI app via httpx.
+Cache hits never touch storage, and misses go to the in-process store.
+
+    python -m benchmarks.check_return_latency --users 50000 --requests 5000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+from backend.database import db_state
+from backend.fraud_engine import calculate_final_scores
+from backend.main import app
+from backend.realtime import prime_feature_cache, score_return
+from backend.rule_config import ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER
+from backend.fake_store import FakeClient
+
+
+def synthetic_cohort(n_users, seed):
+    rng = np.random.default_rng(seed)
+    items = rng.integers(1, 30, n_users)
+    returns = np.minimum(rng.binomial(items, rng.beta(1, 6, n_users)), items)
+    spent = items * rng.uniform(20, 400, n_users)
+    refund = spent * (returns / items) * rng.uniform(0.5, 1.2, n_users)
+    txns = rng.integers(1, 15, n_users)
+    rows = []
+    for i in range(n_users):
+        r = int(returns[i])
+        rows.append({
+            "user_id": i + 1,
+            "return_rate_90d": r / int(items[i]),
+            "avg_return_time_days": float(rng.uniform(0, 20)) if r else 0.0,
+            "fast_return_count": int(rng.integers(0, r + 1)),
+            "high_value_return_count": int(rng.integers(0, min(r, 3) + 1)),
+            "refund_value_ratio": float(refund[i] / spent[i]),
+            "category_risk_score": float(rng.uniform(0, 100)),
+            "payment_risk_score": float(rng.choice([0.0, 30.0, 50.0])),
+            "engine_used": ENGINE_FIRST_ORDER if txns[i] <= 1 else ENGINE_BEHAVIORAL,
+            "txns_count": int(txns[i]),
+            "items_bought": int(items[i]),
+            "returns_count": r,
+            "total_spent": float(spent[i]),
+            "total_refund": float(refund[i]),
+            "total_return_days": float(rng.uniform(0, 20) * r),
+            "risky_returns_count": int(rng.integers(0, r + 1)),
+        })
+    return rows
+
+
+def summarize(label, latencies_s, wall_s):
+    ms = np.asarray(latencies_s) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"{label:<28} n={len(ms):<6} p50={p50:7.3f}ms p95={p95:7.3f}ms p99={p99:7.3f}ms "
+          f"max={ms.max():7.3f}ms  {len(ms) / wall_s:9.0f} req/s")
+
+
+def payloads(n_users, n, seed):
+    rng = np.random.default_rng(seed + 1)
+    out = []
+    for _ in range(n):
+        out.append({
+            "user_id": int(rng.integers(1, n_users + 1)),
+            "refund_amount": float(rng.uniform(10, 2500)),
+            "purchase_date": "2026-10-01T10:00:00Z",
+            "return_date": "2026-10-03T09:00:00Z",
+            "category": str(rng.choice(["Electronics", "Clothing", "Home"])),
+            "payment_method": str(rng.choice(["Credit Card", "COD"])),
+        })
+    return out
+
+
+async def http_load(bodies, concurrency):
+    latencies = []
+    queue = asyncio.Queue()
+    for b in bodies:
+        queue.put_nowait(b)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                body = queue.get_nowait()
+                t0 = time.perf_counter()
+                resp = await client.post("/check-return", json=body)
+                latencies.append(time.perf_counter() - t0)
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, time.perf_counter() - start
+
+
+async def main(args):
+    print(f"Fitting cohort of {args.users} synthetic users...")
+    scored = calculate_final_scores(synthetic_cohort(args.users, args.seed))
+    prime_feature_cache(scored)
+    # Only consulted on cache misses
+    db_state.client = FakeClient()
+
+    bodies = payloads(args.users, args.requests, args.seed)
+
+    # Scoring core without HTTP/validation overhead
+    from backend.schemas import ReturnCheckIn
+    parsed = [ReturnCheckIn(**b).model_dump() for b in bodies]
+    by_user = {row["user_id"]: row for row in scored}
+    lat = []
+    start = time.perf_counter()
+    for p in parsed:
+        t0 = time.perf_counter()
+        score_return(by_user.get(p["user_id"]), p)
+        lat.append(time.perf_counter() - t0)
+    summarize("score_return (in-process)", lat, time.perf_counter() - start)
+
+    for c in args.concurrency:
+        lat, wall = await http_load(bodies, c)
+        summarize(f"POST /check-return c={c}", lat, wall)
+
+    db_state.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
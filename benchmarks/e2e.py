@@ -0,0 +1,198 @@
+"""
+End-to-end benchmark: upload -> analysis -> dashboard reads, at several dataset
+sizes, through the ASGI app in-process.
+
+For each size it records wall time, rows/s (users/s for analysis), p50/p99
+latency of the read endpoints, peak RSS and database round trips. Results go to
+a JSON file and are compared against a stored baseline:
+
+    python -m benchmarks.e2e --sizes 2000 10000 50000                 # in-process fake store
+    python -m benchmarks.e2e --backend mongo --database trustigo_bench  # local mongod
+    python -m benchmarks.e2e --save-baseline                          # record a new baseline
+
+With --backend mongo the named database is wiped by each upload; never point it
+at real data. The response cache is disabled so reads measure the handlers.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from backend.database import db_state, get_db
+from backend.db_stats import track_db
+from backend.indexes import ensure_indexes
+from backend.main import app
+from backend.fake_store import FakeClient
+from backend.storage import create_client
+from dataset.synthetic import to_csv_bytes
+
+RESULTS_DIR = Path(__file__).parent / "results"
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# metric -> True if higher is better
+METRIC_DIRECTION = {
+    "wall_s": False, "rows_per_s": True, "users_per_s": True,
+    "p50_ms": False, "p99_ms": False, "round_trips": False,
+}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+async def timed(client, method, path, **kwargs):
+    with track_db() as stats:
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return response, elapsed, stats.round_trips
+
+
+async def latency(client, path, repeat):
+    samples, trips = [], 0
+    for _ in range(repeat):
+        _, elapsed, trips = await timed(client, "GET", path)
+        samples.append(elapsed * 1000)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "round_trips": trips,
+    }
+
+
+async def bench_size(client, n_rows, args):
+    # Inside the 90-day analysis window
+    payload = to_csv_bytes(n_rows, seed=args.seed, days=85)
+    rows = []
+
+    response, elapsed, trips = await timed(client, "POST", "/upload-csv",
+                                           files={"file": ("bench.csv", payload, "text/csv")})
+    n_users = response.json()["stats"]["new_users"]
+    rows.append({"step": "upload", "wall_s": round(elapsed, 3), "rows_per_s": round(n_rows / elapsed, 1),
+                 "round_trips": trips, "peak_rss_mb": peak_rss_mb()})
+
+    _, elapsed, trips = await timed(client, "POST", "/run-fraud-analysis")
+    rows.append({"step": "analysis", "wall_s": round(elapsed, 3), "users_per_s": round(n_users / elapsed, 1),
+                 "round_trips": trips, "peak_rss_mb": peak_rss_mb()})
+
+    for step, path in (("analytics_summary", "/analytics-summary"),
+                       ("fraud_users", "/fraud-users"),
+                       ("fraud_users_page", "/fraud-users?limit=100&lean=true")):
+        rows.append({"step": step, **await latency(client, path, args.repeat), "peak_rss_mb": peak_rss_mb()})
+
+    for row in rows:
+        row.update(rows=n_rows, users=n_users)
+    return rows
+
+
+def compare(results, baseline, tolerance):
+    """Returns human-readable regressions beyond `tolerance` (fractional)."""
+    base = {(r["rows"], r["step"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = base.get((r["rows"], r["step"]))
+        if b is None:
+            continue
+        for metric, higher_is_better in METRIC_DIRECTION.items():
+            if metric not in r or metric not in b or not b[metric]:
+                continue
+            change = (r[metric] - b[metric]) / b[metric]
+            worse = -change if higher_is_better else change
+            # Round trips are exact counts, so any increase is a regression
+            limit = 0 if metric == "round_trips" else tolerance
+            if worse > limit:
+                regressions.append(f"{r['step']} @ {r['rows']} rows: {metric} {b[metric]} -> {r[metric]} ({change:+.0%})")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    import backend.response_cache as response_cache
+    response_cache.CACHE_ENABLED = False
+
+    db_state.client = FakeClient() if args.backend == "fake" else create_client()
+    db = db_state.client[args.database]
+
+    def bench_db():
+        return db
+    app.dependency_overrides[get_db] = bench_db
+    await ensure_indexes(db)
+
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        for n in args.sizes:
+            for row in await bench_size(client, n, args):
+                results.append(row)
+                metrics = ", ".join(f"{k}={v}" for k, v in row.items() if k not in ("step", "rows", "users"))
+                print(f"{row['step']:<18} rows={n:<8} {metrics}")
+    app.dependency_overrides.clear()
+    db_state.client.close()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "seed": args.seed,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = Path(args.output) if args.output else RESULTS_DIR / f"e2e-{args.backend}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print("No baseline to compare against; run with --save-baseline to record one.")
+        return 0
+    baseline = json.loads(baseline_path.read_text())
+    if baseline["meta"].get("backend") != args.backend:
+        print(f"Baseline was recorded on the {baseline['meta'].get('backend')} backend; skipping comparison.")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} against baseline {baseline['meta'].get('commit')}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000], help="CSV rows per run")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--database", default="trustigo_bench")
+    parser.add_argument("--repeat", type=int, default=20, help="samples per read endpoint")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/e2e-<backend>-<time>.json)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging, e.g. 0.2 = 20%%")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,114 @@
+"""
+Cold-start benchmark: measures the cost of importing the app with
+`python -X importtime`, in fresh interpreters.
+
+Each run reports the median cumulative import time of the module and the
+packages that account for most of it. It is appended to a history file, so the
+trend over commits stays visible. It fails if a module that backend.preload
+defers (pandas, scikit-learn, pyarrow) shows up in the import graph, or if the
+total goes over --budget-ms.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module backend.routes.users --repeat 10 --budget-ms 800
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from backend.preload import HEAVY_MODULES
+
+HISTORY_PATH = Path(__file__).parent / "results" / "import_time.jsonl"
+
+
+def parse_importtime(stderr: str):
+    """-> {module: (self_us, cumulative_us)} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(module: str):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def by_package(modules):
+    totals = defaultdict(int)
+    for name, (self_us, _) in modules.items():
+        totals[name.split(".")[0]] += self_us
+    return totals
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args):
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    total_ms = statistics.median(run[args.module][1] for run in runs) / 1000
+    packages = {
+        pkg: round(statistics.median(by_package(run).get(pkg, 0) for run in runs) / 1000, 1)
+        for pkg in by_package(runs[0])
+    }
+    top = dict(sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[: args.top])
+
+    print(f"import {args.module}: {total_ms:.1f} ms (median of {args.repeat})")
+    for pkg, ms in top.items():
+        print(f"  {pkg:<24} {ms:>8.1f} ms")
+
+    history = HISTORY_PATH.read_text().splitlines() if HISTORY_PATH.exists() else []
+    previous = next((json.loads(line) for line in reversed(history) if json.loads(line)["module"] == args.module), None)
+    if previous:
+        change = (total_ms - previous["total_ms"]) / previous["total_ms"]
+        print(f"Previous run ({previous['commit']}, {previous['created_at'][:10]}): {previous['total_ms']:.1f} ms ({change:+.0%})")
+
+    record = {
+        "module": args.module,
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "total_ms": round(total_ms, 1),
+        "top_packages_ms": top,
+    }
+    if not args.no_history:
+        HISTORY_PATH.parent.mkdir(exist_ok=True)
+        with HISTORY_PATH.open("a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    failed = False
+    leaked = sorted({m for run in runs for m in run} & {m.split(".")[0] for m in HEAVY_MODULES})
+    if leaked:
+        print(f"FAIL deferred modules imported eagerly: {', '.join(leaked)}")
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"FAIL {total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters to sample")
+    parser.add_argument("--top", type=int, default=10, help="packages to list")
+    parser.add_argument("--budget-ms", type=float, help="fail if the median import takes longer")
+    parser.add_argument("--no-history", action="store_true", help=f"don't append to {HISTORY_PATH.name}")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""
+N+1 regression guard: counts database round trips per endpoint against the
+in-process store for cohorts of different sizes and fails if any endpoint goes
+over its budget. Budgets are constant, or grow with the number of METRICS_BATCH
+blocks for analysis, so an accidental per-row query shows up immediately.
+tests/test_round_trips.py runs the same budgets under pytest.
+
+    python -m benchmarks.round_trips --users 50 200
+"""
+import argparse
+import asyncio
+import io
+import math
+import sys
+
+from backend.behavior_score import METRICS_BATCH
+from backend.database import db_state
+from backend.db_stats import measure_round_trips
+from backend.indexes import ensure_indexes
+from backend.main import app
+from backend.fake_store import FakeClient
+
+ORDERS_PER_USER = 3
+
+# (method, path, budget(n_users, n_returns)); {uid} and {uids} are filled in per run
+BUDGETS = [
+    ("POST", "/upload-csv", lambda n, r: 23),
+    # Four feature queries per METRICS_BATCH users; everything else (linkage rebuild,
+    # score bulk write, alert check and insert, rollup reclassification, stream events) is constant
+    ("POST", "/run-fraud-analysis", lambda n, r: 19 + 4 * math.ceil(n / METRICS_BATCH)),
+    ("GET", "/fraud-users?limit=100", lambda n, r: 2),
+    ("GET", "/fraud-users/top", lambda n, r: 1),
+    ("GET", "/user/{uid}", lambda n, r: 4),
+    ("POST", "/users/batch", lambda n, r: 4),
+    ("GET", "/analytics-summary", lambda n, r: 4),
+    ("GET", "/analytics-sketches", lambda n, r: 1),
+    ("POST", "/check-return", lambda n, r: 2),
+]
+
+
+def cohort_csv(n_users: int) -> bytes:
+    """Every user places ORDERS_PER_USER orders and returns the first one."""
+    buf = io.StringIO()
+    buf.write("amazon-order-id,buyer-name,sku,item-price,purchase-date,return-date\n")
+    for u in range(1, n_users + 1):
+        for k in range(ORDERS_PER_USER):
+            ret = "2026-09-03T10:00:00Z" if k == 0 else ""
+            buf.write(f"ORD-{u}-{k},{u},SKU-{u}-{k},{50 + 10 * k},2026-09-0{k + 1}T10:00:00Z,{ret}\n")
+    return buf.getvalue().encode()
+
+
+def request_kwargs(method, path, n_users):
+    if path == "/upload-csv":
+        return {"files": {"file": ("cohort.csv", cohort_csv(n_users), "text/csv")}}
+    if path == "/users/batch":
+        return {"json": {"user_ids": list(range(1, min(n_users, 1000) + 1))}}
+    if path == "/check-return":
+        return {"json": {"user_id": 1, "refund_amount": 120.0}}
+    return {}
+
+
+async def run(n_users: int) -> bool:
+    db_state.client = FakeClient()
+    await ensure_indexes(db_state.client.trustigo)
+    ok = True
+    for method, path, budget in BUDGETS:
+        limit = budget(n_users, n_users)
+        stats = await measure_round_trips(app, method, path.format(uid=1), **request_kwargs(method, path, n_users))
+        verdict = "ok" if stats.round_trips <= limit else "OVER BUDGET"
+        ok &= stats.round_trips <= limit
+        print(f"{method:<5}{path:<26} users={n_users:<6} round_trips={stats.round_trips:<7} budget={limit:<7} {verdict}")
+    return ok
+
+
+async def main(args):
+    import backend.response_cache as response_cache
+    # Measure the handlers, not cache hits
+    response_cache.CACHE_ENABLED = False
+    results = [await run(n) for n in args.users]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[50, 200])
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,124 @@
+"""
+Request-time comparison of the default (response_model validated) and lean
+(`?lean=true`) serialization paths for /fraud-users and /transactions.
+
+To isolate serialization from MongoDB, get_db is overridden with static
+collections that hand back pre-built documents, so the numbers below are the
+FastAPI/Pydantic/JSON cost only.
+
+    python -m benchmarks.serialization --sizes 1000 15000 100000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+
+from backend.database import get_db
+from backend.main import app
+from backend.rule_config import ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER
+
+
+class StaticCursor:
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._limit = None
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    async def to_list(self, length=None):
+        docs = self._docs[: self._limit]
+        if self._projection:
+            keep = [k for k, v in self._projection.items() if v and k != "_id"]
+            return [{k: d[k] for k in keep if k in d} for d in docs]
+        # Motor hands back fresh dicts with an _id on every call
+        return [dict(d, _id=i) for i, d in enumerate(docs)]
+
+
+class StaticCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query=None, projection=None):
+        return StaticCursor(self.docs, projection)
+
+
+class StaticDb:
+    def __init__(self, n, seed=7):
+        rng = np.random.default_rng(seed)
+        now = datetime(2026, 10, 1)
+        self.behavior_scores = StaticCollection([{
+            "user_id": i,
+            "return_rate_90d": float(rng.random()),
+            "avg_return_time_days": float(rng.random() * 20),
+            "fast_return_count": int(rng.integers(0, 6)),
+            "high_value_return_count": int(rng.integers(0, 4)),
+            "refund_value_ratio": float(rng.random()),
+            "category_risk_score": float(rng.random() * 100),
+            "payment_risk_score": float(rng.choice([0.0, 30.0, 50.0])),
+            "anomaly_score": float(rng.random()),
+            "overall_risk_score": float(round(rng.random() * 100, 2)),
+            "engine_used": ENGINE_BEHAVIORAL if rng.random() > 0.2 else ENGINE_FIRST_ORDER,
+            "config_version": "bench",
+        } for i in range(n)])
+        self.transactions = StaticCollection([{
+            "transaction_id": f"TXN-{i}",
+            "user_id": int(rng.integers(1, n + 1)),
+            "date": now - timedelta(minutes=i),
+            "total_amount": float(round(rng.random() * 500, 2)),
+            "payment_method": "Credit Card",
+            "ip_address": "10.0.0.1",
+            "device_fingerprint": "abc123",
+            "shipping_address_risk": "Low",
+        } for i in range(n)])
+
+
+async def time_request(client, url, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        r = await client.get(url)
+        r.raise_for_status()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000, len(r.content)
+
+
+async def main(args):
+    # Bypass the response cache so every request renders
+    import backend.response_cache as response_cache
+    response_cache.CACHE_ENABLED = False
+
+    print(f"{'endpoint':<14}{'rows':>8}{'validated ms':>15}{'lean ms':>10}{'speed-up':>10}{'bytes':>12}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for n in args.sizes:
+            db = StaticDb(n)
+
+            # No parameters: FastAPI would treat them as query params and deep-copy defaults
+            def static_db():
+                return db
+            app.dependency_overrides[get_db] = static_db
+            for path in ("/fraud-users", "/transactions"):
+                full, size = await time_request(client, f"{path}?limit={n}", args.repeat)
+                lean, _ = await time_request(client, f"{path}?limit={n}&lean=true", args.repeat)
+                print(f"{path:<14}{n:>8}{full:>15.1f}{lean:>10.1f}{full / lean:>9.1f}x{size:>12}")
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 15000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,303 @@
+"""
+Deterministic synthetic order exports for load tests, built with vectorized NumPy.
+
+Shoppers are drawn from a mix of behaviour profiles, each with its own order
+volume, return rate, time-to-return and price range:
+
+    normal              occasional returns, weeks after purchase
+    serial_returner     returns most of what they buy
+    wardrober           returns within 0-2 days of purchase
+    high_value_abuser   expensive electronics, mostly returned
+    cold_start          new account, one or two high-value orders, instant return
+
+Abusive accounts are grouped into rings that share a device pool and an IP
+range. Each line is one order with a unique SKU, in the Amazon or Flipkart
+export schema accepted by /upload-csv. The buyer column carries the numeric
+shopper id, so uploads skip the hashed-name fallback. Rows are produced in
+chunks and appended to CSV, gzip-compressed CSV or Parquet, so memory stays
+flat at any size:
+
+    python -m dataset.synthetic --rows 20000000 --output orders.csv.gz
+    python -m dataset.synthetic --rows 1000000 --schema flipkart --output orders.parquet \\
+        --mix serial_returner=0.05 wardrober=0.03 high_value_abuser=0.01 cold_start=0.02
+
+The same --rows, --seed, --end and --chunk-rows always produce the same file.
+"""
+import argparse
+import gzip
+import io
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+# orders: mean orders per shopper in the window (Poisson, at least one)
+# return_days: inclusive range of days between purchase and return
+# price: (low, high) for uniform prices, or None for the log-normal everyday basket
+# recent_days: purchases only within this many days of --end (new accounts)
+# payment: weights over PAYMENT_METHODS
+PROFILES = {
+    "normal": {
+        "orders": 4, "return_rate": 0.08, "return_days": (3, 30),
+        "price": None, "recent_days": None, "payment": (0.45, 0.25, 0.15, 0.05, 0.10),
+    },
+    "serial_returner": {
+        "orders": 10, "return_rate": 0.85, "return_days": (2, 20),
+        "price": None, "recent_days": None, "payment": (0.40, 0.20, 0.10, 0.15, 0.15),
+    },
+    "wardrober": {
+        "orders": 8, "return_rate": 0.70, "return_days": (0, 2),
+        "price": (30, 250), "recent_days": None, "payment": (0.40, 0.20, 0.10, 0.10, 0.20),
+    },
+    "high_value_abuser": {
+        "orders": 6, "return_rate": 0.75, "return_days": (3, 25),
+        "price": (1200, 3500), "recent_days": None, "payment": (0.30, 0.10, 0.05, 0.35, 0.20),
+    },
+    "cold_start": {
+        "orders": 1.5, "return_rate": 0.90, "return_days": (0, 1),
+        "price": (1500, 3000), "recent_days": 10, "payment": (0.25, 0.05, 0.05, 0.40, 0.25),
+    },
+}
+DEFAULT_MIX = {"serial_returner": 0.03, "wardrober": 0.02, "high_value_abuser": 0.01, "cold_start": 0.02}
+
+# Cash on delivery is written the way Amazon exports it; /upload-csv also accepts the long form
+PAYMENT_METHODS = pa.array(["Credit Card", "Debit Card", "UPI", "Gift Card", "COD"])
+
+# Column order per export schema, keyed by the internal column names
+SCHEMAS = {
+    "amazon": {
+        "order_id": "amazon-order-id", "user_id": "buyer-name", "sku": "sku", "price": "item-price",
+        "purchase_date": "purchase-date", "return_date": "return-date", "payment_method": "payment-method",
+        "device_fingerprint": "device-fingerprint", "ip_address": "ip-address",
+    },
+    "flipkart": {
+        "order_id": "Order ID", "user_id": "Customer ID", "sku": "Item ID", "price": "Price",
+        "purchase_date": "Order Date", "return_date": "Return Date", "payment_method": "Payment Mode",
+        "device_fingerprint": "Device ID", "ip_address": "IP Address",
+    },
+}
+ORDER_PREFIX = {"amazon": "AMZ-", "flipkart": "OD"}
+DATE_FORMAT = {"amazon": "%Y-%m-%dT%H:%M:%SZ", "flipkart": "%Y-%m-%d %H:%M:%S"}
+
+RING_SIZE = 8
+DAY = np.timedelta64(1, "D")
+SECOND = np.timedelta64(1, "s")
+
+
+def parse_mix(pairs) -> dict:
+    """['wardrober=0.05', ...] -> full profile mix; whatever is left over is 'normal'."""
+    mix = dict(DEFAULT_MIX)
+    for pair in pairs or ():
+        name, _, share = pair.partition("=")
+        if name not in PROFILES or name == "normal":
+            raise ValueError(f"Unknown fraud profile {name!r}; expected one of {', '.join(p for p in PROFILES if p != 'normal')}")
+        mix[name] = float(share)
+    if any(share < 0 for share in mix.values()) or sum(mix.values()) > 1:
+        raise ValueError("Profile shares must be non-negative and sum to at most 1")
+    return {"normal": 1 - sum(mix.values()), **mix}
+
+
+_HEX = np.array([f"{i:02x}".encode() for i in range(256)]).view(np.uint16)
+
+
+def _fingerprints(rng, n):
+    # 64 random bits as 16 hex digits: one lookup per byte, no per-value formatting
+    raw = rng.integers(0, 2 ** 63, n, dtype=np.int64).astype(">u8").view(np.uint8).reshape(n, 8)
+    digits = pa.array(np.ascontiguousarray(_HEX[raw]).view("S16").ravel(), pa.binary()).cast(pa.string())
+    return pc.binary_join_element_wise("fp-", digits, "")
+
+
+def _ips(subnets, hosts):
+    octets = [pc.cast(pa.array((subnets | hosts) >> shift & 0xFF), pa.string()) for shift in (24, 16, 8, 0)]
+    return pc.binary_join_element_wise(*octets, ".")
+
+
+def generate_chunk(rng, first_user: int, n_users: int, mix: dict, end: np.datetime64, days: int) -> dict:
+    """Columns for shoppers `first_user..first_user+n_users-1` and all their orders, in purchase order."""
+    names = list(mix)
+    profile = rng.choice(len(names), n_users, p=[mix[n] for n in names])
+    user_ids = np.arange(first_user, first_user + n_users)
+
+    # Per-shopper identity: abusive shoppers share a ring-wide device pool and /24;
+    # one shopper in five also orders from a second device
+    devices = np.arange(n_users)
+    subnets = rng.integers(1 << 24, 224 << 24, n_users) & ~0xFF
+    abusive = np.flatnonzero(profile != names.index("normal"))
+    ring = np.arange(len(abusive)) // RING_SIZE
+    # Ring members log in from one of the first two members' devices
+    devices[abusive] = abusive[np.minimum(ring * RING_SIZE + rng.integers(0, 2, len(abusive)), len(abusive) - 1)]
+    subnets[abusive] = subnets[abusive[ring * RING_SIZE]]
+    hosts = rng.integers(1, 255, n_users)
+    two_devices = rng.random(n_users) < 0.2
+
+    # Orders per shopper, then expand every per-shopper array to one entry per order
+    mean_orders = np.array([PROFILES[name]["orders"] for name in names])
+    orders = 1 + rng.poisson(mean_orders[profile] - 1)
+    owner = np.repeat(np.arange(n_users), orders)
+    n = len(owner)
+    row_profile = profile[owner]
+
+    prices = np.empty(n)
+    returned = np.empty(n, dtype=bool)
+    keep_days = np.empty(n, dtype=np.int64)
+    ago = np.empty(n, dtype=np.int64)
+    payment = np.empty(n, dtype=np.int64)
+    for p, name in enumerate(names):
+        mask = row_profile == p
+        m = int(mask.sum())
+        if not m:
+            continue
+        spec = PROFILES[name]
+        if spec["price"] is None:
+            prices[mask] = np.clip(rng.lognormal(4.0, 0.9, m), 5, 5000)
+        else:
+            prices[mask] = rng.uniform(*spec["price"], m)
+        returned[mask] = rng.random(m) < spec["return_rate"]
+        keep_days[mask] = rng.integers(spec["return_days"][0], spec["return_days"][1] + 1, m)
+        ago[mask] = rng.integers(0, (spec["recent_days"] or days) * 86400, m)
+        payment[mask] = rng.choice(len(PAYMENT_METHODS), m, p=spec["payment"])
+
+    purchased = end - ago * SECOND
+    return_at = purchased + keep_days * DAY + rng.integers(0, 86400, n) * SECOND
+    # Nothing can come back after the export was taken
+    returned &= return_at <= end
+
+    # Device table: [own devices..., second devices...]
+    device_idx = devices[owner] + n_users * (two_devices[owner] & (rng.random(n) < 0.5))
+    order = np.argsort(purchased, kind="stable")
+    owner, device_idx, row_profile = owner[order], device_idx[order], row_profile[order]
+    return {
+        "user_id": pa.array(user_ids[owner]),
+        "price": pa.array(prices[order].round(2)),
+        "purchase_date": pa.array(purchased[order], pa.timestamp("s", tz="UTC")),
+        "return_date": pa.array(return_at[order], pa.timestamp("s", tz="UTC"), mask=~returned[order]),
+        "payment_method": PAYMENT_METHODS.take(pa.array(payment[order])),
+        "device_fingerprint": _fingerprints(rng, 2 * n_users).take(pa.array(device_idx)),
+        "ip_address": _ips(subnets, hosts).take(pa.array(owner)),
+        "profile": pa.array(names).take(pa.array(row_profile)),
+    }
+
+
+def iter_chunks(rows: int, seed: int = 42, mix: dict = None, end: datetime = None,
+                days: int = 120, chunk_rows: int = 500_000, schema: str = "amazon", labels: bool = False):
+    """Yields Arrow tables in export column order until `rows` orders have been produced.
+
+    With `labels`, a trailing fraud-profile column carries each shopper's ground truth.
+    """
+    mix = mix or parse_mix(())
+    end = end or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    end64 = np.datetime64(end.astimezone(timezone.utc).replace(tzinfo=None), "s")
+    columns = dict(SCHEMAS[schema], **({"profile": "fraud-profile"} if labels else {}))
+    orders_per_user = sum(share * PROFILES[name]["orders"] for name, share in mix.items())
+    users_per_chunk = max(int(min(chunk_rows, rows) / orders_per_user), 1)
+
+    produced, first_user, chunk = 0, 1, 0
+    while produced < rows:
+        # Each chunk has its own stream, so the output doesn't depend on what ran before
+        rng = np.random.default_rng([seed, chunk])
+        data = generate_chunk(rng, first_user, users_per_chunk, mix, end64, days)
+        n = min(len(data["user_id"]), rows - produced)
+        numbers = pc.cast(pa.array(np.arange(produced + 1, produced + n + 1)), pa.string())
+        data["order_id"] = pc.binary_join_element_wise(ORDER_PREFIX[schema], numbers, "")
+        data["sku"] = pc.binary_join_element_wise("SKU-", numbers, "")
+        yield pa.table({header: data[key][:n] for key, header in columns.items()})
+        produced += n
+        first_user += users_per_chunk
+        chunk += 1
+
+
+def _csv_ready(table: pa.Table, schema: str) -> pa.Table:
+    # Render timestamps in the export's own format; returns that never happened stay empty
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, pc.strftime(table[i], format=DATE_FORMAT[schema]))
+    return table
+
+
+def _write_csv(handle, tables, schema: str) -> int:
+    written, writer = 0, None
+    for table in tables:
+        table = _csv_ready(table, schema)
+        if writer is None:
+            # Values never contain separators or quotes, so nothing (header included) is quoted
+            handle.write((",".join(table.column_names) + "\n").encode())
+            options = pcsv.WriteOptions(include_header=False, quoting_style="none")
+            writer = pcsv.CSVWriter(handle, table.schema, write_options=options)
+        writer.write_table(table)
+        written += len(table)
+    if writer is not None:
+        writer.close()
+    return written
+
+
+def to_csv_bytes(rows: int, **kwargs) -> bytes:
+    """Whole export in memory, for in-process benchmarks and tests."""
+    buf = io.BytesIO()
+    _write_csv(buf, iter_chunks(rows, **kwargs), kwargs.get("schema", "amazon"))
+    return buf.getvalue()
+
+
+def _format_for(path: str) -> str:
+    if path.endswith(".parquet"):
+        return "parquet"
+    return "gzip" if path.endswith(".gz") else "csv"
+
+
+def write(path: str, rows: int, fmt: str = None, **kwargs) -> int:
+    """Streams `rows` orders to `path` chunk by chunk; returns the number written."""
+    fmt = fmt or _format_for(path)
+    tables = iter_chunks(rows, **kwargs)
+    if fmt == "parquet":
+        writer, written = None, 0
+        try:
+            for table in tables:
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+                writer.write_table(table)
+                written += len(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    opener = (lambda p: gzip.open(p, "wb", compresslevel=1)) if fmt == "gzip" else (lambda p: open(p, "wb"))
+    with opener(path) as handle:
+        return _write_csv(handle, tables, kwargs.get("schema", "amazon"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="order lines to generate")
+    parser.add_argument("--output", default="synthetic_orders.csv", help=".csv, .csv.gz or .parquet")
+    parser.add_argument("--format", choices=["csv", "gzip", "parquet"], help="override the format implied by --output")
+    parser.add_argument("--schema", choices=list(SCHEMAS), default="amazon")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", nargs="*", metavar="PROFILE=SHARE",
+                        help=f"share of shoppers per fraud profile (default {' '.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="export timestamp (default: now, to the hour)")
+    parser.add_argument("--days", type=int, default=120, help="history covered by the export")
+    parser.add_argument("--labels", action="store_true", help="add a fraud-profile ground-truth column")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="rows generated and written per step")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    end = args.end.replace(tzinfo=args.end.tzinfo or timezone.utc) if args.end else None
+
+    start = time.perf_counter()
+    written = write(args.output, args.rows, args.format, seed=args.seed, mix=mix, end=end,
+                    days=args.days, chunk_rows=args.chunk_rows, schema=args.schema, labels=args.labels)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {written} rows to {args.output} in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
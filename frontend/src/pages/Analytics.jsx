@@ -32,8 +32,8 @@ export default function Analytics() {
         // Create CSV Header
         let csvContent = "data:text/csv;charset=utf-8,Month,Gross Volume,Expected Earnings,Capital Saved (Prevented Loss),Unrecognized Leakage,Blocked Transactions,Manual Reviews\n";
 
-        // Loop through the 7 periods and create rows
-        const labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul'];
+        // Loop through the monthly rollup periods and create rows
+        const labels = data.timeseries_labels;
         labels.forEach((month, index) => {
             // Because Gross Volume is a single total right now, we can just distribute it or leave it blank per month. We'll leave it blank for monthly and put the sums at the bottom.
             const expected = data.revenue_timeseries.expected_earnings[index];
@@ -74,7 +74,7 @@ export default function Analytics() {
     );
 
     const revenueLossData = {
-        labels: ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul'],
+        labels: data.timeseries_labels,
         datasets: [
             {
                 label: 'Expected Earnings ($)',
@@ -14,6 +14,7 @@ const API_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000';
 
 export default function DashboardOverview() {
     const [data, setData] = useState([]);
+    const [board, setBoard] = useState({ bands: { low: 0, medium: 0, high: 0 }, histogram: [0, 0, 0, 0, 0] });
     const [stats, setStats] = useState({ total: 0, fraud: 0, avg: 0 });
     const [loading, setLoading] = useState(true);
     const [evaluating, setEvaluating] = useState(false);
@@ -21,12 +22,11 @@ export default function DashboardOverview() {
 
     const fetchUsers = async () => {
         try {
-            const res = await axios.get(`${API_URL}/fraud-users`);
-            setData(res.data);
-            const total = res.data.length;
-            const fraud = res.data.filter(u => u.overall_risk_score >= 60).length;
-            const avg = res.data.reduce((acc, curr) => acc + curr.overall_risk_score, 0) / (total || 1);
-            setStats({ total, fraud, avg: avg.toFixed(1) });
+            // Top-K leaderboard and overview counters, kept up to date by each analysis run
+            const res = await axios.get(`${API_URL}/fraud-users/top`, { params: { limit: 5 } });
+            setData(res.data.top);
+            setBoard(res.data);
+            setStats({ total: res.data.total_users, fraud: res.data.bands.high, avg: res.data.avg_risk_score.toFixed(1) });
         } catch (e) {
             console.error("Failed to fetch dashboard data", e);
         } finally {
@@ -36,6 +36,11 @@ export default function DashboardOverview() {
 
     useEffect(() => {
         fetchUsers();
+        // Refetch only when the server reports new data, instead of polling
+        const events = new EventSource(`${API_URL}/alerts/stream`);
+        events.addEventListener('analysis', fetchUsers);
+        events.addEventListener('reset', fetchUsers);
+        return () => events.close();
     }, []);
 
     const handleRunAnalysis = async () => {
@@ -94,12 +99,7 @@ export default function DashboardOverview() {
         );
     }
 
-    const bins = [0, 0, 0, 0, 0];
-    data.forEach(u => {
-        let idx = Math.floor(u.overall_risk_score / 20);
-        if (idx > 4) idx = 4;
-        bins[idx]++;
-    });
+    const bins = board.histogram;
 
     const barData = {
         labels: ['0-20', '21-40', '41-60', '61-80', '81-100'],
@@ -112,8 +112,8 @@ export default function DashboardOverview() {
         }]
     };
 
-    const safe = data.filter(u => u.overall_risk_score < 30).length;
-    const med = data.filter(u => u.overall_risk_score >= 30 && u.overall_risk_score < 60).length;
+    const safe = board.bands.low;
+    const med = board.bands.medium;
     const high = stats.fraud;
 
     const doughData = {
@@ -283,8 +283,6 @@ export default function DashboardOverview() {
                             <tbody className="divide-y divide-white/5">
                                 {data
                                     .filter(u => u.overall_risk_score >= 30)
-                                    .sort((a, b) => b.overall_risk_score - a.overall_risk_score)
-                                    .slice(0, 5)
                                     .map((u) => (
                                         <tr key={u.user_id} className="hover:bg-white/[0.02] transition-colors group cursor-pointer">
                                             <td className="px-6 py-4">
@@ -21,6 +21,10 @@ export default function FraudTable() {
             }
         };
         fetchUsers();
+        const events = new EventSource(`${API_URL}/alerts/stream`);
+        events.addEventListener('analysis', fetchUsers);
+        events.addEventListener('reset', fetchUsers);
+        return () => events.close();
     }, []);
 
     const handleExport = () => {
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import httpx
+import pytest
+
+from backend import rule_config
+from backend.database import db_state
+from backend.fake_store import FakeClient
+from backend.indexes import ensure_indexes
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def reset_process_state():
+    """Per-process caches would otherwise carry one test's data into the next."""
+    from backend.anomaly_model import anomaly_state
+    from backend.linkage import linkage
+    from backend.realtime import feature_cache, realtime_state
+    from backend.response_cache import generation_state, response_cache
+
+    response_cache.clear()
+    generation_state.value = 0
+    generation_state.checked_at = 0.0
+    feature_cache.clear()
+    linkage.reset()
+    anomaly_state.reset()
+    realtime_state.generation = None
+
+
+@pytest.fixture
+async def db():
+    """A fresh in-process database, installed as the app's client."""
+    reset_process_state()
+    client = FakeClient()
+    database = client.trustigo
+    await ensure_indexes(database)
+    previous, db_state.client = db_state.client, client
+    yield database
+    db_state.client = previous
+
+
+@pytest.fixture
+async def client(db):
+    from backend.main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+@pytest.fixture
+def rules_file(tmp_path, monkeypatch):
+    """A copy of the default rules that get_rules() re-reads on every call; edit it with helpers.edit_rules."""
+    path = tmp_path / "rules.json"
+    path.write_text(Path(rule_config.__file__).with_name("fraud_rules.json").read_text())
+    monkeypatch.setattr(rule_config, "RULES_PATH", str(path))
+    monkeypatch.setattr(rule_config, "CHECK_INTERVAL", 0.0)
+    state = rule_config.rule_state
+    saved = (state.compiled, state.mtime, state.checked_at)
+    state.compiled, state.mtime, state.checked_at = None, None, 0.0
+    yield path
+    state.compiled, state.mtime, state.checked_at = saved
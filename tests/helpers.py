@@ -0,0 +1,73 @@
+import io
+import json
+import os
+
+import pytest
+
+from backend.fake_store import FakeClient
+from backend.rule_config import ENGINE_BEHAVIORAL
+from backend.storage import create_client
+
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+
+AMAZON_COLUMNS = ("amazon-order-id", "buyer-name", "sku", "item-price", "purchase-date", "return-date")
+
+
+def orders_csv(rows, columns=AMAZON_COLUMNS) -> bytes:
+    """CSV bytes in an export layout; each row is a tuple in `columns` order, None for blank."""
+    buf = io.StringIO()
+    buf.write(",".join(columns) + "\n")
+    for row in rows:
+        buf.write(",".join("" if v is None else str(v) for v in row) + "\n")
+    return buf.getvalue().encode()
+
+
+async def upload(client, rows, columns=AMAZON_COLUMNS) -> dict:
+    response = await client.post("/upload-csv", files={"file": ("orders.csv", orders_csv(rows, columns), "text/csv")})
+    assert response.status_code == 200, response.text
+    return response.json()["stats"]
+
+
+async def analyzed_cohort(client, rows=1500, seed=7) -> bytes:
+    """Uploads a synthetic export and scores it; returns the CSV bytes."""
+    from dataset.synthetic import to_csv_bytes
+    data = to_csv_bytes(rows, seed=seed)
+    response = await client.post("/upload-csv", files={"file": ("orders.csv", data, "text/csv")})
+    assert response.status_code == 200, response.text
+    response = await client.post("/run-fraud-analysis")
+    assert response.status_code == 200, response.text
+    return data
+
+
+def edit_rules(path, **changes):
+    """Rewrites the top-level settings of the rules file at `path` with a new mtime."""
+    config = json.loads(path.read_text())
+    config.update(changes)
+    path.write_text(json.dumps(config))
+    # Explicit mtime: filesystems with coarse timestamps would hide a quick edit
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+
+
+def score_doc(user_id, score, engine_used=ENGINE_BEHAVIORAL, **fields) -> dict:
+    """A behavior_scores document satisfying BehaviorScoreOut."""
+    return {
+        "user_id": user_id, "overall_risk_score": score, "engine_used": engine_used, "risk_flag": score >= 60,
+        "return_rate_90d": 0.0, "avg_return_time_days": 0.0, "fast_return_count": 0, "high_value_return_count": 0,
+        "refund_value_ratio": 0.0, "category_risk_score": 0.0, "payment_risk_score": 0.0, "anomaly_score": 0.0,
+        **fields,
+    }
+
+
+async def connect(backend):
+    """A client for `backend`; skips the test when MONGO_TEST_URI is unset or unreachable."""
+    if backend == "fake":
+        return FakeClient()
+    if not MONGO_TEST_URI:
+        pytest.skip("MONGO_TEST_URI is not set")
+    client = create_client(MONGO_TEST_URI)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        pytest.skip(f"MongoDB at MONGO_TEST_URI is unreachable: {e}")
+    return client
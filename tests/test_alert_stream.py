@@ -0,0 +1,162 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import alert_stream
+from backend.alert_stream import AlertBus, score_changed
+from backend.fake_store import FakeClient
+from helpers import upload
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeRequest:
+    disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(alert_stream, "POLL_SECONDS", 0.02)
+
+
+def parse(frame: str):
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines() if not line.startswith(":"))
+    return int(fields["id"]), fields["event"]
+
+
+async def take(stream, n, timeout=2.0):
+    """The next `n` id/event frames of `stream`, skipping retry and keep-alive lines."""
+    out = []
+    while len(out) < n:
+        frame = await asyncio.wait_for(stream.__anext__(), timeout)
+        if frame.startswith("id:"):
+            out.append(parse(frame))
+    return out
+
+
+async def test_events_from_another_worker_arrive_in_order(db):
+    worker_a, worker_b = AlertBus(), AlertBus()
+    stream = worker_b.stream(db, None, FakeRequest())
+    assert await take(stream, 1) == [(0, "ready")]
+
+    await worker_a.publish(db, [("score", {"user_id": 1}), ("alert", {"user_id": 1})])
+    await worker_a.publish(db, [("analysis", {})])
+    assert await take(stream, 3) == [(1, "score"), (2, "alert"), (3, "analysis")]
+    await stream.aclose()
+    assert worker_b.subscribers == 0
+
+
+async def test_reconnect_on_any_worker_resumes_after_its_cursor(db):
+    await AlertBus().publish(db, [("score", {}), ("alert", {}), ("analysis", {})])
+    stream = AlertBus().stream(db, "1", FakeRequest())
+    assert await take(stream, 3) == [(1, "ready"), (2, "alert"), (3, "analysis")]
+    await stream.aclose()
+
+
+@pytest.mark.parametrize("cursor", ["1", "99", "abc-7"])
+async def test_unresumable_cursors_get_a_single_reset(db, cursor):
+    bus = AlertBus(buffer_size=3)
+    await bus.publish(db, [("score", {})] * 6)
+    assert await db.stream_events.count_documents({}) == 3
+    stream = bus.stream(db, cursor, FakeRequest())
+    assert await take(stream, 1) == [(6, "reset")]
+    await bus.publish(db, [("analysis", {})])
+    assert await take(stream, 1) == [(7, "analysis")]
+    await stream.aclose()
+
+
+async def test_relay_waits_for_a_reserved_sequence_number(db):
+    bus = AlertBus()
+    stream = bus.stream(db, None, FakeRequest())
+    await take(stream, 1)
+    # Sequence 1 is reserved by a slower worker that hasn't inserted it yet
+    await db.stream_events.insert_one({"_id": 2, "event": "alert", "data": {}, "at": datetime.utcnow()})
+    await asyncio.sleep(0.1)
+    assert bus.seq == 0
+    await db.stream_events.insert_one({"_id": 1, "event": "score", "data": {}, "at": datetime.utcnow()})
+    assert await take(stream, 2) == [(1, "score"), (2, "alert")]
+
+    # A reservation that never lands is skipped once it is older than the grace period
+    old = datetime.utcnow() - timedelta(seconds=alert_stream.GAP_GRACE_SECONDS + 1)
+    await db.stream_events.insert_one({"_id": 4, "event": "analysis", "data": {}, "at": old})
+    assert await take(stream, 1) == [(4, "analysis")]
+    await stream.aclose()
+
+
+async def test_disconnect_is_noticed_on_the_next_wakeup(db, monkeypatch):
+    monkeypatch.setattr(alert_stream, "HEARTBEAT_SECONDS", 60)
+    bus, request = AlertBus(), FakeRequest()
+    stream = bus.stream(db, None, request)
+    await take(stream, 1)
+    pending = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0.05)
+
+    # The client has gone; an event wakes the stream long before the heartbeat would
+    request.disconnected = True
+    await bus.publish(db, [("score", {})])
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(pending, 2.0)
+    assert bus.subscribers == 0
+
+
+def test_a_bus_built_outside_any_loop_works_in_each_new_loop(caplog):
+    bus = AlertBus()
+    db = FakeClient().trustigo
+
+    async def round_trip(n):
+        stream = bus.stream(db, None, FakeRequest())
+        await take(stream, 1)
+        await bus.publish(db, [("analysis", {})])
+        assert await take(stream, 1) == [(n, "analysis")]
+        await stream.aclose()
+
+    # As under a test runner or a server reload: the same module-level bus, a new loop each time
+    asyncio.run(round_trip(1))
+    asyncio.run(round_trip(2))
+    assert "relay stopped" not in caplog.text
+
+
+async def analysis_cohort(client):
+    # Two users return everything they buy right away and cross the alert threshold
+    rows = []
+    for uid in range(1, 9):
+        for k in range(4):
+            returned = (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d") if uid <= 2 else None
+            rows.append((f"O-{uid}-{k}", str(uid), f"SKU-{uid}-{k}", 2500.0 if uid <= 2 else 20.0,
+                         (datetime.now() - timedelta(days=6)).strftime("%Y-%m-%d"), returned))
+    await upload(client, rows)
+
+
+async def test_analysis_publishes_after_its_writes(client, db):
+    await analysis_cohort(client)
+    assert (await client.post("/run-fraud-analysis")).status_code == 200
+    events = await db.stream_events.find({}).sort("_id", 1).to_list(length=None)
+    assert [e["event"] for e in events][0] == "reset"
+    assert events[-1]["event"] == "analysis"
+    alerted = {e["data"]["user_id"] for e in events if e["event"] == "alert"}
+    assert alerted == {a["user_id"] for a in await db.fraud_alerts.find({}).to_list(length=None)}
+    assert events[-1]["data"]["alerts"] == len(alerted)
+
+
+async def test_failed_alert_insert_publishes_nothing(client, db, monkeypatch):
+    await analysis_cohort(client)
+    published = await db.stream_events.count_documents({})
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(db.fraud_alerts, "insert_many", fail)
+    with pytest.raises(RuntimeError):
+        await client.post("/run-fraud-analysis")
+    assert await db.stream_events.count_documents({}) == published
+
+
+def test_score_changed():
+    assert not score_changed(None, 90.0, True)
+    assert score_changed((False, 55.0), 61.0, True)
+    assert score_changed((False, 10.0), 10.0 + alert_stream.SCORE_DELTA, False)
+    assert not score_changed((True, 80.0), 81.0, True)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from backend.backtest import compile_candidate, load_feature_snapshot, merge_overrides, run_backtest
+from backend.rule_config import FEATURE_COLUMNS, get_rules
+from helpers import analyzed_cohort
+
+pytestmark = pytest.mark.anyio
+
+
+def test_overrides_merge_dicts_and_replace_lists():
+    base = {"a": {"x": 1, "y": [1, 2]}, "b": 2}
+    merged = merge_overrides(base, {"a": {"y": [3]}, "c": 4})
+    assert merged == {"a": {"x": 1, "y": [3]}, "b": 2, "c": 4}
+    assert base["a"]["y"] == [1, 2]
+
+
+async def test_baseline_replays_the_stored_scores(client, db):
+    await analyzed_cohort(client)
+    user_ids, X, first_order = await load_feature_snapshot(db)
+    report = run_backtest(user_ids, X, first_order, get_rules(), [("same", get_rules())])
+
+    stored = {d["user_id"]: d async for d in db.behavior_scores.find({})}
+    assert report["users"] == len(stored)
+    assert report["baseline"]["alert_count"] == sum(d["risk_flag"] for d in stored.values())
+    same = report["candidates"][0]
+    assert same["alert_delta"] == same["newly_alerted_count"] == same["cleared_count"] == 0
+    assert same["mean_abs_score_change"] == 0.0
+
+
+async def test_raising_the_threshold_only_clears_alerts(client, db):
+    await analyzed_cohort(client)
+    baseline = get_rules()
+    stricter = compile_candidate(baseline, {"alert_threshold": baseline.alert_threshold + 10})
+    user_ids, X, first_order = await load_feature_snapshot(db)
+    result = run_backtest(user_ids, X, first_order, baseline, [("stricter", stricter)])["candidates"][0]
+
+    scores = {d["user_id"]: d["overall_risk_score"] async for d in db.behavior_scores.find({})}
+    expected = sorted(u for u, s in scores.items() if baseline.alert_threshold < s <= stricter.alert_threshold)
+    assert result["newly_alerted"] == []
+    assert sorted(result["cleared"]) == expected
+    assert result["alert_delta"] == -len(expected)
+    assert result["config_version"] != baseline.version
+
+
+def test_candidates_are_scored_in_one_pass_and_flips_are_capped():
+    rng = np.random.default_rng(3)
+    user_ids = np.arange(500)
+    X = rng.random((500, len(FEATURE_COLUMNS)))
+    first_order = rng.random(500) < 0.3
+    baseline = get_rules()
+    looser = compile_candidate(baseline, {"alert_threshold": 1, "medium_risk_floor": 0})
+    report = run_backtest(user_ids, X, first_order, baseline, [("a", looser), ("b", looser)], max_flips=5)
+    a, b = report["candidates"]
+    assert a == {**b, "name": "a"}
+    assert len(a["newly_alerted"]) == 5 < a["newly_alerted_count"]
+
+
+async def test_endpoint_validates_candidates_and_writes_nothing(client, db):
+    await analyzed_cohort(client, rows=600)
+    before = await db.behavior_scores.find({}).to_list(length=None)
+
+    assert (await client.post("/backtest", json={"candidates": []})).status_code == 400
+    bad = await client.post("/backtest", json={"candidates": [{"name": "bad", "overrides": {"alert_threshold": "high"}}]})
+    assert bad.status_code == 400 and bad.json()["detail"].startswith("bad:")
+
+    response = await client.post("/backtest", json={"candidates": [{"overrides": {"alert_threshold": 40}}]})
+    assert response.status_code == 200
+    assert response.json()["candidates"][0]["name"] == "candidate-1"
+    assert await db.behavior_scores.find({}).to_list(length=None) == before
@@ -0,0 +1,61 @@
+import argparse
+import json
+
+import pytest
+
+import backend.response_cache as response_cache
+from backend.database import db_state
+from benchmarks import e2e
+
+pytestmark = pytest.mark.anyio
+
+
+def result(step, **metrics):
+    return {"rows": 1000, "step": step, **metrics}
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"results": [
+        result("upload", wall_s=1.0, rows_per_s=1000.0, round_trips=20),
+        result("fraud_users", p50_ms=2.0, p99_ms=4.0, round_trips=2),
+    ]}
+    ok = [result("upload", wall_s=1.15, rows_per_s=900.0, round_trips=20),
+          result("fraud_users", p50_ms=1.0, p99_ms=4.5, round_trips=2),
+          result("analysis", wall_s=99.0)]
+    assert e2e.compare(ok, baseline, tolerance=0.2) == []
+
+    slow = [result("upload", wall_s=1.3, rows_per_s=700.0, round_trips=21)]
+    regressions = e2e.compare(slow, baseline, tolerance=0.2)
+    assert [r.split(": ")[1].split()[0] for r in regressions] == ["wall_s", "rows_per_s", "round_trips"]
+
+
+def args(tmp_path, **overrides):
+    return argparse.Namespace(**{
+        "sizes": [400], "backend": "fake", "database": "trustigo_bench", "repeat": 2, "seed": 1,
+        "output": str(tmp_path / "run.json"), "tolerance": 0.2, "baseline": str(tmp_path / "baseline.json"),
+        "save_baseline": False, "fail_on_regression": True, **overrides,
+    })
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    # main() swaps in its own client and disables the response cache
+    monkeypatch.setattr(db_state, "client", db_state.client)
+    monkeypatch.setattr(response_cache, "CACHE_ENABLED", response_cache.CACHE_ENABLED)
+
+
+async def test_suite_records_every_step_and_compares_against_the_baseline(tmp_path, isolated):
+    assert await e2e.main(args(tmp_path, save_baseline=True)) == 0
+    report = json.loads((tmp_path / "run.json").read_text())
+    steps = [r["step"] for r in report["results"]]
+    assert steps == ["upload", "analysis", "analytics_summary", "fraud_users", "fraud_users_page"]
+    assert all(r["rows"] == 400 and r["round_trips"] > 0 for r in report["results"])
+    assert report["meta"]["backend"] == "fake"
+    assert json.loads((tmp_path / "baseline.json").read_text())["results"] == report["results"]
+
+    # A baseline that claims fewer round trips than the code makes is a regression
+    baseline = json.loads((tmp_path / "baseline.json").read_text())
+    baseline["results"][0]["round_trips"] -= 1
+    (tmp_path / "baseline.json").write_text(json.dumps(baseline))
+    assert await e2e.main(args(tmp_path)) == 1
+    assert await e2e.main(args(tmp_path, fail_on_regression=False)) == 0
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+
+import pytest
+
+from backend import export
+from backend.rule_config import ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER
+from helpers import analyzed_cohort, score_doc
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def scores(db):
+    docs = [score_doc(uid, float(uid % 10 * 10), ENGINE_FIRST_ORDER if uid % 4 == 0 else ENGINE_BEHAVIORAL)
+            for uid in range(1, 251)]
+    await db.behavior_scores.insert_many(docs)
+    return docs
+
+
+async def test_ndjson_export_matches_the_list_endpoint(client, db):
+    await analyzed_cohort(client, rows=600)
+    listed = (await client.get("/fraud-users")).json()
+    response = await client.get("/export/fraud-users")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "attachment" in response.headers["content-disposition"]
+    assert [json.loads(line) for line in response.text.splitlines()] == listed
+    # Streamed responses never go through the response cache
+    assert "etag" not in response.headers
+
+
+async def test_csv_export_applies_filters_and_projection(client, scores):
+    response = await client.get("/export/fraud-users",
+                                params={"format": "csv", "risk_band": "high", "engine": "first_order", "fields": "ring_size"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    expected = sorted((d for d in scores if d["overall_risk_score"] >= 60 and d["engine_used"] == ENGINE_FIRST_ORDER),
+                      key=lambda d: (-d["overall_risk_score"], d["user_id"]))
+    assert list(rows[0]) == ["user_id", "overall_risk_score", "ring_size"]
+    assert [int(r["user_id"]) for r in rows] == [d["user_id"] for d in expected]
+
+
+async def test_rows_are_flushed_in_chunks(db, scores, monkeypatch):
+    monkeypatch.setattr(export, "FLUSH_ROWS", 40)
+    batch_sizes = []
+    cursor = db.behavior_scores.find({}, {"_id": 0, "user_id": 1})
+    real_batch_size = cursor.batch_size
+    cursor.batch_size = lambda n: batch_sizes.append(n) or real_batch_size(n)
+
+    chunks = [c async for c in export.stream_documents(cursor, "ndjson", ["user_id"])]
+    assert batch_sizes == [export.EXPORT_BATCH_SIZE]
+    assert [c.count("\n") for c in chunks] == [40] * 6 + [10]
+
+    cursor = db.behavior_scores.find({}, {"_id": 0, "user_id": 1})
+    chunks = [c async for c in export.stream_documents(cursor, "csv", ["user_id"])]
+    assert len(chunks) == 7
+    assert "".join(chunks).splitlines()[0] == "user_id"
+
+
+async def test_empty_export_still_has_a_csv_header(client, db):
+    response = await client.get("/export/fraud-users", params={"format": "csv", "fields": "engine_used"})
+    assert response.text.strip() == "user_id,overall_risk_score,engine_used"
+    assert (await client.get("/export/fraud-users")).text == ""
@@ -0,0 +1,53 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from backend.preload import HEAVY_MODULES
+from benchmarks.import_time import by_package, parse_importtime
+
+ROOT = Path(__file__).parents[1]
+
+
+def run(script: str):
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+LOADED = "print(json.dumps(sorted({m.split('.')[0] for m in sys.modules} & {'pandas', 'sklearn', 'pyarrow'})))"
+
+
+def test_app_import_and_dashboard_reads_leave_heavy_modules_unloaded():
+    script = (
+        "import asyncio, json, sys\n"
+        "import httpx\n"
+        "from backend.database import db_state\n"
+        "from backend.main import app\n"
+        "from backend.fake_store import FakeClient\n"
+        "db_state.client = FakeClient()\n"
+        "async def reads():\n"
+        "    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as c:\n"
+        "        for path in ('/fraud-users', '/fraud-users/top', '/analytics-summary', '/transactions', '/users'):\n"
+        "            assert (await c.get(path)).status_code == 200, path\n"
+        "asyncio.run(reads())\n"
+        + LOADED
+    )
+    assert run(script) == []
+
+
+def test_preload_imports_every_deferred_module():
+    script = "import json, sys\nfrom backend.preload import import_heavy_modules\nimport_heavy_modules()\n" + LOADED
+    assert run(script) == sorted({m.split(".")[0] for m in HEAVY_MODULES})
+
+
+def test_importtime_output_is_parsed_per_module():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   _io",
+        "import time:      1500 |       1800 |     json.decoder",
+        "import time:       300 |       2100 |   json",
+        "unrelated line",
+    ])
+    modules = parse_importtime(stderr)
+    assert modules == {"_io": (120, 120), "json.decoder": (1500, 1800), "json": (300, 2100)}
+    assert by_package(modules) == {"_io": 120, "json": 1800}
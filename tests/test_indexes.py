@@ -0,0 +1,73 @@
+import pytest
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from backend.indexes import (
+    HOT_QUERIES, INDEXES, check_query_plans, create_indexes_at_startup, ensure_indexes, index_covers,
+    uncovered_queries,
+)
+from helpers import connect
+
+pytestmark = pytest.mark.anyio
+
+
+def _keys(model):
+    return list(model.document["key"])
+
+
+def test_every_hot_query_has_a_declared_index():
+    assert uncovered_queries() == []
+
+
+@pytest.mark.parametrize("collection, query, sort", [
+    # Equality on a non-leading key
+    ("fraud_alerts", {"status": "Active"}, None),
+    # Sort keys that don't follow the equality prefix
+    ("fraud_alerts", {"user_id": 1}, [("date", DESCENDING)]),
+    # Mixed directions can't be read off the index either way
+    ("transactions", {}, [("date", ASCENDING), ("transaction_id", DESCENDING)]),
+    # Range on a key behind an unconstrained one
+    ("transactions", {"transaction_id": {"$gt": "TXN-1"}}, None),
+])
+def test_index_covers_rejects_partial_prefixes(collection, query, sort):
+    assert not index_covers(collection, query, sort)
+
+
+def test_index_covers_accepts_reversed_scans_and_prefixes():
+    assert index_covers("transactions", {}, [("date", ASCENDING), ("transaction_id", ASCENDING)])
+    assert index_covers("transactions", {"user_id": 1, "date": {"$gte": 0}}, None)
+    assert index_covers("behavior_scores", {"overall_risk_score": {"$lt": 30}},
+                        [("overall_risk_score", ASCENDING), ("user_id", DESCENDING)])
+
+
+def test_index_names_are_unique_per_collection():
+    for collection, models in INDEXES.items():
+        names = [m.document["name"] for m in models]
+        assert len(names) == len(set(names)), collection
+
+
+async def test_ensure_indexes_is_idempotent(db):
+    await ensure_indexes(db)
+    for collection, models in INDEXES.items():
+        info = await db[collection].index_information()
+        for model in models:
+            assert [k for k, _ in info[model.document["name"]]["key"]] == _keys(model)
+
+
+async def test_startup_logs_and_continues_when_index_creation_fails(db, monkeypatch, caplog):
+    async def fail(models):
+        raise OperationFailure("not authorized")
+
+    monkeypatch.setattr(db.users, "create_indexes", fail)
+    await create_indexes_at_startup(db)
+    assert "Index creation failed" in caplog.text
+
+
+async def test_hot_queries_use_an_index_on_mongo():
+    client = await connect("mongo")
+    try:
+        db = client.trustigo_parity
+        await ensure_indexes(db)
+        assert await check_query_plans(db) == []
+    finally:
+        client.close()
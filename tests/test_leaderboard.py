@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from backend.leaderboard import HISTOGRAM_BINS, LEADERBOARD_SIZE, Leaderboard
+from helpers import analyzed_cohort, upload
+
+pytestmark = pytest.mark.anyio
+
+
+def test_heap_keeps_the_top_k_with_lower_ids_winning_ties():
+    rng = random.Random(5)
+    docs = [{"user_id": uid, "overall_risk_score": float(rng.randint(0, 20) * 5)} for uid in rng.sample(range(5000), 2000)]
+    board = Leaderboard(size=25)
+    for doc in docs:
+        board.push(doc)
+    expected = sorted(docs, key=lambda d: (-d["overall_risk_score"], d["user_id"]))[:25]
+    assert [(e["user_id"], e["overall_risk_score"]) for e in board.top()] == \
+        [(d["user_id"], d["overall_risk_score"]) for d in expected]
+
+
+def test_counters_cover_every_pushed_score():
+    board = Leaderboard(size=2, medium_floor=30.0, high_floor=60.0)
+    for uid, score in enumerate([0.0, 29.99, 30.0, 59.99, 60.0, 100.0, -1.0]):
+        board.push({"user_id": uid, "overall_risk_score": score})
+    assert board.total_users == 7
+    assert board.bands == {"low": 3, "medium": 2, "high": 2}
+    # 100 lands in the last bin and negative scores in the first
+    assert board.histogram == [2, 2, 1, 1, 1]
+    assert len(board.histogram) == HISTOGRAM_BINS
+    assert board.to_doc("v1")["avg_risk_score"] == pytest.approx(sum([0.0, 29.99, 30.0, 59.99, 60.0, 100.0, -1.0]) / 7)
+
+
+async def test_top_endpoint_matches_the_sorted_scores(client, db):
+    await analyzed_cohort(client)
+    top = (await client.get("/fraud-users/top", params={"limit": 20})).json()
+    listed = (await client.get("/fraud-users", params={"limit": 20})).json()
+    assert [e["user_id"] for e in top["top"]] == [u["user_id"] for u in listed]
+    assert top["total_users"] == await db.behavior_scores.count_documents({})
+    assert sum(top["bands"].values()) == sum(top["histogram"]) == top["total_users"]
+
+
+async def test_upload_clears_the_board(client, db):
+    await analyzed_cohort(client, rows=300)
+    assert (await client.get("/fraud-users/top")).json()["total_users"] > 0
+    await upload(client, [("O-1", "1", "SKU-1", 10.0, "2026-09-01", None)])
+    board = (await client.get("/fraud-users/top")).json()
+    assert board["total_users"] == 0 and board["top"] == []
+
+
+async def test_limit_is_capped_at_the_board_size(client, db):
+    assert (await client.get("/fraud-users/top", params={"limit": LEADERBOARD_SIZE + 1})).status_code == 422
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from backend import lean
+from backend.schemas import BehaviorScoreOut
+from helpers import analyzed_cohort, score_doc
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("path", ["/fraud-users", "/transactions", "/users"])
+async def test_lean_responses_match_the_validated_ones(client, db, path):
+    await analyzed_cohort(client, rows=600)
+    validated = await client.get(path, params={"limit": 500})
+    fast = await client.get(path, params={"limit": 500, "lean": "true"})
+    assert fast.status_code == validated.status_code == 200
+    assert fast.json() == validated.json()
+    assert fast.headers.get("x-next-cursor") == validated.headers.get("x-next-cursor")
+
+
+async def test_lean_fills_in_model_defaults(client, db):
+    # Documents written before the ring and return-integrity fields existed
+    await db.behavior_scores.insert_many([score_doc(1, 80.0), score_doc(2, 40.0, ring_size=3)])
+    validated = (await client.get("/fraud-users")).json()
+    fast = (await client.get("/fraud-users", params={"lean": "true"})).json()
+    assert fast == validated
+    assert fast[0]["ring_size"] == 1 and fast[0]["config_version"] is None
+    assert fast[1]["ring_size"] == 3
+
+    partial = (await client.get("/fraud-users", params={"lean": "true", "fields": "engine_used"})).json()
+    assert set(partial[0]) == {"user_id", "overall_risk_score", "engine_used"}
+
+
+async def test_lean_projects_to_the_schema_fields(client, db):
+    await analyzed_cohort(client, rows=300)
+    row = (await client.get("/fraud-users", params={"lean": "true", "limit": 1})).json()[0]
+    assert set(row) <= set(BehaviorScoreOut.model_fields)
+    assert "_id" not in row and "risk_flag" not in row
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_handles_dates_numpy_and_ids(monkeypatch, use_orjson):
+    if use_orjson and lean.orjson is None:
+        pytest.skip("orjson is not installed")
+    if not use_orjson:
+        monkeypatch.setattr(lean, "orjson", None)
+    oid = ObjectId()
+    out = lean.dumps([{"at": datetime(2026, 9, 1, 12, 30), "id": oid, "n": 3}])
+    assert out == f'[{{"at":"2026-09-01T12:30:00","id":"{oid}","n":3}}]'.encode()
+    if use_orjson:
+        assert lean.dumps(np.array([1.5, 2.0])) == b"[1.5,2.0]"
@@ -0,0 +1,66 @@
+import pytest
+
+from backend.linkage import LinkageIndex, UnionFind, ensure_linkage, linkage
+from backend.response_cache import generation_state
+
+
+def txn(user_id, device=None, ip=None, amount=100.0):
+    return {"user_id": user_id, "device_fingerprint": device, "ip_address": ip, "total_amount": amount}
+
+
+def test_union_find_joins_by_size_and_reports_merges():
+    sets = UnionFind()
+    for x in range(6):
+        sets.add(x)
+    assert sets.union(0, 1) == (0, 1)
+    assert sets.union(2, 0) == (0, 2)  # the larger set keeps its root
+    assert sets.union(1, 2) is None
+    sets.union(3, 4)
+    sets.union(4, 0)
+    assert len({sets.find(x) for x in range(5)}) == 1
+    assert sets.size[sets.find(0)] == 5
+    assert sets.find(5) == 5
+
+
+def test_shared_device_or_ip_links_transitively():
+    index = LinkageIndex()
+    index.ingest(
+        [txn(1, device="d1"), txn(2, device="d1", ip="10.0.0.2"), txn(3, ip="10.0.0.2"), txn(4, device="d9")],
+        [{"user_id": 3, "refund_amount": 100.0}],
+    )
+    ring = index.ring_features(3)
+    assert ring == index.ring_features(1)
+    assert ring["ring_id"] == 1
+    assert ring["ring_size"] == 3
+    assert ring["ring_return_rate"] == pytest.approx(1 / 3)
+    assert ring["ring_refund_ratio"] == pytest.approx(100 / 300)
+    assert index.ring_features(4)["ring_size"] == 1
+    assert index.ring_features(99) == {"ring_id": 99, "ring_size": 1, "ring_return_rate": 0.0, "ring_refund_ratio": 0.0}
+    assert [members for _, members in index.rings()] == [[1, 2, 3]]
+
+
+def test_placeholders_and_busy_keys_do_not_link():
+    index = LinkageIndex(max_users_per_key=3)
+    index.ingest([txn(u, device="unknown", ip="0.0.0.0") for u in range(10)], [])
+    assert index.rings() == []
+
+    index.reset()
+    index.ingest([txn(u, ip="10.9.9.9") for u in range(10)], [])
+    assert index.ring_features(0)["ring_size"] == 3
+    assert index.ring_features(9)["ring_size"] == 1
+
+
+@pytest.mark.anyio
+async def test_rebuilds_when_another_worker_changes_the_data(db):
+    await db.transactions.insert_many([txn(1, device="d1"), txn(2, device="d1")])
+    assert (await ensure_linkage(db)).ring_features(2)["ring_size"] == 2
+
+    # Unchanged generation: the in-process index is reused as is
+    await db.transactions.insert_one(txn(3, device="d1"))
+    assert (await ensure_linkage(db)).ring_features(3)["ring_size"] == 1
+
+    # Another worker uploads and bumps the shared generation
+    await db.meta.update_one({"_id": "data_generation"}, {"$inc": {"value": 1}}, upsert=True)
+    generation_state.checked_at = 0.0
+    assert (await ensure_linkage(db)).ring_features(3)["ring_size"] == 3
+    assert linkage.generation == 1
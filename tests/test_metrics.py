@@ -0,0 +1,112 @@
+import re
+
+import pytest
+
+from backend import metrics
+from backend.metrics import Counter, Histogram, StageTimer, render_metrics, track_job
+from helpers import analyzed_cohort
+
+pytestmark = pytest.mark.anyio
+
+
+def sample(text, name, **labels):
+    """Value of the exposition line for `name` whose labels include `labels`, or 0."""
+    for line in text.splitlines():
+        match = re.fullmatch(r"([a-z_]+)(\{.*\})? (\S+)", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(found.get(k) == v for k, v in labels.items()):
+            return float(match.group(3).replace("+Inf", "inf"))
+    return 0
+
+
+@pytest.fixture
+def scratch():
+    """Metrics created in a test are dropped from the global registry afterwards."""
+    before = list(metrics.registry)
+    yield
+    metrics.registry[:] = before
+
+
+def test_histogram_buckets_are_cumulative(scratch):
+    h = Histogram("t_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value, stage="a")
+    text = "\n".join(h.render())
+    assert sample(text, "t_seconds_bucket", stage="a", le="0.1") == 2
+    assert sample(text, "t_seconds_bucket", stage="a", le="1.0") == 3
+    assert sample(text, "t_seconds_bucket", stage="a", le="+Inf") == 4
+    assert sample(text, "t_seconds_count", stage="a") == 4
+    assert sample(text, "t_seconds_sum", stage="a") == pytest.approx(3.65)
+
+
+def test_label_values_are_escaped(scratch):
+    c = Counter("t_total", "Test.", ("route",))
+    c.inc(route='/a"b\\c\nd')
+    assert 't_total{route="/a\\"b\\\\c\\nd"} 1' in c.render()
+
+
+def test_track_job_records_the_outcome():
+    before = render_metrics()
+    with track_job("test-job"):
+        pass
+    with pytest.raises(RuntimeError):
+        with track_job("test-job"):
+            raise RuntimeError("boom")
+    after = render_metrics()
+    for outcome in ("ok", "error"):
+        delta = sample(after, "trustigo_job_runs_total", job="test-job", outcome=outcome) \
+            - sample(before, "trustigo_job_runs_total", job="test-job", outcome=outcome)
+        assert delta == 1
+    assert sample(after, "trustigo_jobs_in_progress", job="test-job") == 0
+
+
+def test_stage_timer_laps_name_the_closed_stage():
+    before = render_metrics()
+    timer = StageTimer("test-pipeline")
+    timer.lap("read")
+    timer.lap("write")
+    after = render_metrics()
+    for stage in ("test-pipeline.read", "test-pipeline.write"):
+        assert sample(after, "trustigo_stage_duration_seconds_count", stage=stage) \
+            - sample(before, "trustigo_stage_duration_seconds_count", stage=stage) == 1
+
+
+async def test_requests_are_labelled_with_the_route_template(client, db):
+    before = (await client.get("/metrics")).text
+    for uid in (101, 102):
+        assert (await client.get(f"/user/{uid}")).status_code == 404
+    await client.get("/no-such-route")
+    response = await client.get("/metrics")
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    after = response.text
+
+    def delta(name, **labels):
+        return sample(after, name, **labels) - sample(before, name, **labels)
+
+    assert delta("trustigo_http_requests_total", method="GET", route="/user/{user_id}", status="404") == 2
+    assert delta("trustigo_http_requests_total", method="GET", route="unmatched", status="404") == 1
+    assert "/user/101" not in after
+    assert delta("trustigo_db_round_trips_per_request_count", method="GET", route="/user/{user_id}") == 2
+
+
+async def test_cache_hits_keep_their_route_label(client, db):
+    await client.get("/fraud-users")
+    before = (await client.get("/metrics")).text
+    hit = await client.get("/fraud-users")
+    assert hit.headers["x-cache"] == "HIT"
+    after = (await client.get("/metrics")).text
+    labels = {"method": "GET", "route": "/fraud-users", "status": "200"}
+    assert sample(after, "trustigo_http_requests_total", **labels) - sample(before, "trustigo_http_requests_total", **labels) == 1
+
+
+async def test_analysis_reports_its_stages(client, db):
+    before = render_metrics()
+    await analyzed_cohort(client, rows=300)
+    after = render_metrics()
+    assert sample(after, "trustigo_job_runs_total", job="analysis", outcome="ok") \
+        - sample(before, "trustigo_job_runs_total", job="analysis", outcome="ok") == 1
+    assert sample(after, "trustigo_stage_duration_seconds_count", stage="analysis.persist") \
+        > sample(before, "trustigo_stage_duration_seconds_count", stage="analysis.persist")
+    assert sample(after, "trustigo_users_scored_total") > sample(before, "trustigo_users_scored_total")
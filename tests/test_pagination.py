@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.pagination import encode_cursor
+from backend.rule_config import ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER
+from helpers import edit_rules, score_doc
+
+pytestmark = pytest.mark.anyio
+
+
+async def walk(client, path, limit, **params):
+    """Follows X-Next-Cursor until it runs out; returns every row in page order."""
+    rows, pages, cursor = [], 0, None
+    while True:
+        response = await client.get(path, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page) <= limit
+        rows.extend(page)
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return rows, pages
+
+
+@pytest.fixture
+async def scores(db):
+    # Few distinct scores, so most page boundaries fall inside a run of ties
+    docs = [score_doc(uid, float((uid * 7) % 5 * 20), ENGINE_BEHAVIORAL if uid % 3 else ENGINE_FIRST_ORDER)
+            for uid in range(1, 48)]
+    await db.behavior_scores.insert_many(docs)
+    return sorted(docs, key=lambda d: (-d["overall_risk_score"], d["user_id"]))
+
+
+@pytest.mark.parametrize("limit", [1, 5, 8, 47, 100])
+async def test_fraud_users_pages_cover_every_row_once_across_ties(client, scores, limit):
+    rows, pages = await walk(client, "/fraud-users", limit)
+    assert [r["user_id"] for r in rows] == [d["user_id"] for d in scores]
+    # A full last page still hands out a cursor; the next page is empty and ends the walk
+    assert pages == len(scores) // limit + 1
+
+
+async def test_cursor_combines_with_filters_and_projection(client, scores):
+    rows, _ = await walk(client, "/fraud-users", 4, risk_band="low", engine="behavioral", fields="engine_used")
+    expected = [d for d in scores if d["overall_risk_score"] < 30 and d["engine_used"] == ENGINE_BEHAVIORAL]
+    assert [r["user_id"] for r in rows] == [d["user_id"] for d in expected]
+    # Cursor fields are always projected, nothing else is
+    assert set(rows[0]) == {"user_id", "overall_risk_score", "engine_used"}
+
+
+async def test_transactions_order_on_date_then_transaction_id(client, db):
+    base = datetime(2026, 9, 1)
+    docs = [{"transaction_id": f"T{i:03d}", "user_id": i % 4, "date": base + timedelta(hours=i // 6),
+             "total_amount": 1.0, "payment_method": "UPI", "ip_address": "10.0.0.1",
+             "device_fingerprint": "d", "shipping_address_risk": "Low"} for i in range(40)]
+    await db.transactions.insert_many(docs)
+    rows, _ = await walk(client, "/transactions", 7)
+    expected = sorted(docs, key=lambda d: (d["date"], d["transaction_id"]), reverse=True)
+    assert [r["transaction_id"] for r in rows] == [d["transaction_id"] for d in expected]
+
+    rows, _ = await walk(client, "/transactions", 3, user_id=2)
+    assert [r["transaction_id"] for r in rows] == [d["transaction_id"] for d in expected if d["user_id"] == 2]
+
+
+async def test_users_pages_and_skip_agree(client, db):
+    await db.users.insert_many([{"user_id": uid, "name": f"u{uid}", "email": f"u{uid}@example.com", "account_age": 1} for uid in range(30, 0, -1)])
+    rows, _ = await walk(client, "/users", 4)
+    assert [r["user_id"] for r in rows] == list(range(1, 31))
+    skipped = (await client.get("/users", params={"skip": 8, "limit": 4})).json()
+    assert [r["user_id"] for r in skipped] == [9, 10, 11, 12]
+
+
+@pytest.mark.parametrize("path, cursor", [
+    ("/fraud-users", "not-a-cursor!"),
+    ("/fraud-users", encode_cursor(10.0)),
+    ("/users", encode_cursor(1, 2)),
+    ("/transactions", encode_cursor("yesterday", "T1")),
+    # Operators smuggled into the equality branch of the keyset filter
+    ("/fraud-users", encode_cursor(10.0, {"$ne": None})),
+    ("/fraud-users", encode_cursor({"$gt": 0}, 1)),
+    ("/transactions", encode_cursor("2026-09-01T00:00:00", {"$ne": None})),
+    ("/users", encode_cursor({"$ne": None})),
+    ("/fraud-users", encode_cursor(10.0, "1")),
+    ("/fraud-users", encode_cursor(10.0, 1.5)),
+    ("/users", encode_cursor(True)),
+    ("/transactions", encode_cursor(20260901, "T1")),
+])
+async def test_malformed_cursors_are_rejected(client, db, path, cursor):
+    response = await client.get(path, params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Malformed cursor"
+
+
+async def test_unknown_projection_fields_are_rejected(client, db):
+    response = await client.get("/fraud-users", params={"fields": "user_id,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+
+async def test_risk_bands_follow_the_rules_file(client, scores, rules_file):
+    medium, _ = await walk(client, "/fraud-users", 100, risk_band="medium")
+    assert {r["overall_risk_score"] for r in medium} == {40.0}
+
+    edit_rules(rules_file, medium_risk_floor=20)
+    medium, _ = await walk(client, "/fraud-users", 100, risk_band="medium")
+    assert {r["overall_risk_score"] for r in medium} == {20.0, 40.0}
+    low, _ = await walk(client, "/fraud-users", 100, risk_band="low")
+    assert {r["overall_risk_score"] for r in low} == {0.0}
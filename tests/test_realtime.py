@@ -0,0 +1,200 @@
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from backend import realtime
+from backend.anomaly_model import AnomalyModelState, anomaly_state, score_single_anomaly, train_and_predict_anomaly
+from backend.behavior_score import calculate_user_behavior_metrics
+from backend.realtime import MODEL_ID, feature_cache, get_user_features, realtime_state, warm_up
+from backend.response_cache import bump_generation, generation_state
+from backend.rule_config import ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER, get_rules
+
+
+def random_cohort(n=60, seed=3):
+    rng = random.Random(seed)
+    return [{
+        "user_id": i,
+        "return_rate_90d": rng.random(),
+        "avg_return_time_days": rng.uniform(0, 30),
+        "fast_return_count": rng.randint(0, 6),
+        "high_value_return_count": rng.randint(0, 4),
+        "refund_value_ratio": rng.random(),
+        "category_risk_score": rng.choice([0.0, 50.0, 100.0]),
+        "payment_risk_score": rng.choice([0.0, 30.0, 70.0]),
+        "overall_risk_score": rng.uniform(0, 100),
+        "engine_used": "Behavioral",
+    } for i in range(n)]
+
+
+async def other_worker_changed_the_data(db):
+    """What this process sees after another worker uploaded or re-scored."""
+    await db.meta.update_one({"_id": "data_generation"}, {"$inc": {"value": 1}}, upsert=True)
+    generation_state.checked_at = 0.0
+
+
+def test_stored_model_scores_like_the_fitted_one():
+    cohort = random_cohort()
+    train_and_predict_anomaly(cohort, get_rules().config.anomaly)
+    loaded = AnomalyModelState()
+    loaded.load(anomaly_state.to_doc())
+    for row in cohort[:20]:
+        expected = score_single_anomaly(row)
+        saved, anomaly_state.forest = anomaly_state.forest, loaded.forest
+        assert score_single_anomaly(row) == pytest.approx(expected, abs=1e-12)
+        anomaly_state.forest = saved
+
+
+def test_small_cohort_drops_the_previous_model():
+    train_and_predict_anomaly(random_cohort(), get_rules().config.anomaly)
+    assert anomaly_state.forest is not None
+    train_and_predict_anomaly(random_cohort(n=2), get_rules().config.anomaly)
+    assert anomaly_state.to_doc() is None
+
+
+@pytest.mark.anyio
+async def test_another_workers_run_invalidates_features_and_reloads_the_model(db):
+    cohort = random_cohort()
+    await db.behavior_scores.insert_many([dict(row) for row in cohort])
+    assert (await get_user_features(db, 1))[1] == "database"
+    assert (await get_user_features(db, 1))[1] == "cache"
+
+    # Another worker re-scores: new features and a new stored model
+    train_and_predict_anomaly(cohort, get_rules().config.anomaly)
+    await realtime.save_anomaly_model(db)
+    stored = anomaly_state.to_doc()
+    anomaly_state.reset()
+    await db.behavior_scores.update_one({"user_id": 1}, {"$set": {"fast_return_count": 99}})
+    await other_worker_changed_the_data(db)
+
+    base, source = await get_user_features(db, 1)
+    assert source == "database"
+    assert base["fast_return_count"] == 99
+    assert anomaly_state.forest is not None
+    assert anomaly_state.to_doc()["forest"]["offset"] == stored["forest"]["offset"]
+
+
+@pytest.mark.anyio
+async def test_own_run_keeps_the_primed_cache(db):
+    realtime.prime_feature_cache(random_cohort(n=5))
+    realtime.mark_current(await bump_generation(db))
+    assert (await get_user_features(db, 1))[1] == "cache"
+
+
+@pytest.mark.anyio
+async def test_upload_elsewhere_clears_the_model(db):
+    train_and_predict_anomaly(random_cohort(), get_rules().config.anomaly)
+    realtime.mark_current(await bump_generation(db))
+    await other_worker_changed_the_data(db)
+    await get_user_features(db, 1)
+    assert anomaly_state.forest is None
+    assert realtime_state.generation == 2
+
+
+@pytest.mark.anyio
+async def test_warm_up_loads_the_stored_model_without_fitting(db, monkeypatch):
+    cohort = random_cohort()
+    await db.behavior_scores.insert_many([dict(row) for row in cohort])
+    train_and_predict_anomaly(cohort, get_rules().config.anomaly)
+    await realtime.save_anomaly_model(db)
+    anomaly_state.reset()
+
+    def fit(*args, **kwargs):
+        raise AssertionError("warm_up must not fit")
+
+    monkeypatch.setattr(realtime, "train_and_predict_anomaly", fit)
+    await warm_up(db)
+    assert anomaly_state.forest is not None
+    assert len(feature_cache) == len(cohort)
+
+
+@pytest.mark.anyio
+async def test_warm_up_fits_only_when_opted_in_and_nothing_is_stored(db, monkeypatch):
+    await db.behavior_scores.insert_many([dict(row) for row in random_cohort()])
+    await warm_up(db)
+    assert anomaly_state.forest is None
+
+    realtime_state.generation = None
+    monkeypatch.setattr(realtime, "FIT_ON_START", True)
+    await warm_up(db)
+    assert anomaly_state.forest is not None
+    assert await db.meta.find_one({"_id": MODEL_ID}) is not None
+
+
+def test_warm_up_does_not_import_scikit_learn():
+    script = (
+        "import asyncio, sys\n"
+        "from backend.fake_store import FakeClient\n"
+        "from backend.realtime import warm_up\n"
+        "asyncio.run(warm_up(FakeClient().trustigo))\n"
+        "print('sklearn' in sys.modules)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                         cwd=Path(__file__).parents[1])
+    assert out.stdout.strip() == "False"
+
+
+PROJECTED = ("return_rate_90d", "avg_return_time_days", "fast_return_count", "high_value_return_count",
+             "refund_value_ratio", "category_risk_score", "txns_count", "engine_used")
+
+
+@pytest.mark.anyio
+async def test_projected_features_match_a_rescan_with_the_return_ingested(db):
+    now = datetime.utcnow()
+    txns = [{"transaction_id": f"T{k}", "user_id": 7, "date": now - timedelta(days=20 - k),
+             "total_amount": 100.0 + 50 * k, "payment_method": "UPI"} for k in range(4)]
+    await db.transactions.insert_many(txns)
+    await db.items.insert_many([{"transaction_id": t["transaction_id"], "item_id": f"I{k}", "price": t["total_amount"],
+                                 "category": "Electronics" if k % 2 else "Books", "quantity": 1}
+                                for k, t in enumerate(txns)])
+    await db.returns.insert_many([{"return_id": "R0", "user_id": 7, "transaction_id": "T0", "item_id": "I0",
+                                   "return_date": txns[0]["date"] + timedelta(days=10), "refund_amount": 100.0}])
+    base = await calculate_user_behavior_metrics(db, 7)
+
+    ret = {"user_id": 7, "transaction_id": "T3", "item_id": "I3", "refund_amount": 250.0, "category": "Electronics",
+           "purchase_date": txns[3]["date"], "return_date": txns[3]["date"] + timedelta(days=1)}
+    projected = realtime.project_features(base, ret, get_rules())
+
+    await db.returns.insert_many([{"return_id": "R1", "user_id": 7, "transaction_id": "T3", "item_id": "I3",
+                                   "return_date": ret["return_date"], "refund_amount": 250.0}])
+    rescanned = await calculate_user_behavior_metrics(db, 7)
+    for field in PROJECTED:
+        assert projected[field] == pytest.approx(rescanned[field]), field
+
+
+def test_new_accounts_use_the_first_order_engine():
+    features = realtime.project_features(None, {"user_id": 1, "refund_amount": 80.0}, get_rules())
+    assert features["engine_used"] == ENGINE_FIRST_ORDER
+    assert features["return_rate_90d"] == 1.0
+    assert features["refund_value_ratio"] == 1.0
+
+
+def test_decision_follows_the_alert_threshold():
+    rules = get_rules()
+    base = {"txns_count": 12, "items_bought": 12, "returns_count": 11, "total_spent": 1200.0, "total_refund": 1150.0,
+            "fast_return_count": 6, "high_value_return_count": 5, "risky_returns_count": 11, "total_return_days": 11}
+    risky = realtime.score_return(base, {"user_id": 1, "refund_amount": 900.0, "category": rules.features.risky_categories[0],
+                                         "purchase_date": datetime(2026, 9, 1), "return_date": datetime(2026, 9, 2)})
+    assert risky["engine_used"] == ENGINE_BEHAVIORAL
+    assert risky["risk_score"] > rules.alert_threshold and risky["decision"] == "Block"
+    assert risky["reasons"] and risky["config_version"] == rules.version
+
+    calm = realtime.score_return({**base, "returns_count": 0, "total_refund": 0.0, "fast_return_count": 0,
+                                  "high_value_return_count": 0, "risky_returns_count": 0, "total_return_days": 0},
+                                 {"user_id": 1, "refund_amount": 10.0})
+    assert calm["risk_score"] <= rules.alert_threshold and calm["decision"] == "Allow"
+
+
+@pytest.mark.anyio
+async def test_check_return_endpoint_reports_the_feature_source(client, db):
+    await db.behavior_scores.insert_many([dict(row) for row in random_cohort(n=5)])
+    first = await client.post("/check-return", json={"user_id": 1, "refund_amount": 40.0})
+    assert first.status_code == 200
+    assert first.json()["feature_source"] == "database"
+    assert (await client.post("/check-return", json={"user_id": 1, "refund_amount": 40.0})).json()["feature_source"] == "cache"
+    assert (await client.post("/check-return", json={"user_id": 999})).json()["feature_source"] == "cold-start"
+    cod = await client.post("/check-return", json={"user_id": 999, "payment_method": "cod", "refund_amount": 40.0})
+    assert cod.json()["risk_score"] > (await client.post("/check-return", json={"user_id": 999, "refund_amount": 40.0})).json()["risk_score"]
@@ -0,0 +1,65 @@
+import pytest
+
+from backend import rule_config
+from backend.response_cache import CachedResponse, ResponseCache, bump_generation
+from helpers import edit_rules
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_etag_round_trip_returns_304(client):
+    first = await client.get("/fraud-users")
+    assert first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+
+    again = await client.get("/fraud-users", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["x-cache"] == "HIT"
+    assert again.content == b""
+
+    for header in (f"W/{etag}", f'"other", {etag}', "*"):
+        assert (await client.get("/fraud-users", headers={"If-None-Match": header})).status_code == 304
+    stale = await client.get("/fraud-users", headers={"If-None-Match": '"0-old-0"'})
+    assert stale.status_code == 200 and stale.content == first.content
+
+
+async def test_generation_bump_changes_the_etag(db, client):
+    etag = (await client.get("/analytics-summary")).headers["etag"]
+    await bump_generation(db)
+    response = await client.get("/analytics-summary", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["x-cache"] == "MISS"
+    assert response.headers["etag"] != etag
+
+
+async def test_rules_edit_changes_the_key_and_etag(client, rules_file):
+    first = await client.get("/fraud-users")
+    assert rule_config.get_rules().version in first.headers["etag"]
+
+    edit_rules(rules_file, alert_threshold=61)
+
+    response = await client.get("/fraud-users", headers={"If-None-Match": first.headers["etag"]})
+    assert response.status_code == 200
+    assert response.headers["x-cache"] == "MISS"
+    assert response.headers["etag"] != first.headers["etag"]
+    assert rule_config.get_rules().version in response.headers["etag"]
+
+
+async def test_uncached_paths_and_methods_pass_through(client):
+    response = await client.get("/alerts")
+    assert "etag" not in response.headers
+
+
+def test_lru_is_bounded_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=3, max_bytes=100)
+    for i in range(4):
+        cache.put(i, CachedResponse(b"x" * 10, f'"{i}"', "application/json", {}))
+    assert len(cache) == 3 and cache.get(0) is None
+
+    cache.get(1)
+    cache.put("big", CachedResponse(b"x" * 24, '"big"', "application/json", {}))
+    assert cache.get(1) is not None and cache.get(2) is None
+    # Bodies over a quarter of the budget are not cached at all
+    cache.put("huge", CachedResponse(b"x" * 26, '"huge"', "application/json", {}))
+    assert cache.get("huge") is None
+    assert cache.size == sum(len(cache.get(k).body) for k in (1, 3, "big"))
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.return_integrity import (
+    DUPLICATE_RETURN, REFUND_OVER_PRICE, RETURN_BEFORE_PURCHASE, ReturnLedger,
+)
+from helpers import AMAZON_COLUMNS, upload
+
+pytestmark = pytest.mark.anyio
+
+QUANTITY_COLUMNS = AMAZON_COLUMNS + ("quantity-purchased",)
+BOUGHT = datetime(2026, 1, 10)
+
+
+def day(n):
+    return (datetime.now() - timedelta(days=n)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_ledger_kinds():
+    ledger = ReturnLedger(tolerance=0.01)
+    ledger.add_purchase("T1", "A", 100.0, BOUGHT)
+    assert ledger.check("T1", "A", 100.5, BOUGHT + timedelta(days=3)) == []
+    assert ledger.check("T1", "A", 100.0, BOUGHT) == [DUPLICATE_RETURN]
+
+    ledger.add_purchase("T2", "B", 50.0, BOUGHT)
+    assert ledger.check("T2", "B", 60.0, BOUGHT - timedelta(days=1)) == [REFUND_OVER_PRICE, RETURN_BEFORE_PURCHASE]
+    # A return whose purchase is not in the upload has no price or date to check against
+    assert ledger.check("T9", "Z", 1e6, BOUGHT) == []
+
+
+def test_ledger_counts_units_per_line():
+    stated = ReturnLedger()
+    stated.add_purchase("T1", "A", 30.0, BOUGHT, quantity=2)
+    stated.add_purchase("T1", "A", 30.0, BOUGHT, quantity=2)  # the same line restated
+    assert stated.check("T1", "A", 15.0, BOUGHT) == []
+    assert stated.check("T1", "A", 15.0, BOUGHT) == []
+    assert stated.check("T1", "A", 15.0, BOUGHT) == [DUPLICATE_RETURN]
+
+    # Without a quantity column a repeated row adds a unit unless it carries a return
+    rows = ReturnLedger()
+    rows.add_purchase("T1", "A", 15.0, BOUGHT)
+    rows.add_purchase("T1", "A", 15.0, BOUGHT)
+    rows.add_purchase("T1", "A", 15.0, BOUGHT, returned=True)
+    assert rows.bought_units("T1", "A") == 2
+    assert rows.check("T1", "A", 15.0, BOUGHT) == []
+
+    rows.add_purchase("T2", "B", 15.0, BOUGHT, returned=True)
+    assert rows.check("T2", "B", 15.0, BOUGHT) == []
+    rows.add_purchase("T2", "B", 15.0, BOUGHT, returned=True)
+    assert rows.bought_units("T2", "B") == 1
+    assert rows.check("T2", "B", 15.0, BOUGHT) == [DUPLICATE_RETURN]
+
+
+async def fetch_scores(client):
+    response = await client.post("/run-fraud-analysis")
+    assert response.status_code == 200, response.text
+    return {u["user_id"]: u for u in (await client.get("/fraud-users", params={"limit": 100})).json()}
+
+
+async def test_same_sku_on_separate_orders_counts_each_purchase(client):
+    stats = await upload(client, [
+        ("O-1", "101", "SKU-1", 40.0, day(30), day(25)),
+        ("O-2", "101", "SKU-1", 40.0, day(20), day(15)),
+        ("O-3", "101", "SKU-1", 40.0, day(10), None),
+    ])
+    assert stats["new_returns"] == 2
+    user = (await fetch_scores(client))[101]
+    assert user["return_rate_90d"] == pytest.approx(2 / 3)
+    assert user["duplicate_return_count"] == 0
+
+
+async def test_repeated_returned_rows_without_quantity_are_duplicates(client, db):
+    stats = await upload(client, [
+        ("O-1", "102", "SKU-2", 30.0, day(20), day(15)),
+        ("O-1", "102", "SKU-2", 30.0, day(20), day(14)),
+        # A row restating a bought line to record its return is not a second unit
+        ("O-2", "102", "SKU-3", 10.0, day(20), None),
+        ("O-2", "102", "SKU-3", 10.0, day(20), day(12)),
+    ])
+    assert stats["new_returns"] == 2
+    violations = await db.return_violations.find({}).to_list(length=None)
+    assert [(v["kind"], v["item_id"]) for v in violations] == [(DUPLICATE_RETURN, "SKU-2")]
+    returns = await db.returns.find({}, {"_id": 0, "return_id": 1}).to_list(length=None)
+    assert sorted(r["return_id"] for r in returns) == ["RET-O-1-SKU-2", "RET-O-2-SKU-3"]
+    items = await db.items.find({}, {"_id": 0, "item_id": 1, "quantity": 1}).to_list(length=None)
+    assert sorted((i["item_id"], i["quantity"]) for i in items) == [("SKU-2", 1), ("SKU-3", 1)]
+
+    user = (await fetch_scores(client))[102]
+    assert user["duplicate_return_count"] == 1
+
+
+async def test_quantity_column_sets_the_units_of_a_line(client, db):
+    stats = await upload(client, [
+        ("O-1", "103", "SKU-4", 30.0, day(20), day(15), 2),
+        ("O-1", "103", "SKU-4", 30.0, day(20), day(14), 2),
+        ("O-1", "103", "SKU-4", 30.0, day(20), day(13), 2),
+        ("O-2", "103", "SKU-5", 10.0, day(20), None, 1),
+    ], columns=QUANTITY_COLUMNS)
+    assert stats["new_returns"] == 2
+    violations = await db.return_violations.find({}).to_list(length=None)
+    assert [v["kind"] for v in violations] == [DUPLICATE_RETURN]
+    assert await db.items.count_documents({}) == 2
+
+    user = (await fetch_scores(client))[103]
+    assert user["return_rate_90d"] == pytest.approx(2 / 3)
+    assert user["duplicate_return_count"] == 1
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+
+from backend import tiering
+from backend.rollups import ROLLUP_FIELDS, month_key, read_timeseries, reclassify
+from helpers import analyzed_cohort, edit_rules
+
+pytestmark = pytest.mark.anyio
+
+
+async def scan_months(db):
+    """Per-month rollup fields recomputed from the raw collections and the current flags."""
+    flagged = {d["user_id"] for d in await db.behavior_scores.find({"risk_flag": True}).to_list(length=None)}
+    months = {}
+
+    def bump(key, **fields):
+        bucket = months.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+        for name, value in fields.items():
+            bucket[name] += value
+
+    for t in await db.transactions.find({}).to_list(length=None):
+        bump(month_key(t["date"]), volume=t["total_amount"], txn_count=1)
+    for r in await db.returns.find({}).to_list(length=None):
+        refund = r["refund_amount"]
+        if r["user_id"] in flagged:
+            bump(month_key(r["return_date"]), refund_total=refund, return_count=1, prevented=refund, blocked_count=1)
+        else:
+            bump(month_key(r["return_date"]), refund_total=refund, return_count=1, leakage=refund, manual_count=1)
+    return months
+
+
+async def stored_months(db):
+    return {d.pop("_id"): d for d in await db.analytics_rollups.find({}).to_list(length=None)}
+
+
+def assert_months_match(stored, expected):
+    assert sorted(stored) == sorted(expected)
+    for key, fields in expected.items():
+        for name, value in fields.items():
+            assert stored[key].get(name, 0) == pytest.approx(value, abs=1e-6), (key, name)
+
+
+async def test_rollups_match_a_rescan_after_upload_and_analysis(client, db):
+    await analyzed_cohort(client)
+    assert_months_match(await stored_months(db), await scan_months(db))
+
+
+async def test_threshold_change_moves_only_flipped_users(client, db, rules_file):
+    await analyzed_cohort(client)
+    prevented = sum(d.get("prevented", 0) for d in (await stored_months(db)).values())
+
+    edit_rules(rules_file, alert_threshold=30)
+    assert (await client.post("/run-fraud-analysis")).status_code == 200
+    months = await stored_months(db)
+    assert_months_match(months, await scan_months(db))
+    assert sum(d["prevented"] for d in months.values()) > prevented
+
+    edit_rules(rules_file, alert_threshold=90)
+    assert (await client.post("/run-fraud-analysis")).status_code == 200
+    assert_months_match(await stored_months(db), await scan_months(db))
+
+
+async def test_timeseries_zero_fills_missing_months(db):
+    assert await read_timeseries(db) == ([], [])
+    await db.analytics_rollups.insert_many([
+        {"_id": "2026-01", "volume": 10.0, "txn_count": 1},
+        {"_id": "2026-03", "volume": 30.0, "txn_count": 3, "leakage": 5.0},
+        {"_id": "2025-01", "volume": 99.0},
+    ])
+    labels, buckets = await read_timeseries(db, months=4)
+    assert labels == ["2025-12", "2026-01", "2026-02", "2026-03"]
+    assert [b["volume"] for b in buckets] == [0, 10.0, 0, 30.0]
+    assert buckets[3]["leakage"] == 5.0 and buckets[3]["blocked_count"] == 0
+
+
+async def test_reclassify_counts_archived_returns(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(tiering, "ARCHIVE_DIR", tmp_path / "archive")
+    monkeypatch.setattr(tiering, "archived_refunds", tiering.ArchivedRefunds())
+    old = {"return_id": "R-old", "user_id": 5, "transaction_id": "T-old", "item_id": "I",
+           "return_date": datetime(2025, 1, 10), "refund_amount": 40.0}
+    tiering._write_partitions("returns", [old], ["2025-01"])
+    await db.returns.insert_many([{**old, "return_id": "R-new", "return_date": datetime(2026, 9, 1), "refund_amount": 15.0}])
+
+    await reclassify(db, {5}, set())
+    months = await stored_months(db)
+    assert months["2025-01"] == {"prevented": 40.0, "leakage": -40.0, "blocked_count": 1, "manual_count": -1}
+    assert months["2026-09"] == {"prevented": 15.0, "leakage": -15.0, "blocked_count": 1, "manual_count": -1}
+
+    await reclassify(db, set(), {5})
+    assert all(v == 0 for d in (await stored_months(db)).values() for v in d.values())
@@ -0,0 +1,40 @@
+import pytest
+
+import backend.response_cache as response_cache
+from backend.db_stats import measure_round_trips
+from backend.main import app
+from benchmarks.round_trips import BUDGETS, request_kwargs
+
+pytestmark = pytest.mark.anyio
+
+SIZES = (10, 120)
+
+
+async def measure(n_users):
+    counts = {}
+    for method, path, budget in BUDGETS:
+        stats = await measure_round_trips(app, method, path.format(uid=1), **request_kwargs(method, path, n_users))
+        counts[path] = (stats.round_trips, budget(n_users, n_users), stats.by_command)
+    return counts
+
+
+@pytest.fixture
+def uncached(monkeypatch):
+    # Measure the handlers, not cache hits
+    monkeypatch.setattr(response_cache, "CACHE_ENABLED", False)
+
+
+async def test_round_trips_stay_within_budget_and_do_not_grow_with_users(db, uncached):
+    runs = {}
+    for n_users in SIZES:
+        # Each upload replaces the previous cohort
+        counts = await measure(n_users)
+        for path, (round_trips, budget, by_command) in counts.items():
+            assert round_trips <= budget, f"{path} with {n_users} users: {round_trips} > {budget} {by_command}"
+        runs[n_users] = {path: c[0] for path, c in counts.items()}
+    assert runs[SIZES[0]] == runs[SIZES[1]]
+
+
+def test_budgets_are_sublinear():
+    for method, path, budget in BUDGETS:
+        assert budget(10_000, 10_000) <= 2 * budget(10, 10), path
@@ -0,0 +1,162 @@
+import json
+import os
+import random
+from pathlib import Path
+
+import pytest
+
+from backend import rule_config
+from backend.rule_config import ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER, parse_rules
+
+DEFAULT_RULES = Path(rule_config.__file__).with_name("fraud_rules.json").read_text()
+
+
+def baseline_score(f):
+    """The hard-coded scoring that fraud_rules.json replaced."""
+    if f["engine_used"] == ENGINE_FIRST_ORDER:
+        return round(
+            min(f["payment_risk_score"], 100) * 0.40
+            + min(f["high_value_return_count"] * 20, 100) * 0.30
+            + min(f["refund_value_ratio"] * 100, 100) * 0.20
+            + f["anomaly_score"] * 100 * 0.10, 2)
+    return round(
+        min(f["return_rate_90d"], 1.0) * 100 * 0.30
+        + min(f["fast_return_count"] / 5.0 * 100, 100) * 0.20
+        + min(f["high_value_return_count"] / 5.0 * 100, 100) * 0.15
+        + min(f["refund_value_ratio"], 1.0) * 100 * 0.15
+        + min(f["category_risk_score"], 100) * 0.10
+        + f["anomaly_score"] * 100 * 0.10, 2)
+
+
+def baseline_reasoning(f):
+    reasons = []
+    if f["engine_used"] == ENGINE_FIRST_ORDER:
+        if f["payment_risk_score"] > 50:
+            reasons.append("High Payment/Shipping Risk on New Account")
+        if f["high_value_return_count"] > 0:
+            reasons.append("High-Value First Order Return")
+        if f["refund_value_ratio"] > 0.8:
+            reasons.append("Full Order Refund on First Purchase")
+    else:
+        if f["return_rate_90d"] > 0.8 and f["fast_return_count"] > 0:
+            reasons.append("Serial Returner")
+        if f["fast_return_count"] >= 2:
+            reasons.append("Wardrobing (Frequent fast returns < 48h)")
+        if f["high_value_return_count"] >= 2:
+            reasons.append("High-Value Item Abuse")
+        if f["category_risk_score"] > 50:
+            reasons.append("Category-Specific Event Abuse")
+    if f["anomaly_score"] > 0.7:
+        reasons.append("Highly Anomalous Pattern")
+    return ", ".join(reasons) if reasons else "Normal Pattern"
+
+
+def random_features(rng, n):
+    return [{
+        "user_id": i,
+        "engine_used": rng.choice([ENGINE_BEHAVIORAL, ENGINE_FIRST_ORDER]),
+        "return_rate_90d": rng.choice([0.0, rng.random(), 1.0, 1.5]),
+        "fast_return_count": rng.randint(0, 8),
+        "high_value_return_count": rng.randint(0, 8),
+        "refund_value_ratio": rng.choice([0.0, rng.random(), 0.85, 2.0]),
+        "category_risk_score": rng.choice([0.0, 50.0, 100.0, rng.random() * 100]),
+        "payment_risk_score": rng.choice([0.0, 30.0, 50.0, 70.0, 130.0]),
+        "anomaly_score": rng.random(),
+        "txns_count": rng.randint(0, 10),
+    } for i in range(n)]
+
+
+def test_default_rules_reproduce_the_baseline_scores_and_reasons():
+    rules = parse_rules(DEFAULT_RULES)
+    features = random_features(random.Random(7), 2000)
+    risk, reasons = rules.evaluate(features)
+    for f, score, reasoning in zip(features, risk, reasons):
+        assert score == pytest.approx(baseline_score(f), abs=0.011)
+        assert reasoning == baseline_reasoning(f)
+
+
+def test_version_carries_a_content_hash():
+    a = parse_rules(DEFAULT_RULES)
+    b = parse_rules(DEFAULT_RULES.replace('"alert_threshold": 60', '"alert_threshold": 61'))
+    assert a.version.split("+")[0] == b.version.split("+")[0]
+    assert a.version != b.version
+
+
+@pytest.mark.parametrize("edit, message", [
+    (lambda c: c["engines"]["behavioral"]["components"][0].update(weight=0.9), "must not exceed 1.0"),
+    (lambda c: c["engines"]["first_order"]["components"][0].update(feature="shoe_size"), "Unknown feature"),
+    (lambda c: c["engines"].pop("first_order"), "Missing engine"),
+    (lambda c: c["reasons"][0]["when"][0].update(op="!="), "op"),
+    (lambda c: c.update(medium_risk_floor=70), "medium_risk_floor"),
+])
+def test_invalid_configs_are_rejected(edit, message):
+    config = json.loads(DEFAULT_RULES)
+    edit(config)
+    with pytest.raises(ValueError, match=message):
+        parse_rules(json.dumps(config))
+
+
+@pytest.fixture
+def rules_file(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(DEFAULT_RULES)
+    monkeypatch.setattr(rule_config, "RULES_PATH", str(path))
+    state = rule_config.rule_state
+    saved = (state.compiled, state.mtime, state.checked_at)
+    state.compiled, state.mtime, state.checked_at = None, None, 0.0
+    yield path
+    state.compiled, state.mtime, state.checked_at = saved
+
+
+def _edit(path, threshold, mtime):
+    config = json.loads(DEFAULT_RULES)
+    config["alert_threshold"] = threshold
+    path.write_text(json.dumps(config))
+    # Explicit mtimes: filesystems with coarse timestamps would hide a quick edit
+    os.utime(path, (mtime, mtime))
+
+
+def test_get_rules_checks_the_file_at_most_once_per_interval(rules_file, monkeypatch):
+    monkeypatch.setattr(rule_config, "CHECK_INTERVAL", 3600.0)
+    assert rule_config.get_rules().alert_threshold == 60
+
+    stats = []
+    real_stat = rule_config.os.stat
+    monkeypatch.setattr(rule_config.os, "stat", lambda p: stats.append(p) or real_stat(p))
+    _edit(rules_file, 70, 2_000_000_000)
+    for _ in range(100):
+        assert rule_config.get_rules().alert_threshold == 60
+    assert stats == []
+
+    monkeypatch.setattr(rule_config, "CHECK_INTERVAL", 0.0)
+    assert rule_config.get_rules().alert_threshold == 70
+    assert len(stats) == 1
+
+
+def test_broken_edit_keeps_the_previous_rules_until_forced(rules_file, monkeypatch):
+    monkeypatch.setattr(rule_config, "CHECK_INTERVAL", 0.0)
+    good = rule_config.get_rules()
+    rules_file.write_text("{not json")
+    os.utime(rules_file, (2_000_000_000, 2_000_000_000))
+    assert rule_config.get_rules() is good
+    with pytest.raises(ValueError):
+        rule_config.reload_rules(force=True)
+
+
+def test_missing_file_during_a_save_keeps_the_rules_live(rules_file, monkeypatch):
+    monkeypatch.setattr(rule_config, "CHECK_INTERVAL", 0.0)
+    good = rule_config.get_rules()
+    # An editor's atomic save: the file is gone until the temp file is renamed over it
+    rules_file.unlink()
+    assert rule_config.get_rules() is good
+    with pytest.raises(FileNotFoundError):
+        rule_config.reload_rules(force=True)
+
+    _edit(rules_file, 70, 2_000_000_000)
+    assert rule_config.get_rules().alert_threshold == 70
+
+
+def test_missing_file_raises_when_nothing_is_loaded(rules_file):
+    rules_file.unlink()
+    with pytest.raises(FileNotFoundError):
+        rule_config.get_rules()
@@ -0,0 +1,107 @@
+import random
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pytest
+
+from backend.sketches import HLL_RELATIVE_ERROR, KLL_RANK_ERROR, HyperLogLog, KLLSketch
+from helpers import analyzed_cohort
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    # KLL compaction picks its offsets with `random`; fixed seeds keep the bounds checks deterministic
+    state = random.getstate()
+    random.seed(1234)
+    yield
+    random.setstate(state)
+
+
+def rank_error(values_sorted, value, q):
+    """Distance between q and the closest rank `value` occupies in the data, as a fraction of n."""
+    n = len(values_sorted)
+    low, high = bisect_left(values_sorted, value) / n, bisect_right(values_sorted, value) / n
+    return 0.0 if low <= q <= high else min(abs(q - low), abs(q - high))
+
+
+@pytest.mark.parametrize("n", [100, 5000, 200_000])
+def test_hll_count_is_within_three_standard_errors(n):
+    hll = HyperLogLog()
+    for uid in range(n):
+        hll.add(uid)
+    assert abs(hll.count() - n) / n <= 3 * HLL_RELATIVE_ERROR
+
+
+def test_hll_merge_equals_one_sketch_over_the_union():
+    a, b, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for uid in range(30_000):
+        (a if uid % 3 else b).add(uid)
+        union.add(uid)
+    # Overlapping ids don't inflate the count
+    for uid in range(0, 30_000, 7):
+        b.add(uid)
+    merged = HyperLogLog.from_doc(a.to_doc()).merge(HyperLogLog.from_doc(b.to_doc()))
+    assert np.array_equal(merged.registers, union.registers)
+    assert merged.count() == union.count()
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "lognormal", "duplicates"])
+def test_kll_quantiles_stay_within_the_rank_error(distribution):
+    rng = np.random.default_rng(7)
+    values = {
+        "uniform": rng.uniform(0, 1000, 100_000),
+        "lognormal": rng.lognormal(3, 1.5, 100_000),
+        "duplicates": rng.integers(0, 20, 100_000).astype(float),
+    }[distribution]
+    sketch = KLLSketch().update_many(values)
+    assert sketch.n == len(values)
+    assert sum(len(level) << h for h, level in enumerate(sketch.levels)) == len(values)
+
+    qs = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+    ordered = sorted(values)
+    for q, value in sketch.quantiles(qs).items():
+        assert rank_error(ordered, value, q) <= KLL_RANK_ERROR, q
+    assert sketch.quantiles([0, 1]) == {0: ordered[0], 1: ordered[-1]}
+
+
+def test_kll_bounds_hold_after_many_merges_and_a_round_trip():
+    rng = np.random.default_rng(11)
+    parts = [rng.exponential(50, 4000) for _ in range(30)]
+    merged = KLLSketch()
+    for part in parts:
+        merged.merge(KLLSketch.from_doc(KLLSketch().update_many(part).to_doc()))
+    ordered = sorted(np.concatenate(parts))
+    assert merged.n == len(ordered)
+    for q, value in merged.quantiles([0.05, 0.5, 0.95, 0.99]).items():
+        assert rank_error(ordered, value, q) <= KLL_RANK_ERROR, q
+    # The sketch stays small whatever n is
+    assert sum(len(level) for level in merged.levels) < 1000
+
+
+def test_empty_sketches():
+    assert KLLSketch().quantiles([0.5]) == {0.5: None}
+    assert HyperLogLog().count() == 0.0
+
+
+async def test_endpoint_estimates_match_the_raw_data(client, db):
+    await analyzed_cohort(client, rows=3000)
+    body = (await client.get("/analytics-sketches", params={"q": "0.5,0.9"})).json()
+
+    buyers = len({t["user_id"] for t in await db.transactions.find({}, {"user_id": 1}).to_list(length=None)})
+    assert abs(body["distinct_buyers"]["total"] - buyers) <= 3 * HLL_RELATIVE_ERROR * buyers
+    assert len(body["distinct_buyers"]["by_month"]) == len(body["months"])
+
+    refunds = sorted(r["refund_amount"] for r in await db.returns.find({}).to_list(length=None))
+    assert body["refund_amount"]["count"] == len(refunds)
+    for q, value in body["refund_amount"]["quantiles"].items():
+        assert rank_error(refunds, value, float(q)) <= KLL_RANK_ERROR
+
+    scores = await db.behavior_scores.count_documents({})
+    assert body["risk_score"]["count"] == scores
+
+
+@pytest.mark.parametrize("q", ["abc", "1.5", ""])
+async def test_endpoint_rejects_bad_quantiles(client, db, q):
+    assert (await client.get("/analytics-sketches", params={"q": q})).status_code == 400
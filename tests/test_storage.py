@@ -0,0 +1,155 @@
+"""
+The same queries against MongoDB and the in-process fake the other tests run
+on. The fake always runs; MongoDB runs when MONGO_TEST_URI points at a reachable server, whose
+trustigo_parity and trustigo databases are overwritten.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import ReturnDocument, UpdateOne
+
+from backend.database import db_state
+from backend.indexes import ensure_indexes
+from backend.fake_store import FakeClient
+from backend.storage import Client, Collection, Cursor, Database, bulk_upsert
+from dataset.synthetic import parse_mix, to_csv_bytes
+from helpers import connect
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2026, 3, 1, 12, 0)
+
+
+@pytest.fixture(params=["fake", "mongo"])
+async def store(request):
+    client = await connect(request.param)
+    db = client.trustigo_parity
+    for name in ("users", "events"):
+        await db[name].delete_many({})
+    yield db
+    client.close()
+
+
+async def seed_events(db):
+    await db.events.insert_many([
+        {"_id": 1, "user_id": 1, "kind": "order", "amount": 40.0, "at": T0},
+        {"_id": 2, "user_id": 1, "kind": "return", "amount": 40.0, "at": T0 + timedelta(days=2)},
+        {"_id": 3, "user_id": 2, "kind": "order", "amount": 15.5, "at": T0 + timedelta(days=1)},
+        {"_id": 4, "user_id": 3, "kind": "order", "amount": 99.0, "at": T0 + timedelta(days=3), "meta": {"device": "d1"}},
+        {"_id": 5, "user_id": 3, "kind": "order", "amount": "n/a", "at": T0 + timedelta(days=4)},
+        {"_id": 6, "user_id": 4, "kind": "order", "at": T0 + timedelta(days=5)},
+    ])
+
+
+def test_fake_implements_the_protocols():
+    client = FakeClient()
+    assert isinstance(client, Client)
+    assert isinstance(client.trustigo, Database)
+    assert isinstance(client.trustigo.users, Collection)
+    assert isinstance(client.trustigo.users.find(), Cursor)
+
+
+async def test_find_filters_sorts_and_projects(store):
+    await seed_events(store)
+    cursor = store.events.find(
+        {"user_id": {"$in": [1, 2, 3]}, "at": {"$gte": T0 + timedelta(days=1)}},
+        {"_id": 0, "user_id": 1, "at": 1},
+    ).sort([("user_id", -1), ("at", 1)]).skip(1).limit(2)
+    assert await cursor.to_list(length=None) == [
+        {"user_id": 3, "at": T0 + timedelta(days=4)},
+        {"user_id": 2, "at": T0 + timedelta(days=1)},
+    ]
+
+
+async def test_comparisons_stay_within_a_type_and_missing_sorts_first(store):
+    await seed_events(store)
+    over_20 = await store.events.find({"amount": {"$gt": 20}}, {"_id": 1}).sort("_id", 1).to_list(length=None)
+    assert [d["_id"] for d in over_20] == [1, 2, 4]
+    by_amount = await store.events.find({}, {"_id": 1}).sort([("amount", 1), ("_id", 1)]).to_list(length=None)
+    assert [d["_id"] for d in by_amount] == [6, 3, 1, 2, 4, 5]
+    assert await store.events.count_documents({"meta.device": "d1"}) == 1
+    assert await store.events.count_documents({"amount": {"$exists": False}}) == 1
+
+
+async def test_datetimes_come_back_as_naive_utc(store):
+    aware = datetime(2026, 3, 1, 14, 0, tzinfo=timezone(timedelta(hours=2)))
+    await store.events.insert_one({"_id": "tz", "at": aware})
+    assert (await store.events.find_one({"_id": "tz"}))["at"] == datetime(2026, 3, 1, 12, 0)
+    assert await store.events.count_documents({"at": {"$lt": datetime(2026, 3, 1, 12, 1, tzinfo=timezone.utc)}}) == 1
+
+
+async def test_updates_upserts_and_counters(store):
+    await store.users.update_one({"user_id": 7}, {"$set": {"name": "a"}, "$inc": {"runs": 1}}, upsert=True)
+    await store.users.update_one({"user_id": 7}, {"$inc": {"runs": 2}}, upsert=True)
+    assert await store.users.find_one({"user_id": 7}, {"_id": 0}) == {"user_id": 7, "name": "a", "runs": 3}
+
+    counter = await store.users.find_one_and_update(
+        {"_id": "seq"}, {"$inc": {"value": 5}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    assert counter == {"_id": "seq", "value": 5}
+
+    await bulk_upsert(store.users, [
+        ({"user_id": 7}, {"$set": {"name": "b"}}),
+        ({"user_id": 8}, {"$set": {"name": "c"}}),
+    ], ordered=False)
+    names = await store.users.find({"user_id": {"$exists": True}}, {"_id": 0, "user_id": 1, "name": 1}).sort("user_id", 1).to_list(length=None)
+    assert names == [{"user_id": 7, "name": "b"}, {"user_id": 8, "name": "c"}]
+    assert (await store.users.delete_many({"user_id": {"$gte": 8}})).deleted_count == 1
+
+
+async def test_bulk_upsert_sends_driver_operations_to_motor():
+    class Recorder:
+        calls = []
+
+        async def bulk_write(self, requests, ordered=True):
+            self.calls.append((requests, ordered))
+
+    collection = Recorder()
+    await bulk_upsert(collection, [])
+    await bulk_upsert(collection, [({"_id": "2026-09"}, {"$inc": {"volume": 5.0}})], ordered=False)
+    assert collection.calls == [([UpdateOne({"_id": "2026-09"}, {"$inc": {"volume": 5.0}}, upsert=True)], False)]
+
+
+async def test_aggregation_groups_and_sorts(store):
+    await seed_events(store)
+    pipeline = [
+        {"$match": {"kind": "order", "amount": {"$gte": 0}}},
+        {"$group": {"_id": "$user_id", "total": {"$sum": "$amount"}, "n": {"$sum": 1}}},
+        {"$sort": {"total": -1}},
+    ]
+    rows = await store.events.aggregate(pipeline).to_list(length=None)
+    assert rows == [{"_id": 3, "total": 99.0, "n": 1}, {"_id": 1, "total": 40.0, "n": 1}, {"_id": 2, "total": 15.5, "n": 1}]
+
+
+async def test_results_are_copies(store):
+    await store.users.insert_one({"_id": 1, "tags": ["a"]})
+    doc = await store.users.find_one({"_id": 1})
+    doc["tags"].append("b")
+    assert (await store.users.find_one({"_id": 1}))["tags"] == ["a"]
+
+
+async def scores_after_analysis(backend):
+    import httpx
+
+    from backend.main import app
+    from conftest import reset_process_state
+
+    reset_process_state()
+    client = await connect(backend)
+    await ensure_indexes(client.trustigo)
+    previous, db_state.client = db_state.client, client
+    try:
+        data = to_csv_bytes(1500, seed=4, mix=parse_mix(["serial_returner=0.2", "wardrober=0.1"]))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            assert (await http.post("/upload-csv", files={"file": ("o.csv", data, "text/csv")})).status_code == 200
+            assert (await http.post("/run-fraud-analysis")).status_code == 200
+        cursor = client.trustigo.behavior_scores.find({}, {"_id": 0, "user_id": 1, "overall_risk_score": 1, "risk_flag": 1})
+        return sorted((d["user_id"], round(d["overall_risk_score"], 6), d["risk_flag"]) for d in await cursor.to_list(length=None))
+    finally:
+        db_state.client = previous
+        client.close()
+
+
+async def test_analysis_scores_match_across_backends():
+    mongo = await scores_after_analysis("mongo")
+    assert mongo == await scores_after_analysis("fake")
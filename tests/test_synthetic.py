@@ -0,0 +1,67 @@
+import csv
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+from backend.models import CASH_ON_DELIVERY
+from backend.rule_config import get_rules
+from dataset.synthetic import PAYMENT_METHODS, parse_mix, to_csv_bytes
+from helpers import AMAZON_COLUMNS, upload
+
+END = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+def test_same_arguments_give_the_same_export():
+    a = to_csv_bytes(3000, seed=5, end=END, chunk_rows=1000)
+    assert a == to_csv_bytes(3000, seed=5, end=END, chunk_rows=1000)
+    assert a != to_csv_bytes(3000, seed=6, end=END, chunk_rows=1000)
+    assert len(a.decode().splitlines()) == 3001
+
+
+def test_flipkart_schema_and_labels():
+    text = to_csv_bytes(200, seed=1, end=END, schema="flipkart", labels=True).decode()
+    header = text.splitlines()[0].split(",")
+    assert header[:3] == ["Order ID", "Customer ID", "Item ID"]
+    assert header[-1] == "fraud-profile"
+
+
+@pytest.mark.parametrize("pairs", [["wardrober=-0.1"], ["serial_returner=0.7", "wardrober=0.5"], ["shoplifter=0.1"]])
+def test_invalid_mixes_are_rejected(pairs):
+    with pytest.raises(ValueError):
+        parse_mix(pairs)
+
+
+def test_cash_on_delivery_uses_the_spelling_the_scorers_check():
+    assert CASH_ON_DELIVERY in PAYMENT_METHODS.to_pylist()
+
+
+@pytest.mark.anyio
+async def test_fraud_heavy_profiles_raise_payment_risk(client, db):
+    data = to_csv_bytes(1500, seed=11, labels=True,
+                        mix=parse_mix(["serial_returner=0.3", "wardrober=0.1", "high_value_abuser=0.05", "cold_start=0.05"]))
+    profiles = {int(row["buyer-name"]): row["fraud-profile"] for row in csv.DictReader(io.StringIO(data.decode()))}
+    response = await client.post("/upload-csv", files={"file": ("orders.csv", data, "text/csv")})
+    assert response.status_code == 200, response.text
+    assert await db.transactions.count_documents({"payment_method": CASH_ON_DELIVERY}) > 0
+    assert (await client.post("/run-fraud-analysis")).status_code == 200
+
+    risk = {"normal": [], "fraud": []}
+    async for doc in db.behavior_scores.find({}, {"user_id": 1, "payment_risk_score": 1}):
+        group = "normal" if profiles[doc["user_id"]] == "normal" else "fraud"
+        risk[group].append(doc["payment_risk_score"])
+    mean = {group: sum(scores) / len(scores) for group, scores in risk.items()}
+    assert max(risk["fraud"]) >= get_rules().features.cod_payment_risk
+    assert mean["fraud"] > mean["normal"] > 0
+
+
+@pytest.mark.anyio
+async def test_upload_normalizes_cash_on_delivery_spellings(client, db):
+    columns = AMAZON_COLUMNS + ("payment-method",)
+    await upload(client, [
+        ("O-1", "1", "SKU-1", 10.0, "2026-05-01", None, "Cash on Delivery"),
+        ("O-2", "2", "SKU-2", 10.0, "2026-05-01", None, "cod"),
+        ("O-3", "3", "SKU-3", 10.0, "2026-05-01", None, "UPI"),
+    ], columns=columns)
+    methods = {t["transaction_id"]: t["payment_method"] async for t in db.transactions.find({})}
+    assert methods == {"O-1": CASH_ON_DELIVERY, "O-2": CASH_ON_DELIVERY, "O-3": "UPI"}
@@ -0,0 +1,146 @@
+import json
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import tiering
+from backend.export import stream_ndjson
+from helpers import upload
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tiering, "ARCHIVE_DIR", tmp_path / "archive")
+    monkeypatch.setattr(tiering, "archived_refunds", tiering.ArchivedRefunds())
+    return tmp_path / "archive"
+
+
+def _returns(ids, user_id=1, month="2025-01", refund=10.0):
+    return [{
+        "return_id": f"r{i}", "user_id": user_id, "transaction_id": f"t{i}", "item_id": "sku",
+        "return_date": datetime.fromisoformat(f"{month}-15"), "refund_amount": refund,
+    } for i in ids]
+
+
+def _write(collection, docs):
+    tiering._write_partitions(collection, docs, [tiering._month(d.get("return_date") or d["date"]) for d in docs])
+
+
+async def test_archive_run_moves_old_rows_and_exports_them(db, client):
+    old = datetime.utcnow() - timedelta(days=400)
+    await db.transactions.insert_many([
+        {"transaction_id": "old", "user_id": 1, "date": old, "total_amount": 20.0},
+        {"transaction_id": "new", "user_id": 1, "date": datetime.utcnow(), "total_amount": 5.0},
+    ])
+    await db.items.insert_many([{"transaction_id": "old", "item_id": "a", "price": 20.0, "quantity": 1}])
+
+    response = await client.post("/archive/run", params={"retention_days": 180})
+    assert response.json()["archived"] == {"transactions": 1, "items": 1, "returns": 0}
+    assert [t["transaction_id"] for t in await db.transactions.find({}).to_list(length=None)] == ["new"]
+
+    response = await client.get("/archive/transactions")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["transaction_id"], r["total_amount"]) for r in rows] == [("old", 20.0)]
+    response = await client.get("/archive/items", params={"format": "csv"})
+    assert response.text.splitlines()[1].startswith("old,a,")
+
+
+async def test_export_streams_batches_and_drops_duplicate_copies(db, client, monkeypatch):
+    monkeypatch.setattr(tiering, "ARCHIVE_BATCH", 7)
+    _write("returns", _returns(range(30)))
+    # A retried batch can leave a second file holding some of the same records
+    _write("returns", _returns(range(25, 35)))
+    _write("returns", _returns(range(40, 45), user_id=2, month="2025-02"))
+
+    batches = list(tiering.iter_archive("returns"))
+    assert max(len(b) for b in batches) <= 7
+    assert sorted(r["return_id"] for b in batches for r in b) == sorted(f"r{i}" for i in [*range(35), *range(40, 45)])
+
+    response = await client.get("/archive/returns", params={"user_id": 2})
+    assert sorted(json.loads(line)["return_id"] for line in response.text.splitlines()) == [f"r{i}" for i in range(40, 45)]
+    response = await client.get("/archive/returns", params={"start": "2025-02", "end": "2025-02", "format": "csv"})
+    assert len(response.text.splitlines()) == 6
+
+
+async def test_missing_values_export_as_null(db, client):
+    docs = _returns([1, 2])
+    docs[1]["refund_amount"] = math.nan
+    docs[1]["note"] = "late"
+    _write("returns", docs)
+
+    response = await client.get("/archive/returns")
+    rows = {r["return_id"]: r for r in map(json.loads, response.text.splitlines())}
+    assert rows["r2"]["refund_amount"] is None
+    assert rows["r1"]["note"] is None
+    assert "NaN" not in response.text
+
+
+async def test_ndjson_writes_non_finite_floats_as_null():
+    async def rows():
+        yield {"a": math.nan, "b": math.inf, "c": 1.5}
+
+    chunks = [chunk async for chunk in stream_ndjson(rows(), ["a", "b", "c"])]
+    assert json.loads("".join(chunks)) == {"a": None, "b": None, "c": 1.5}
+
+
+async def test_items_cannot_be_filtered_by_user(db, client):
+    response = await client.get("/archive/items", params={"user_id": 1})
+    assert response.status_code == 400
+
+
+def _old_orders(prefix, days=400):
+    when = f"{datetime.utcnow() - timedelta(days=days):%Y-%m-%dT10:00:00Z}"
+    return [(f"{prefix}-{i}", i, f"SKU-{i}", 30, when, when) for i in range(1, 4)]
+
+
+async def test_upload_keeps_earlier_archives_under_their_dataset(db, client, archive_dir):
+    await upload(client, _old_orders("A"))
+    first = await tiering.current_dataset(db)
+    assert (await client.post("/archive/run", params={"retention_days": 180})).json()["dataset"] == first
+
+    await upload(client, _old_orders("B", days=10))
+    second = await tiering.current_dataset(db)
+    assert second != first and tiering.list_datasets() == [first]
+    # The new dataset starts with an empty archive; the replaced one stays readable
+    assert (await client.get("/archive/transactions")).text == ""
+    response = await client.get("/archive/transactions", params={"dataset": first})
+    assert sorted(json.loads(line)["transaction_id"] for line in response.text.splitlines()) == ["A-1", "A-2", "A-3"]
+    # Its refunds don't leak into the new dataset's rollups
+    assert tiering.archived_refunds_by_month([1, 2, 3], second) == {}
+    assert sum(n for _, n in tiering.archived_refunds_by_month([1, 2, 3], first).values()) == 3
+
+
+async def test_archive_is_only_deleted_by_an_explicit_purge(db, client, archive_dir):
+    _write("returns", _returns([1]))
+    for dataset in ("20260101T000000-aaaaaa", "20260201T000000-bbbbbb"):
+        tiering._write_partitions("returns", _returns([1]), ["2025-01"], dataset)
+
+    assert (await client.delete("/archive", params={"dataset": "../etc"})).status_code == 422
+    response = await client.delete("/archive", params={"dataset": "20260101T000000-aaaaaa"})
+    assert response.json() == {"purged": ["20260101T000000-aaaaaa"]}
+    assert tiering.list_datasets() == ["20260201T000000-bbbbbb"]
+
+    assert (await client.delete("/archive")).json() == {"purged": ["20260201T000000-bbbbbb"]}
+    assert tiering.list_datasets() == [] and tiering.archived_refunds_by_month([1]) == {}
+
+
+def test_archived_refunds_are_cached_until_the_files_change(monkeypatch):
+    _write("returns", _returns(range(3), user_id=1) + _returns(range(3, 5), user_id=2, month="2025-02", refund=4.0))
+    reads = []
+    real_iter = tiering.iter_archive
+    monkeypatch.setattr(tiering, "iter_archive", lambda *a, **k: reads.append(a) or real_iter(*a, **k))
+
+    assert tiering.archived_refunds_by_month([1, 2]) == {"2025-01": (30.0, 3), "2025-02": (8.0, 2)}
+    assert tiering.archived_refunds_by_month([2]) == {"2025-02": (8.0, 2)}
+    assert tiering.archived_refunds_by_month([3]) == {}
+    assert len(reads) == 1
+
+    _write("returns", _returns(range(10, 12), user_id=2, month="2025-03", refund=1.0))
+    assert tiering.archived_refunds_by_month([2]) == {"2025-02": (8.0, 2), "2025-03": (2.0, 2)}
+    assert len(reads) == 2
+
+    tiering.clear_archive()
+    assert tiering.archived_refunds_by_month([1, 2]) == {}
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from helpers import analyzed_cohort
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_batch_matches_the_single_user_endpoint(client, db):
+    await analyzed_cohort(client)
+    alerted = [a["user_id"] for a in await db.fraud_alerts.find({}).to_list(length=5)]
+    assert alerted
+    ids = [*alerted, 1, 2, 3]
+    batch = await client.post("/users/batch", json={"user_ids": ids})
+    assert batch.status_code == 200
+    body = batch.json()
+    assert body["missing"] == []
+    singles = [(await client.get(f"/user/{uid}")).json() for uid in dict.fromkeys(ids)]
+    assert body["users"] == singles
+    assert any(u["fraud_alerts"] for u in body["users"])
+
+
+async def test_batch_keeps_request_order_and_lists_unknown_ids(client, db):
+    await analyzed_cohort(client, rows=300)
+    body = (await client.post("/users/batch", json={"user_ids": [5, 999999, 2, 5, -1]})).json()
+    assert [u["user_id"] for u in body["users"]] == [5, 2]
+    assert body["missing"] == [999999, -1]
+
+
+@pytest.mark.parametrize("ids", [[], list(range(1001))])
+async def test_batch_size_is_bounded(client, db, ids):
+    assert (await client.post("/users/batch", json={"user_ids": ids})).status_code == 422
+
+
+async def test_unknown_user_is_404(client, db):
+    assert (await client.get("/user/424242")).status_code == 404
+
+
+async def test_detail_lookups_run_concurrently(client, db, monkeypatch):
+    await analyzed_cohort(client, rows=300)
+    in_flight, peak = 0, 0
+    real_find_one = type(db.users).find_one
+
+    async def slow_find_one(self, *args, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return await real_find_one(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(db.users), "find_one", slow_find_one)
+    assert (await client.get("/user/1")).status_code == 200
+    # users and behavior_scores are fetched at the same time
+    assert peak == 2